@@ -0,0 +1,65 @@
+"""
+Add up the hot frames across request profiles captured by the profiler
+
+    python analyze_profiles.py                        # everything in profiles/
+    python analyze_profiles.py profiles/ --match recommend --top 40
+    python analyze_profiles.py a.speedscope.json b.collapsed.txt --sort total
+
+Self time is time a frame was the innermost one (doing the work itself),
+total time includes everything it called or awaited.
+"""
+
+import argparse
+import glob
+import os
+from collections import Counter
+from utils.profiling import FORMATS, load_profile, hot_frames
+
+def profile_paths(paths: list, match: str = None) -> list:
+    """Profile files from files and directories, optionally filtered by name"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for suffix in FORMATS.values():
+                found.extend(glob.glob(os.path.join(path, f"*{suffix}")))
+        else:
+            found.append(path)
+    return sorted(path for path in found if not match or match in os.path.basename(path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate hot frames across captured request profiles")
+    parser.add_argument("paths", nargs="*", default=["profiles"], help="Profile files or directories")
+    parser.add_argument("--match", help="Only profiles whose file name contains this (e.g. recommend)")
+    parser.add_argument("--top", type=int, default=25, help="Frames to show")
+    parser.add_argument("--sort", choices=("self", "total"), default="self")
+    args = parser.parse_args()
+
+    paths = profile_paths(args.paths, args.match)
+    if not paths:
+        print("❌ No profiles found")
+        return
+
+    stacks = Counter()
+    for path in paths:
+        try:
+            stacks.update(load_profile(path))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Skipping {path}: {e}")
+
+    sampled_ms = sum(stacks.values())
+    if not sampled_ms:
+        print("❌ Profiles contain no samples")
+        return
+
+    frames = hot_frames(stacks)
+    key = f"{args.sort}_ms"
+    print(f"🔬 {len(paths)} profiles, {sampled_ms:.0f}ms sampled\n")
+    print(f"{'self ms':>10} {'self %':>7} {'total ms':>10} {'total %':>8}  frame")
+    for label, times in sorted(frames.items(), key=lambda item: item[1][key], reverse=True)[:args.top]:
+        print(
+            f"{times['self_ms']:>10.1f} {100 * times['self_ms'] / sampled_ms:>6.1f}% "
+            f"{times['total_ms']:>10.1f} {100 * times['total_ms'] / sampled_ms:>7.1f}%  {label}"
+        )
+
+if __name__ == "__main__":
+    main()
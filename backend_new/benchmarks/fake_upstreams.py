@@ -0,0 +1,219 @@
+"""
+Local stand-ins for Spotify, Groq and Deepgram - for benchmarks without network
+
+One small FastAPI app serves all three APIs. Each service has its own
+latency (with optional jitter) and failure rate, so slow or flaky
+upstreams can be simulated. Point the backend at it through settings:
+
+    SPOTIFY_API_URL=http://127.0.0.1:9100/v1
+    SPOTIFY_TOKEN_URL=http://127.0.0.1:9100/api/token
+    GROQ_BASE_URL=http://127.0.0.1:9100
+    DEEPGRAM_API_URL=http://127.0.0.1:9100
+
+Usage (from backend_new/):
+    python -m benchmarks.fake_upstreams --port 9100 --groq-latency 0.8 --spotify-failure-rate 0.05
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SERVICES = ("spotify", "groq", "deepgram")
+
+MOODS = [
+    ("Very Positive", 0.8), ("Positive", 0.4), ("Neutral", 0.0),
+    ("Negative", -0.4), ("Very Negative", -0.8)
+]
+
+class UpstreamProfile:
+    """Latency and failure behaviour of one fake service"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter  # +/- fraction of latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+
+    def delay(self) -> float:
+        return self.latency * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def simulate(self, share: float = 1.0):
+        """
+        Wait the configured latency (or `share` of it, for streamed replies
+        that spend the rest streaming). Returns True if this call should fail
+        """
+        self.calls += 1
+        delay = self.delay() * share
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if random.random() < self.failure_rate:
+            self.failures += 1
+            return True
+        return False
+
+def unavailable() -> JSONResponse:
+    return JSONResponse({"error": "fake upstream failure"}, status_code=503)
+
+def fake_track(query: str, index: int) -> dict:
+    """Spotify track object with a stable URI per (query, index)"""
+    track_id = hashlib.md5(f"{query}:{index}".encode()).hexdigest()[:22]
+    return {
+        "name": f"{query} #{index}" if index else query,
+        "artists": [{"name": "Fake Artist"}],
+        "uri": f"spotify:track:{track_id}",
+        "album": {"images": [{"url": "https://example.com/art.jpg"}]},
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"}
+    }
+
+def groq_reply(prompt: str) -> str:
+    """Chat completion content in the (compact) shape MoodAnalyzer asks for"""
+    category, score = random.choice(MOODS)
+    analysis = {
+        "score": score,
+        "category": category,
+        "intensity": "moderate",
+        "description": f"Fake {category.lower()} mood",
+        "songs": [{"name": f"Fake Song {i}", "artist": f"Fake Artist {i}"} for i in range(5)],
+        "summary": "Benchmark summary from the fake Groq server."
+    }
+
+    # Batch prompts list the texts as [{"id": ..., "text": ...}], the schema adds one more "id"
+    if '"id"' in prompt:
+        count = prompt.count('"id"') - 1
+        return json.dumps({"results": [{"id": i, **analysis} for i in range(count)]})
+    return json.dumps(analysis)
+
+async def stream_groq_reply(content: str, model: str, duration: float):
+    """Chat completion chunks as Server-Sent Events, spread over `duration` seconds"""
+    pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+    for piece in pieces:
+        await asyncio.sleep(duration / len(pieces))
+        chunk = {
+            "id": "fake-completion",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+def create_app(profiles: dict) -> FastAPI:
+    """Fake upstream app; profiles maps service name -> UpstreamProfile"""
+    app = FastAPI(title="Groovi fake upstreams")
+    app.state.profiles = profiles
+
+    @app.post("/api/token")
+    async def spotify_token():
+        if await profiles["spotify"].simulate():
+            return unavailable()
+        return {"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600}
+
+    @app.get("/v1/search")
+    async def spotify_search(q: str, limit: int = 1):
+        if await profiles["spotify"].simulate():
+            return unavailable()
+        return {"tracks": {"items": [fake_track(q, i) for i in range(limit)]}}
+
+    @app.post("/openai/v1/chat/completions")
+    async def groq_chat(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+
+        if body.get("stream"):
+            # Time to first token, then the rest of the latency spent streaming
+            if await profiles["groq"].simulate(share=0.2):
+                return unavailable()
+            return StreamingResponse(
+                stream_groq_reply(groq_reply(prompt), body.get("model", "fake"), profiles["groq"].delay() * 0.8),
+                media_type="text/event-stream"
+            )
+
+        if await profiles["groq"].simulate():
+            return unavailable()
+        return {
+            "id": "fake-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": groq_reply(prompt)}
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    @app.post("/v1/listen")
+    async def deepgram_listen(request: Request):
+        audio = await request.body()
+        if await profiles["deepgram"].simulate():
+            return unavailable()
+        return {
+            "metadata": {
+                "request_id": "fake", "sha256": "", "created": "", "duration": len(audio) / 32000,
+                "channels": 1, "models": [], "model_info": {}
+            },
+            "results": {"channels": [{"alternatives": [{
+                "transcript": "I'm feeling pretty good about today",
+                "confidence": 0.99,
+                "words": []
+            }]}]}
+        }
+
+    @app.get("/_stats")
+    def stats():
+        """Calls and injected failures per service"""
+        return {
+            name: {"calls": profile.calls, "failures": profile.failures}
+            for name, profile in profiles.items()
+        }
+
+    return app
+
+def profiles_from_args(args) -> dict:
+    return {
+        name: UpstreamProfile(
+            latency=getattr(args, f"{name}_latency"),
+            jitter=args.jitter,
+            failure_rate=getattr(args, f"{name}_failure_rate")
+        )
+        for name in SERVICES
+    }
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """--<service>-latency / --<service>-failure-rate / --jitter options"""
+    defaults = {"spotify": 0.1, "groq": 0.5, "deepgram": 0.8}
+    for name in SERVICES:
+        parser.add_argument(f"--{name}-latency", type=float, default=defaults[name], help=f"Fake {name} latency (s)")
+        parser.add_argument(f"--{name}-failure-rate", type=float, default=0.0, help=f"Fraction of {name} calls that 503")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter, +/- fraction")
+
+def start_in_thread(app: FastAPI, port: int) -> uvicorn.Server:
+    """Serve the fake app on 127.0.0.1:port from a daemon thread"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Spotify/Groq/Deepgram servers")
+    parser.add_argument("--port", type=int, default=9100)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"🎵 Fake upstreams on http://127.0.0.1:{args.port}")
+    uvicorn.run(create_app(profiles_from_args(args)), host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
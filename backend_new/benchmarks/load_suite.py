@@ -0,0 +1,220 @@
+"""
+Offline load test for /recommend and /transcribe
+
+Starts the fake Spotify/Groq/Deepgram servers (benchmarks/fake_upstreams.py)
+and the real API, wired together through settings, then drives each
+endpoint at the given concurrency levels. Everything runs locally, so
+results are reproducible and need no API keys or network.
+
+Reports throughput, p50/p95/p99 latency and status codes per run, which
+SongRecommender strategy served the recommendations (from /metrics), and
+how many upstream calls were made / failed.
+
+Usage (from backend_new/):
+    python -m benchmarks.load_suite --requests 300 --concurrency 10,50
+    python -m benchmarks.load_suite --spotify-failure-rate 0.2 --groq-latency 2
+    python -m benchmarks.load_suite --output before.json
+    python -m benchmarks.load_suite --baseline before.json  # exit 1 on p95 regression
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from benchmarks.fake_upstreams import add_profile_arguments, create_app, profiles_from_args, start_in_thread
+
+TEXTS = [
+    "I'm feeling amazing today, just got great news!",
+    "Pretty relaxed evening, nothing special going on.",
+    "Work was exhausting and I'm a bit down.",
+    "I miss my friends so much, everything feels heavy.",
+    "Can't stop smiling, the weather is perfect!",
+    "Kind of bored, not sure what to do with myself.",
+]
+
+def configure_environment(args, fake_url: str):
+    """Point the backend at the fakes - must run before the app is imported"""
+    os.environ.update({
+        "SPOTIPY_CLIENT_ID": "benchmark",
+        "SPOTIPY_CLIENT_SECRET": "benchmark",
+        "GROQ_API_KEY": "benchmark",
+        "DEEPGRAM_API_KEY": "benchmark",
+        "SPOTIFY_API_URL": f"{fake_url}/v1",
+        "SPOTIFY_TOKEN_URL": f"{fake_url}/api/token",
+        "GROQ_BASE_URL": fake_url,
+        "DEEPGRAM_API_URL": fake_url,
+        # Strategy 2 should go through (fake) Spotify, not a pre-built index
+        "LIBRARY_INDEX_PATH": os.path.join(tempfile.mkdtemp(), "library_index.json"),
+        "LIBRARY_INDEX_BUILD_ON_STARTUP": "false",
+        "TRANSCRIBE_MAX_IN_FLIGHT": str(args.transcribe_slots),
+    })
+    if not args.with_caches:
+        # Measure the request path, not the caches
+        os.environ["SPOTIFY_CACHE_SIZE"] = "0"
+        os.environ["MOOD_CACHE_SIZE"] = "0"
+        os.environ["TRANSCRIPT_CACHE_SIZE"] = "0"  # Every upload is the same buffer
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def strategy_counts(metrics_text: str) -> dict:
+    """groovi_recommend_strategy_total by strategy"""
+    counts = {}
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name == "groovi_recommend_strategy":
+            for sample in family.samples:
+                if sample.name.endswith("_total"):
+                    counts[sample.labels["strategy"]] = sample.value
+    return counts
+
+async def run_load(client: httpx.AsyncClient, scenario: str, total: int, concurrency: int, audio: bytes) -> dict:
+    """Fire `total` requests for one scenario, `concurrency` at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one_request(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if scenario == "recommend":
+                    response = await client.post("/recommend", json={"text": f"{random.choice(TEXTS)} #{i}"})
+                else:
+                    response = await client.post(
+                        "/transcribe", files={"audio": ("recording.webm", audio, "audio/webm")}
+                    )
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(1000 * percentile(latencies, 50), 1),
+        "p95_ms": round(1000 * percentile(latencies, 95), 1),
+        "p99_ms": round(1000 * percentile(latencies, 99), 1),
+        "statuses": statuses,
+    }
+
+def print_results(results: list, strategies: dict, upstream_stats: dict):
+    print(f"\n{'scenario':>10} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for r in results:
+        statuses = ", ".join(f"{code}: {n}" for code, n in sorted(r["statuses"].items()))
+        print(f"{r['scenario']:>10} {r['concurrency']:>5} {r['rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}  {statuses}")
+
+    served = sum(strategies.values())
+    if served:
+        print("\n🎵 Strategy usage (/recommend)")
+        for strategy, count in sorted(strategies.items(), key=lambda item: -item[1]):
+            print(f"{strategy:>14}: {int(count):>6} ({100 * count / served:.1f}%)")
+
+    print("\n🌐 Upstream calls (failures injected)")
+    for service, stats in upstream_stats.items():
+        print(f"{service:>14}: {stats['calls']:>6} ({stats['failures']} failed)")
+
+def compare_to_baseline(results: list, baseline_path: str, max_regression: float) -> bool:
+    """True if no run's p95 got more than max_regression slower than the baseline"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\n📊 p95 vs {baseline_path}")
+    for r in results:
+        before = baseline.get((r["scenario"], r["concurrency"]))
+        if not before or not before["p95_ms"]:
+            continue
+        change = r["p95_ms"] / before["p95_ms"] - 1
+        flag = "❌" if change > max_regression else "✅"
+        ok = ok and change <= max_regression
+        print(f"{flag} {r['scenario']} @ {r['concurrency']}: {before['p95_ms']} → {r['p95_ms']} ms ({change:+.0%})")
+    return ok
+
+async def run_suite(args, api_url: str, audio: bytes) -> tuple:
+    limits = httpx.Limits(max_connections=max(args.concurrency_levels), max_keepalive_connections=max(args.concurrency_levels))
+    async with httpx.AsyncClient(base_url=api_url, timeout=None, limits=limits) as client:
+        strategies_before = strategy_counts((await client.get("/metrics")).text)
+
+        results = []
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency_levels:
+                # Services print per request - keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results.append(await run_load(client, scenario, args.requests, concurrency, audio))
+                print(f"✅ {scenario} @ {concurrency}: {results[-1]['rps']} req/s")
+
+        strategies_after = strategy_counts((await client.get("/metrics")).text)
+        strategies = {
+            name: count - strategies_before.get(name, 0)
+            for name, count in strategies_after.items()
+        }
+    return results, strategies
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against fake upstreams")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", default="10,50", help="Comma-separated concurrency levels")
+    parser.add_argument("--scenarios", default="recommend,transcribe", help="recommend and/or transcribe")
+    parser.add_argument("--audio-kb", type=int, default=64, help="Size of the fake upload for /transcribe")
+    parser.add_argument("--transcribe-slots", type=int, default=16, help="TRANSCRIBE_MAX_IN_FLIGHT for the API (excess gets 429)")
+    parser.add_argument("--with-caches", action="store_true", help="Keep the Spotify/mood/transcript caches on")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--api-port", type=int, default=9101)
+    parser.add_argument("--output", help="Write results as JSON (e.g. to use as a baseline)")
+    parser.add_argument("--baseline", help="Earlier --output file to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 slowdown vs baseline")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    args.concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    args.scenarios = [s.strip() for s in args.scenarios.split(",")]
+
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    fake_app = create_app(profiles_from_args(args))
+    start_in_thread(fake_app, args.fake_port)
+
+    configure_environment(args, fake_url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from main import app  # Imported only now so settings pick up the fake URLs
+        start_in_thread(app, args.api_port)
+
+    print(f"🎵 {args.requests} requests per run | latency (s) spotify {args.spotify_latency}, "
+          f"groq {args.groq_latency}, deepgram {args.deepgram_latency} | failure rate spotify "
+          f"{args.spotify_failure_rate}, groq {args.groq_failure_rate}, deepgram {args.deepgram_failure_rate}")
+
+    audio = os.urandom(args.audio_kb * 1024)
+    results, strategies = asyncio.run(run_suite(args, f"http://127.0.0.1:{args.api_port}", audio))
+    upstream_stats = httpx.get(f"{fake_url}/_stats").json()
+
+    print_results(results, strategies, upstream_stats)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": sys.argv[1:], "results": results, "strategies": strategies}, f, indent=1)
+        print(f"\n✅ Results saved to {args.output}")
+
+    if args.baseline and not compare_to_baseline(results, args.baseline, args.max_regression):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Load benchmark for /recommend - sync (threadpool) vs async handler
+
+Upstream APIs are replaced with fakes that just wait a fixed latency,
+so the numbers show how many concurrent requests each handler style can
+overlap, not how fast Groq or Spotify are.
+
+Usage (from backend_new/):
+    python -m benchmarks.recommend_load --requests 400 --concurrency 50,200
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+
+os.environ.setdefault("SPOTIPY_CLIENT_ID", "benchmark")
+os.environ.setdefault("SPOTIPY_CLIENT_SECRET", "benchmark")
+os.environ.setdefault("SPOTIFY_CACHE_SIZE", "0")  # Measure the handlers, not the caches
+os.environ.setdefault("MOOD_CACHE_SIZE", "0")
+
+import httpx
+from models.schemas import TextInput
+from services.mood_analyzer import mood_analyzer
+from services.song_recommender import song_recommender
+from services.spotify_client import spotify_client
+from main import app
+
+GROQ_REPLY = json.dumps({
+    "score": 0.6,
+    "category": "Positive",
+    "intensity": "moderate",
+    "description": "You're in a good mood!",
+    "songs": [{"name": f"Song {i}", "artist": f"Artist {i}"} for i in range(5)],
+    "summary": "Benchmark summary"
+})
+
+def fake_track(query: str, index: int) -> dict:
+    """Minimal Spotify track object"""
+    return {
+        "name": f"{query} #{index}",
+        "artists": [{"name": "Benchmark Artist"}],
+        "uri": f"spotify:track:{abs(hash((query, index)))}",
+        "album": {"images": [{"url": "https://example.com/art.jpg"}]},
+        "external_urls": {"spotify": "https://open.spotify.com/track/benchmark"}
+    }
+
+class _Namespace:
+    """Tiny attribute bag used to mimic SDK response objects"""
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+def groq_response() -> _Namespace:
+    return _Namespace(choices=[_Namespace(message=_Namespace(content=GROQ_REPLY))])
+
+class FakeGroqStream:
+    """Mimics AsyncGroq's streamed completion - GROQ_REPLY in small chunks"""
+    def __init__(self):
+        self.pieces = [GROQ_REPLY[i:i + 16] for i in range(0, len(GROQ_REPLY), 16)]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for piece in self.pieces:
+            yield _Namespace(choices=[_Namespace(delta=_Namespace(content=piece))])
+
+def install_fakes(groq_latency: float, spotify_latency: float):
+    """Swap real upstream clients for fixed-latency fakes"""
+    def create_sync(**kwargs):
+        time.sleep(groq_latency)
+        return groq_response()
+
+    async def create_async(**kwargs):
+        await asyncio.sleep(groq_latency)
+        return FakeGroqStream() if kwargs.get("stream") else groq_response()
+
+    # The clients are lazy read-only properties - fill in what they'd build
+    mood_analyzer._groq = _Namespace(chat=_Namespace(completions=_Namespace(create=create_sync)))
+    mood_analyzer._groq_async = _Namespace(chat=_Namespace(completions=_Namespace(create=create_async)))
+    mood_analyzer._groq_loaded = True
+
+    def search_sync(q, type, limit):
+        time.sleep(spotify_latency)
+        return {"tracks": {"items": [fake_track(q, i) for i in range(limit)]}}
+
+    spotify_client._client = _Namespace(search=search_sync)
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/token"):
+            return httpx.Response(200, json={"access_token": "benchmark", "expires_in": 3600})
+        await asyncio.sleep(spotify_latency)
+        query = request.url.params["q"]
+        limit = int(request.url.params["limit"])
+        return httpx.Response(200, json={"tracks": {"items": [fake_track(query, i) for i in range(limit)]}})
+
+    spotify_client.http = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+@app.post("/benchmark/recommend-sync")
+def recommend_songs_sync(text_input: TextInput):
+    """The pre-async handler: a sync def that runs in Starlette's threadpool"""
+    mood_analysis, groq_song_recs = mood_analyzer.analyze(text_input.text)
+    songs = song_recommender.recommend(mood_analysis, groq_song_recs)
+    return {"mood_analysis": mood_analysis, "songs": songs[:5]}
+
+async def run_load(path: str, total: int, concurrency: int) -> tuple:
+    """Fire `total` requests at `path`, `concurrency` at a time. Returns (seconds, failures)"""
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def one_request(i: int):
+            nonlocal failures
+            async with semaphore:
+                response = await client.post(path, json={"text": f"I'm feeling great today #{i}"})
+                if response.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request(i) for i in range(total)))
+        return time.perf_counter() - start, failures
+
+async def run_benchmark(args):
+    print(f"🎵 {args.requests} requests, Groq {args.groq_latency}s, Spotify {args.spotify_latency}s")
+    print(f"{'concurrency':>12} {'sync req/s':>12} {'async req/s':>12} {'speedup':>9}")
+
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        # Services print per request - keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_time, sync_failures = await run_load("/benchmark/recommend-sync", args.requests, concurrency)
+            async_time, async_failures = await run_load("/recommend", args.requests, concurrency)
+
+        sync_rps = args.requests / sync_time
+        async_rps = args.requests / async_time
+        print(f"{concurrency:>12} {sync_rps:>12.1f} {async_rps:>12.1f} {async_rps / sync_rps:>8.1f}x")
+
+        if sync_failures or async_failures:
+            print(f"⚠️ Failures - sync: {sync_failures}, async: {async_failures}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /recommend sync vs async")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per run")
+    parser.add_argument("--concurrency", default="10,50,200", help="Comma-separated concurrency levels")
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="Fake Groq latency (s)")
+    parser.add_argument("--spotify-latency", type=float, default=0.1, help="Fake Spotify latency (s)")
+    args = parser.parse_args()
+
+    install_fakes(args.groq_latency, args.spotify_latency)
+    asyncio.run(run_benchmark(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Build the curated library index (run offline or before deploys)"""
+
+import asyncio
+from services.library_index import library_index
+from services.spotify_client import spotify_client
+
+async def build():
+    print("🎵 Resolving curated mood libraries on Spotify...")
+    await library_index.build_async()
+    await spotify_client.close()
+
+    if not library_index.ready:
+        print("❌ No songs resolved - index not written")
+        return False
+
+    library_index.save()
+    print(f"✅ Library index saved to {library_index.path}")
+    return True
+
+if __name__ == "__main__":
+    asyncio.run(build())
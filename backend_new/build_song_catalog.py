@@ -0,0 +1,111 @@
+"""
+Build the local song catalog from a CSV of tracks (run offline or before deploys)
+
+    python build_song_catalog.py tracks.csv
+    python build_song_catalog.py tracks.csv --out data/catalog
+
+Columns (header names, case-insensitive - the common Spotify dataset
+exports work as they are):
+    name | track_name, artist | artists, valence, energy (0-1)
+    tags | genres | track_genre  - separated by ";" or ","
+    uri | track_id, album_art, external_url  - optional
+
+Songs listed more than once (e.g. once per genre) are merged, tags combined.
+"""
+
+import argparse
+import csv
+import time
+from config.settings import settings
+from services.song_catalog import write_catalog
+
+ALIASES = {
+    "name": ("name", "track_name", "title"),
+    "artist": ("artist", "artists", "artist_name"),
+    "valence": ("valence",),
+    "energy": ("energy",),
+    "tags": ("tags", "genres", "track_genre", "genre"),
+    "uri": ("uri", "track_uri"),
+    "track_id": ("track_id", "id"),
+    "album_art": ("album_art", "image", "image_url"),
+    "external_url": ("external_url", "url")
+}
+DEFAULT_ALBUM_ART = "https://i.scdn.co/image/ab67616d0000b273c8b444df094279e70d0ed856"
+
+def _columns(header: list) -> dict:
+    lowered = {name.strip().lower(): name for name in header}
+    columns = {}
+    for field, aliases in ALIASES.items():
+        columns[field] = next((lowered[alias] for alias in aliases if alias in lowered), None)
+    missing = [field for field in ("name", "artist", "valence", "energy") if not columns[field]]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    return columns
+
+def read_tracks(csv_path: str) -> list:
+    """Catalog rows from the CSV - rows without usable valence/energy are skipped"""
+    tracks = {}
+    skipped = 0
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns = _columns(reader.fieldnames or [])
+
+        def get(row: dict, field: str) -> str:
+            return (row.get(columns[field]) or "").strip() if columns[field] else ""
+
+        for row in reader:
+            name, artist = get(row, "name"), get(row, "artist")
+            try:
+                valence, energy = float(get(row, "valence")), float(get(row, "energy"))
+            except ValueError:
+                skipped += 1
+                continue
+            if not name or not artist or not (0 <= valence <= 1 and 0 <= energy <= 1):
+                skipped += 1
+                continue
+
+            tags = {tag.strip().lower() for tag in get(row, "tags").replace(",", ";").split(";") if tag.strip()}
+            key = (name.lower(), artist.lower())
+            if key in tracks:
+                tracks[key]["tags"] |= tags
+                continue
+
+            track_id = get(row, "track_id")
+            uri = get(row, "uri") or (f"spotify:track:{track_id}" if track_id else f"spotify:track:catalog_{len(tracks)}")
+            tracks[key] = {
+                "name": name,
+                "artist": artist.replace(";", ", "),
+                "uri": uri,
+                "album_art": get(row, "album_art") or DEFAULT_ALBUM_ART,
+                "external_url": get(row, "external_url") or (
+                    f"https://open.spotify.com/track/{track_id}" if track_id
+                    else f"https://open.spotify.com/search/{name} {artist}"
+                ),
+                "valence": valence,
+                "energy": energy,
+                "tags": tags
+            }
+
+    if skipped:
+        print(f"⚠️ Skipped {skipped} rows without name/artist or valid valence/energy")
+    return list(tracks.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local song catalog from a CSV")
+    parser.add_argument("csv_path", help="CSV of tracks with valence/energy/tags")
+    parser.add_argument("--out", default=settings.SONG_CATALOG_PATH, help="Catalog directory (default SONG_CATALOG_PATH)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print(f"🎵 Reading {args.csv_path}...")
+    tracks = read_tracks(args.csv_path)
+    if not tracks:
+        print("❌ No usable tracks - catalog not written")
+        return False
+
+    count = write_catalog(tracks, args.out)
+    print(f"✅ Song catalog: {count} tracks written to {args.out} in {time.perf_counter() - start:.1f}s")
+    return True
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,144 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# backend_new/ - data files are resolved from here, not the working directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Settings:
     """Centralized settings for API keys and configuration"""
     
     # Spotify API
     SPOTIPY_CLIENT_ID = os.getenv("SPOTIPY_CLIENT_ID")
     SPOTIPY_CLIENT_SECRET = os.getenv("SPOTIPY_CLIENT_SECRET")
+    SPOTIFY_SEARCH_CONCURRENCY = int(os.getenv("SPOTIFY_SEARCH_CONCURRENCY", "5"))  # Parallel searches per request
+    SPOTIFY_SEARCH_POOL_SIZE = int(os.getenv("SPOTIFY_SEARCH_POOL_SIZE", "32"))  # Search threads shared by sync requests
+    SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+    SPOTIFY_TOKEN_URL = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+    SPOTIFY_TIMEOUT = float(os.getenv("SPOTIFY_TIMEOUT", "10"))  # Seconds per Web API call
+    SPOTIFY_TOKEN_REFRESH_MARGIN = int(os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", "300"))  # Refresh this long before expiry
+    
+    SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "true").lower() == "true"  # Start curated searches for the VADER mood during Groq
+    
+    # Batch recommendations - max texts per request, items resolving songs at once
+    BATCH_MAX_TEXTS = int(os.getenv("BATCH_MAX_TEXTS", "500"))
+    BATCH_ITEM_CONCURRENCY = int(os.getenv("BATCH_ITEM_CONCURRENCY", "10"))
+    
+    # Spotify search cache - memory LRU per worker, optional SQLite file shared by workers
+    SPOTIFY_CACHE_SIZE = int(os.getenv("SPOTIFY_CACHE_SIZE", "2048"))  # 0 disables the cache
+    SPOTIFY_CACHE_TTL = int(os.getenv("SPOTIFY_CACHE_TTL", str(24 * 60 * 60)))  # Seconds
+    SPOTIFY_CACHE_NEGATIVE_TTL = int(os.getenv("SPOTIFY_CACHE_NEGATIVE_TTL", "30"))  # Failed/empty searches
+    SPOTIFY_CACHE_DB_PATH = os.getenv("SPOTIFY_CACHE_DB_PATH")  # e.g. .cache/spotify.db
+    
+    # Curated library index - MOOD_SONG_LIBRARIES pre-resolved on Spotify
+    LIBRARY_INDEX_PATH = os.getenv("LIBRARY_INDEX_PATH", os.path.join(BASE_DIR, "data", "library_index.json"))
+    LIBRARY_INDEX_BUILD_ON_STARTUP = os.getenv("LIBRARY_INDEX_BUILD_ON_STARTUP", "true").lower() == "true"
+    
+    # Local song catalog - memory-mapped tracks with valence/energy/tags (build_song_catalog.py), no Spotify calls
+    SONG_CATALOG_PATH = os.getenv("SONG_CATALOG_PATH", os.path.join(BASE_DIR, "data", "catalog"))
+    SONG_CATALOG_CANDIDATES = int(os.getenv("SONG_CATALOG_CANDIDATES", "50"))  # Nearest tracks picked from, for variety
     
     # AI Services
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # None = Groq's default; override for local stand-ins
+    DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "api.deepgram.com")
+    
+    # Groq latency - hard timeout, plus an optional budget after which VADER is used
+    GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "20"))  # Seconds
+    GROQ_LATENCY_BUDGET = float(os.getenv("GROQ_LATENCY_BUDGET", "0"))  # Seconds, 0 = wait for Groq
+    GROQ_BACKGROUND_COMPLETION = os.getenv("GROQ_BACKGROUND_COMPLETION", "true").lower() == "true"  # Warm cache after budget
+    DEEPGRAM_TIMEOUT = float(os.getenv("DEEPGRAM_TIMEOUT", "60"))  # Seconds per prerecorded transcription
+    
+    # Groq replies - compact JSON schema with a tight token budget, streamed and parsed as it arrives
+    GROQ_MAX_TOKENS = int(os.getenv("GROQ_MAX_TOKENS", "600"))  # Per analyzed text
+    GROQ_JSON_MODE = os.getenv("GROQ_JSON_MODE", "true").lower() == "true"  # response_format=json_object (non-streamed calls)
+    GROQ_STREAM = os.getenv("GROQ_STREAM", "true").lower() == "true"  # Stream replies so song searches start early
+    
+    # Shared HTTP pools (one per upstream service) - keep-alive and jittered retries on 429/5xx
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))  # Per service
+    HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))  # Idle connections kept open per service
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # Seconds an idle connection is kept
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # Seconds
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))  # 0 disables retries
+    HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.25"))  # Seconds, doubled per attempt
+    HTTP_RETRY_MAX_DELAY = float(os.getenv("HTTP_RETRY_MAX_DELAY", "4"))  # Seconds, caps backoff and Retry-After
+    
+    # Upstream protection - circuit breaker per service, skipped to the next strategy while open
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # Failures in a row that open it
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))  # Seconds before a trial call
+    SPOTIFY_SLOW_CALL = float(os.getenv("SPOTIFY_SLOW_CALL", "5"))  # Seconds - slower calls count as failures
+    GROQ_SLOW_CALL = float(os.getenv("GROQ_SLOW_CALL", "15"))
+    DEEPGRAM_SLOW_CALL = float(os.getenv("DEEPGRAM_SLOW_CALL", "30"))
+    
+    # Adaptive rate limits - requests/second per service (0 = only honor Retry-After), halved on 429
+    SPOTIFY_RATE_LIMIT = float(os.getenv("SPOTIFY_RATE_LIMIT", "0"))
+    GROQ_RATE_LIMIT = float(os.getenv("GROQ_RATE_LIMIT", "0"))
+    DEEPGRAM_RATE_LIMIT = float(os.getenv("DEEPGRAM_RATE_LIMIT", "0"))
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "2"))  # Seconds a call may queue before failing fast
+    
+    # Batch analysis - texts packed into each Groq prompt, prompts in flight at once
+    GROQ_BATCH_SIZE = int(os.getenv("GROQ_BATCH_SIZE", "5"))
+    GROQ_BATCH_CONCURRENCY = int(os.getenv("GROQ_BATCH_CONCURRENCY", "2"))
+    
+    # Mood analysis cache - Groq results keyed on normalized input text
+    MOOD_CACHE_SIZE = int(os.getenv("MOOD_CACHE_SIZE", "1024"))  # 0 disables the cache
+    MOOD_CACHE_TTL = int(os.getenv("MOOD_CACHE_TTL", str(60 * 60)))  # Seconds
+    MOOD_CACHE_POLICY = os.getenv("MOOD_CACHE_POLICY", "lru")  # "lru" or "fifo"
+    
+    # Local sentiment - vectorized VADER scoring for plain texts, "false" = always per-call VADER
+    SENTIMENT_FAST_PATH = os.getenv("SENTIMENT_FAST_PATH", "true").lower() == "true"
+    
+    # Transcription - uploads beyond this many in flight per worker get a 429
+    TRANSCRIBE_MAX_IN_FLIGHT = int(os.getenv("TRANSCRIBE_MAX_IN_FLIGHT", "4"))
+    TRANSCRIBE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE = 64 * 1024  # Uploads are read/streamed in 64KB chunks
+    
+    # Transcript cache - keyed on a hash of the uploaded bytes, so re-sent files skip Deepgram
+    TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", "512"))  # 0 disables the cache
+    TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(24 * 60 * 60)))  # Seconds
+    TRANSCRIPT_CACHE_DB_PATH = os.getenv("TRANSCRIPT_CACHE_DB_PATH")  # e.g. .cache/transcripts.db, shared by workers
+    
+    # Transcription jobs - POST /transcribe/jobs queues uploads for a background worker pool
+    TRANSCRIBE_JOBS_DIR = os.getenv("TRANSCRIBE_JOBS_DIR", os.path.join(BASE_DIR, "data", "jobs"))  # SQLite queue + audio, shared by workers
+    TRANSCRIBE_JOB_WORKERS = int(os.getenv("TRANSCRIBE_JOB_WORKERS", "2"))  # Jobs transcribed at once per worker process
+    TRANSCRIBE_JOB_MAX_QUEUED = int(os.getenv("TRANSCRIBE_JOB_MAX_QUEUED", "100"))  # More waiting jobs get a 429
+    TRANSCRIBE_JOB_LEASE = float(os.getenv("TRANSCRIBE_JOB_LEASE", "300"))  # Seconds before a job whose process died runs again
+    TRANSCRIBE_JOB_MAX_ATTEMPTS = int(os.getenv("TRANSCRIBE_JOB_MAX_ATTEMPTS", "3"))
+    TRANSCRIBE_JOB_TTL = int(os.getenv("TRANSCRIBE_JOB_TTL", str(60 * 60)))  # Seconds finished jobs stay fetchable
+    TRANSCRIBE_JOB_MAX_WAIT = float(os.getenv("TRANSCRIBE_JOB_MAX_WAIT", "30"))  # Longest long-poll (?wait=)
+    TRANSCRIBE_JOB_POLL_INTERVAL = float(os.getenv("TRANSCRIBE_JOB_POLL_INTERVAL", "0.5"))  # Seconds between queue checks
+    
+    # Audio preprocessing - real durations from headers; mono 16kHz, silence trimmed, re-encoded before upload
+    AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "true").lower() == "true"  # "false" = only read the duration
+    AUDIO_PREPROCESS_WORKERS = int(os.getenv("AUDIO_PREPROCESS_WORKERS", "2"))  # Decode/encode threads per worker
+    AUDIO_TARGET_SAMPLE_RATE = int(os.getenv("AUDIO_TARGET_SAMPLE_RATE", "16000"))
+    AUDIO_SILENCE_THRESHOLD_DB = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DB", "-45"))  # dBFS - quieter counts as silence
+    AUDIO_SILENCE_PADDING = float(os.getenv("AUDIO_SILENCE_PADDING", "0.25"))  # Seconds kept around the sound
+    AUDIO_MIN_SOUND_SECONDS = float(os.getenv("AUDIO_MIN_SOUND_SECONDS", "0.1"))  # Less sound than this is rejected
+    AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")  # Needs ffmpeg, otherwise 16-bit WAV is sent
+    FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")  # Decodes non-WAV uploads and encodes Opus
+    
+    # Live transcription over WebSocket - "deepgram", or "local" (no-network stand-in)
+    TRANSCRIBE_STREAM_BACKEND = os.getenv("TRANSCRIBE_STREAM_BACKEND", "deepgram")
+    TRANSCRIBE_STREAM_MAX_SESSIONS = int(os.getenv("TRANSCRIBE_STREAM_MAX_SESSIONS", "20"))  # Per worker
+    TRANSCRIBE_STREAM_FINISH_TIMEOUT = float(os.getenv("TRANSCRIBE_STREAM_FINISH_TIMEOUT", "5"))  # Seconds to flush finals
+    
+    # Observability - Server-Timing header with per-stage/upstream timings on every response
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    
+    # Request profiling - sampling profiler for requests with X-Profile: <token> (or ?profile=<token>) or sampled
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+    PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")  # Admin token - empty = only PROFILE_SAMPLE_RATE
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Fraction of requests profiled, e.g. 0.01
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # Seconds between samples
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+    PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope")  # "speedscope" or "collapsed" (flamegraph.pl)
+    
+    # Server - `python start_server.py --prod` runs workers without reload
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0"))  # 0 = one per CPU core
+    SHUTDOWN_GRACE_PERIOD = float(os.getenv("SHUTDOWN_GRACE_PERIOD", "30"))  # Seconds in-flight requests get to finish
     
     # CORS - Frontend URLs allowed to access API
     ALLOWED_ORIGINS = [
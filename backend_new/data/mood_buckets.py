@@ -0,0 +1,35 @@
+"""Mood buckets for local (VADER) sentiment scores - lowest to highest"""
+
+# min_score: a score belongs to the highest bucket whose min_score it reaches
+MOOD_BUCKETS = [
+    {
+        "min_score": float("-inf"),
+        "category": "Very Negative",
+        "description": "You're going through a tough time.",
+        "summary": "In your darkest moments, music becomes a lifeline. These songs are chosen with care to honor your feelings while gently offering hope and healing. You're stronger than you know, and sometimes recovery begins with the right song."
+    },
+    {
+        "min_score": -0.5,
+        "category": "Negative",
+        "description": "You're feeling a bit down or melancholic.",
+        "summary": "Life has its challenging moments, and music has this incredible power to be your companion through them. These songs offer comfort, hope, and a reminder that you're not alone. Music can be the bridge that carries us back to brighter days."
+    },
+    {
+        "min_score": -0.1,
+        "category": "Neutral",
+        "description": "You're feeling calm and balanced.",
+        "summary": "There's something beautiful about finding balance in life. This peaceful state is perfect for discovering music that speaks to your soul. These songs will complement your tranquil mood and add a gentle spark to your day."
+    },
+    {
+        "min_score": 0.1,
+        "category": "Positive",
+        "description": "You're in a good, upbeat mood!",
+        "summary": "You're glowing with positive energy! This upbeat mood calls for music that celebrates life's wonderful moments. These songs will be your perfect companions as you ride this wave of happiness. Let the melodies lift you even higher!"
+    },
+    {
+        "min_score": 0.5,
+        "category": "Very Positive",
+        "description": "You're feeling fantastic and energetic!",
+        "summary": "What an incredible energy you're radiating! Your positivity is infectious and it's the perfect time to celebrate with music that matches your soaring spirits. Whether you're dancing or conquering the world, these songs will amplify your amazing mood and keep those good vibes flowing!"
+    },
+]
@@ -3,20 +3,116 @@ Groovi Music Recommender API
 Clean routes that delegate to service layer
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import asyncio
+import hashlib
+import json
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from models.schemas import TextInput, RecommendationResponse, TranscriptionResponse
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from models.schemas import (
+    TextInput, BatchTextInput, RecommendationResponse, BatchRecommendationItem, TranscriptionResponse, TranscriptionJob
+)
 from services.mood_analyzer import mood_analyzer
-from services.song_recommender import song_recommender
+from services.song_recommender import SearchMemo, song_recommender
 from services.audio_transcriber import audio_transcriber
+from services.audio_preprocessor import audio_preprocessor
+from services.streaming_transcriber import streaming_transcriber
+from services.spotify_client import spotify_client
+from services.library_index import library_index
+from services.song_catalog import song_catalog
+from services.transcription_jobs import transcription_jobs, QueueFullError
 from config.settings import settings
+from utils.http_transport import http_pools
+from utils.metrics import RequestMetricsMiddleware, register_stats, track_stage
+from utils.profiling import ProfilingMiddleware
+from utils.resilience import CircuitOpenError, RateLimitedError, circuit_breakers, resilience_stats
+from utils.uploads import UploadSizeLimitMiddleware, measure_upload, upload_too_large
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks"""
+    # Clients are built here, per worker process, not at import time
+    spotify_client.preload()
+    mood_analyzer.preload()
+    audio_transcriber.preload()
+    
+    # Local song catalog (optional) - memory-mapped, so loading is instant
+    song_catalog.load()
+    
+    # Curated library index - load it, or build it in the background
+    index_build = None
+    if not library_index.load() and settings.LIBRARY_INDEX_BUILD_ON_STARTUP:
+        print("🎵 Building library index in the background...")
+        index_build = asyncio.create_task(library_index.build_and_save_async())
+    
+    # Keep the Spotify token fresh so no request waits on a token fetch
+    spotify_client.start_token_refresh()
+    
+    # Transcription job workers - picks up jobs still queued from before a restart
+    await transcription_jobs.start()
+    
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    
+    # uvicorn has drained in-flight requests by now (SHUTDOWN_GRACE_PERIOD)
+    if index_build and not index_build.done():
+        index_build.cancel()
+    mood_analyzer.cancel_background_tasks()
+    await transcription_jobs.stop()
+    await spotify_client.close()
+    await http_pools.aclose()
 
 # Initialize FastAPI
 app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
-    description="AI-powered mood analysis and song recommendations"
+    description="AI-powered mood analysis and song recommendations",
+    lifespan=lifespan
 )
+app.state.ready = False
+
+# Per-worker cap on concurrent transcriptions (excess uploads are shed)
+transcription_slots = asyncio.Semaphore(settings.TRANSCRIBE_MAX_IN_FLIGHT)
+live_transcription_slots = asyncio.Semaphore(settings.TRANSCRIBE_STREAM_MAX_SESSIONS)
+
+# Abort oversized uploads while they stream in, before they are buffered
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths=("/transcribe", "/transcribe/jobs"),
+    max_bytes=settings.TRANSCRIBE_MAX_UPLOAD_BYTES
+)
+
+# Opt-in sampling profiler - per request (admin token) or a sampled fraction
+if settings.PROFILE_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.PROFILE_DIR,
+        token=settings.PROFILE_TOKEN,
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        interval=settings.PROFILE_INTERVAL,
+        fmt=settings.PROFILE_FORMAT
+    )
+
+# Request latency histogram + optional Server-Timing header
+app.add_middleware(RequestMetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
+# Cache counters from /stats, exported on /metrics too
+register_stats({
+    "mood_cache": mood_analyzer.cache.stats,
+    "sentiment": mood_analyzer.sentiment.stats,
+    "spotify_search_cache": spotify_client.search_cache.stats,
+    "transcript_cache": audio_transcriber.transcript_cache.stats,
+    "audio_preprocessing": audio_preprocessor.stats,
+    "transcription_jobs": transcription_jobs.stats,
+    "song_catalog": song_catalog.stats,
+    "groq_coalescing": mood_analyzer.groq_flight.stats,
+    "spotify_coalescing": spotify_client.search_flight.stats,
+    "upstream": resilience_stats
+})
 
 # Configure CORS
 app.add_middleware(
@@ -36,46 +132,248 @@ def root():
         "status": "healthy"
     }
 
+@app.get("/ready")
+def ready(response: Response):
+    """
+    Readiness check - 200 once this worker has started and every configured
+    upstream client is initialized, 503 otherwise (starting or shutting down)
+    An open circuit doesn't make the worker unready - requests fall back
+    """
+    clients = {
+        "spotify": spotify_client.status(),
+        **mood_analyzer.status(),
+        "deepgram": audio_transcriber.status()
+    }
+    is_ready = app.state.ready and all(
+        client["initialized"] for client in clients.values() if client["configured"]
+    )
+    response.status_code = 200 if is_ready else 503
+    return {
+        "ready": is_ready,
+        "clients": clients,
+        "circuits": {service: breaker.state for service, breaker in circuit_breakers.items()},
+        "library_index": library_index.ready,
+        "song_catalog": song_catalog.ready
+    }
+
+@app.get("/stats")
+def stats():
+    """Cache and coalescing counters, timings and upstream circuit/rate limit state for monitoring"""
+    return {
+        "mood_cache": mood_analyzer.cache.stats(),
+        "mood_analysis_timings": mood_analyzer.timings.stats(),
+        "sentiment": mood_analyzer.sentiment.stats(),
+        "spotify_search_cache": spotify_client.search_cache.stats(),
+        "transcript_cache": audio_transcriber.transcript_cache.stats(),
+        "audio_preprocessing": audio_preprocessor.stats(),
+        "transcription_jobs": transcription_jobs.stats(),
+        "coalescing": {
+            "groq_analyze": mood_analyzer.groq_flight.stats(),
+            "spotify_search": spotify_client.search_flight.stats()
+        },
+        "library_index": {"ready": library_index.ready, "built_at": library_index.built_at},
+        "song_catalog": song_catalog.stats(),
+        "upstream": resilience_stats()
+    }
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics - upstream/stage latency histograms, strategy and
+    error counters, cache stats (per worker process)
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(audio: UploadFile = File(...)):
     """
     Transcribe audio file to text using Deepgram
     
     Accepts: mp3, wav, webm, ogg, m4a
-    Returns: Transcribed text
+    Returns: Transcribed text (from cache, without Deepgram, for a file already transcribed)
+    Returns 429 when this worker is already at its transcription limit,
+    503 while Deepgram's circuit breaker is open
     """
-    # Validate file type
-    allowed_types = ["audio/mpeg", "audio/wav", "audio/webm", "audio/ogg", "audio/mp4", "audio/x-m4a"]
-    if audio.content_type not in allowed_types:
+    check_audio_type(audio)
+    
+    # Size check (stops at the first chunk over) and a content hash in one pass -
+    # a retried or re-submitted file gets its transcript back without Deepgram
+    audio_hash = hashlib.blake2b(digest_size=16)
+    audio_size = await measure_upload(audio, settings.TRANSCRIBE_MAX_UPLOAD_BYTES, audio_hash)
+    cache_key = audio_hash.hexdigest()
+    cached = await audio_transcriber.transcript_cache.get_async(cache_key)
+    if cached is not None:
+        print("⚡ Transcript cache hit")
+        return {"transcript": cached["transcript"], "filename": audio.filename, "duration_estimate": cached["duration"]}
+    
+    # Shed load instead of queueing without bound
+    if transcription_slots.locked():
         raise HTTPException(
-            status_code=400, 
-            detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}"
+            status_code=429,
+            detail="Too many transcriptions in progress. Please try again shortly.",
+            headers={"Retry-After": "1"}
         )
     
-    # Read audio data
+    async with transcription_slots:
+        # Read audio data
+        try:
+            # Real duration from the headers; mono 16kHz, trimmed and re-encoded
+            # (or the spooled upload as is), silent clips rejected right here
+            with track_stage("audio_preprocess"):
+                prepared = await audio_preprocessor.prepare_async(audio.file)
+            
+            transcript = await audio_transcriber.transcribe_audio_async(prepared["audio"])
+            
+            duration = prepared["duration"]
+            if duration is None:
+                duration = audio_size / (16000 * 2)  # Unknown format - rough guess
+            await audio_transcriber.transcript_cache.set_async(cache_key, {"transcript": transcript, "duration": duration})
+            return {"transcript": transcript, "filename": audio.filename, "duration_estimate": duration}
+            
+        except HTTPException:
+            raise
+        except CircuitOpenError as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Transcription is temporarily unavailable. Please try again shortly.",
+                headers={"Retry-After": str(math.ceil(e.retry_after) or 1)}
+            )
+        except RateLimitedError:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many transcriptions in progress. Please try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+
+@app.post("/transcribe/jobs", response_model=TranscriptionJob, status_code=202)
+async def create_transcription_job(response: Response, audio: UploadFile = File(...)):
+    """
+    Queue an audio file for transcription - answers at once with a job id
+    
+    Poll GET /transcribe/jobs/{job_id} for the result. A file already
+    transcribed comes back as a finished job. Returns 429 when
+    TRANSCRIBE_JOB_MAX_QUEUED jobs are already waiting.
+    """
+    check_audio_type(audio)
+    
+    audio_hash = hashlib.blake2b(digest_size=16)
+    await measure_upload(audio, settings.TRANSCRIBE_MAX_UPLOAD_BYTES, audio_hash)
     try:
-        audio_data = await audio.read()
-        
-        # Check file size (max 10MB)
-        if len(audio_data) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large. Max 10MB allowed.")
-        
-        # Transcribe audio
-        transcript = audio_transcriber.transcribe_audio(audio_data)
+        job = await transcription_jobs.submit(audio.file, audio.filename, audio_hash.hexdigest())
+    except QueueFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many transcriptions queued. Please try again shortly.",
+            headers={"Retry-After": "5"}
+        )
+    
+    response.headers["Location"] = f"/transcribe/jobs/{job['job_id']}"
+    return job
+
+@app.get("/transcribe/jobs/{job_id}", response_model=TranscriptionJob)
+async def get_transcription_job(job_id: str, wait: float = Query(0, ge=0)):
+    """
+    Status of a transcription job, with the transcript once it's done
+    With ?wait=N, holds the request until the job finishes or N seconds
+    pass (capped at TRANSCRIBE_JOB_MAX_WAIT) - long-polling instead of polling
+    """
+    job = await transcription_jobs.get(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    return job
+
+@app.websocket("/transcribe/stream")
+async def transcribe_stream(websocket: WebSocket, analyze: bool = False):
+    """
+    Live transcription over WebSocket
+    
+    Client sends binary audio chunks (e.g. MediaRecorder webm/opus slices),
+    then {"type": "stop"} when the user stops talking.
+    
+    Server sends:
+    - {"type": "interim", "transcript": ...} while the user is talking
+    - {"type": "final", "transcript": ...} for each finished segment
+    - {"type": "done", "transcript": ...} with the full transcript
+    - {"type": "mood", "mood_analysis": {...}} after done, if ?analyze=true
+    - {"type": "error", "detail": ...} on failure
+    """
+    await websocket.accept()
+    
+    # Same load shedding as /transcribe - 1013 means "try again later"
+    if live_transcription_slots.locked():
+        await websocket.close(code=1013, reason="Too many live transcriptions in progress")
+        return
+    
+    async with live_transcription_slots:
+        try:
+            session = await streaming_transcriber.start_session()
+        except CircuitOpenError:
+            await websocket.send_json({"type": "error", "detail": "Transcription is temporarily unavailable"})
+            await websocket.close(code=1013)
+            return
+        except Exception as e:
+            print(f"❌ Live transcription failed to start: {e}")
+            await websocket.send_json({"type": "error", "detail": f"Transcription failed: {str(e)}"})
+            await websocket.close(code=1011)
+            return
         
-        return {
-            "transcript": transcript,
-            "filename": audio.filename,
-            "duration_estimate": len(audio_data) / (16000 * 2)  # Rough estimate
-        }
+        async def relay_results() -> list:
+            """Forward backend results to the client, collecting the finals"""
+            finals = []
+            while (result := await session.results.get()) is not None:
+                if result["type"] == "final":
+                    finals.append(result["transcript"])
+                await websocket.send_json(result)
+            return finals
         
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+        relay = asyncio.create_task(relay_results())
+        try:
+            received = 0
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                
+                if message.get("bytes"):
+                    received += len(message["bytes"])
+                    if received > settings.TRANSCRIBE_MAX_UPLOAD_BYTES:
+                        await websocket.send_json({"type": "error", "detail": upload_too_large().detail})
+                        await websocket.close(code=1009)
+                        return
+                    await session.send(message["bytes"])
+                elif message.get("text"):
+                    control = json.loads(message["text"])
+                    if not isinstance(control, dict):
+                        raise ValueError("Control message is not a JSON object")
+                    if control.get("type") == "stop":
+                        break
+            
+            # Flush the last finals, then hand back the whole transcript
+            await session.finish()
+            transcript = " ".join(await relay)
+            await websocket.send_json({"type": "done", "transcript": transcript})
+            
+            if analyze and transcript:
+                mood_analysis, _ = await mood_analyzer.analyze_async(transcript)
+                await websocket.send_json({"type": "mood", "mood_analysis": format_mood_analysis(mood_analysis)})
+            
+            await websocket.close()
+            
+        except WebSocketDisconnect:
+            print("⚠️ Live transcription client disconnected")
+        except ValueError:
+            await websocket.send_json({"type": "error", "detail": "Invalid control message"})
+            await websocket.close(code=1003)
+        finally:
+            relay.cancel()
+            await session.close()
 
 @app.post("/recommend", response_model=RecommendationResponse)
-def recommend_songs(text_input: TextInput):
+async def recommend_songs(text_input: TextInput):
     """
     Analyze mood and recommend songs
     
@@ -87,23 +385,111 @@ def recommend_songs(text_input: TextInput):
     if not text_input.text:
         raise HTTPException(status_code=400, detail="No text provided")
     
-    # Step 1: Analyze mood
-    mood_analysis, groq_song_recs = mood_analyzer.analyze(text_input.text)
+    # Step 1: Analyze mood - Groq's song suggestions are searched on Spotify as they
+    # stream in, curated songs for the VADER-predicted mood already before that
+    search_memo = SearchMemo()
+    speculation = song_recommender.speculate(mood_analyzer.sentiment.analyze(text_input.text)["mood_category"], search_memo)
+    with track_stage("mood_analysis"):
+        mood_analysis, groq_song_recs = await mood_analyzer.analyze_async(
+            text_input.text,
+            on_song=lambda song: song_recommender.prefetch_groq_suggestion(song, search_memo)
+        )
     
     # Step 2: Get songs
-    songs = song_recommender.recommend(mood_analysis, groq_song_recs)
+    with track_stage("songs"):
+        songs = await song_recommender.recommend_async(mood_analysis, groq_song_recs, search_memo, speculation)
     
     if not songs:
         raise HTTPException(status_code=404, detail="Could not find song recommendations")
     
     # Step 3: Return formatted response
     return {
-        "mood_analysis": {
-            "category": mood_analysis['mood_category'],
-            "description": mood_analysis['mood_description'],
-            "summary": mood_analysis['summary'],
-            "score": mood_analysis['score'],
-            "intensity": mood_analysis['intensity']
-        },
+        "mood_analysis": format_mood_analysis(mood_analysis),
         "songs": songs[:5]
+    }
+
+@app.post("/recommend/batch")
+async def recommend_songs_batch(batch: BatchTextInput):
+    """
+    Analyze many mood texts and recommend songs for each
+    
+    Streams NDJSON - one line per text, in the order items finish:
+    {"index": 0, "mood_analysis": {...}, "songs": [...], "error": null}
+    """
+    async def result_lines():
+        analyses = mood_analyzer.analyze_batch_async(batch.texts)
+        async for index, mood_analysis, songs, error in song_recommender.recommend_batch_async(analyses):
+            if not error and not songs:
+                error = "Could not find song recommendations"
+            
+            item = BatchRecommendationItem(
+                index=index,
+                mood_analysis=format_mood_analysis(mood_analysis),
+                songs=songs[:5],
+                error=error
+            )
+            yield item.model_dump_json() + "\n"
+    
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+@app.post("/recommend/stream")
+async def recommend_songs_stream(text_input: TextInput):
+    """
+    Streaming /recommend (Server-Sent Events)
+    
+    Events, in order:
+    - mood: mood analysis, as soon as it's ready
+    - track: one per song, as each Spotify search resolves (up to 5)
+    - done: {"count": n}, or error: {"detail": ...} if no songs were found
+    """
+    if not text_input.text:
+        raise HTTPException(status_code=400, detail="No text provided")
+    
+    async def events():
+        search_memo = SearchMemo()
+        speculation = song_recommender.speculate(mood_analyzer.sentiment.analyze(text_input.text)["mood_category"], search_memo)
+        with track_stage("mood_analysis"):
+            mood_analysis, groq_song_recs = await mood_analyzer.analyze_async(
+                text_input.text,
+                on_song=lambda song: song_recommender.prefetch_groq_suggestion(song, search_memo)
+            )
+        yield sse_event("mood", format_mood_analysis(mood_analysis))
+        
+        count = 0
+        async for song in song_recommender.recommend_stream_async(mood_analysis, groq_song_recs, search_memo, speculation):
+            count += 1
+            yield sse_event("track", song)
+        
+        if count:
+            yield sse_event("done", {"count": count})
+        else:
+            yield sse_event("error", {"detail": "Could not find song recommendations"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def check_audio_type(audio: UploadFile):
+    """400 unless the upload is one of the audio formats we transcribe"""
+    allowed_types = ["audio/mpeg", "audio/wav", "audio/webm", "audio/ogg", "audio/mp4", "audio/x-m4a"]
+    if audio.content_type not in allowed_types:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}"
+        )
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def format_mood_analysis(mood_analysis: dict) -> dict:
+    """Shape a mood analysis dict for API responses"""
+    return {
+        "category": mood_analysis['mood_category'],
+        "description": mood_analysis['mood_description'],
+        "summary": mood_analysis['summary'],
+        "score": mood_analysis['score'],
+        "intensity": mood_analysis['intensity']
     }
\ No newline at end of file
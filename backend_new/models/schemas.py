@@ -1,7 +1,8 @@
 """Pydantic models for API request/response validation"""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
+from config.settings import settings
 
 class TextInput(BaseModel):
     """
@@ -15,11 +16,41 @@ class TextInput(BaseModel):
             "example": {"text": "I'm feeling really happy today!"}
         }
 
+class BatchTextInput(BaseModel):
+    """
+    Request model for bulk recommendations
+    Jobs send many mood texts to /recommend/batch in one request
+    """
+    texts: List[str] = Field(..., min_length=1, max_length=settings.BATCH_MAX_TEXTS, description="Mood texts")
+    
+    @field_validator("texts")
+    @classmethod
+    def check_text_lengths(cls, texts: List[str]) -> List[str]:
+        for text in texts:
+            if not 1 <= len(text) <= 1000:
+                raise ValueError("Each text must be 1-1000 characters")
+        return texts
+    
+    class Config:
+        json_schema_extra = {
+            "example": {"texts": ["I'm feeling really happy today!", "Rough day at work."]}
+        }
+
 class TranscriptionResponse(BaseModel):
     """Audio transcription result"""
     transcript: str = Field(..., description="Transcribed text from audio")
     filename: str = Field(..., description="Original filename")
-    duration_estimate: float = Field(..., description="Estimated audio duration in seconds")
+    duration_estimate: float = Field(..., description="Audio duration in seconds, from the file headers (estimated if unknown)")
+
+class TranscriptionJob(BaseModel):
+    """Queued transcription, from /transcribe/jobs"""
+    job_id: str
+    status: str = Field(..., description="queued, running, done or failed")
+    filename: str
+    created_at: float = Field(..., description="Unix time the job was submitted")
+    queue_position: Optional[int] = Field(None, description="1 = next to run (queued jobs only)")
+    result: Optional[TranscriptionResponse] = None
+    error: Optional[str] = None
 
 class MoodAnalysis(BaseModel):
     """Mood analysis result with AI summary"""
@@ -40,4 +71,11 @@ class Song(BaseModel):
 class RecommendationResponse(BaseModel):
     """Complete API response"""
     mood_analysis: MoodAnalysis
-    songs: List[Song] = Field(..., min_items=5, max_items=5)
\ No newline at end of file
+    songs: List[Song] = Field(..., min_items=5, max_items=5)
+
+class BatchRecommendationItem(BaseModel):
+    """One NDJSON line of a /recommend/batch response"""
+    index: int = Field(..., description="Position of the text in the request")
+    mood_analysis: Optional[MoodAnalysis] = None
+    songs: List[Song] = []
+    error: Optional[str] = None
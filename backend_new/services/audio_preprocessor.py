@@ -0,0 +1,249 @@
+"""
+Audio preprocessing before transcription
+
+Reads the real duration from the container headers, then decodes the clip
+to mono 16kHz, trims leading/trailing silence and re-encodes it compactly
+(Opus with ffmpeg, 16-bit WAV without) so Deepgram gets fewer bytes and
+less audio. Clips with no sound at all are rejected here instead of
+costing a remote call.
+
+PCM WAV is decoded with numpy; other formats need ffmpeg on the PATH and
+are sent as uploaded without it.
+"""
+
+import asyncio
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
+import numpy as np
+from config.settings import settings
+from utils.audio_headers import probe_file, parse_wav, WAVE_FORMAT_PCM, WAVE_FORMAT_FLOAT
+
+FRAME_SECONDS = 0.02  # Silence is judged per 20ms frame
+FFMPEG_TIMEOUT = 30  # Seconds per decode/encode
+
+class AudioPreprocessor:
+    """Shrinks uploads for transcription, in a worker pool off the event loop"""
+    
+    def __init__(self):
+        self.ffmpeg = shutil.which(settings.FFMPEG_PATH)
+        self.pool = ThreadPoolExecutor(
+            max_workers=max(1, settings.AUDIO_PREPROCESS_WORKERS),
+            thread_name_prefix="audio-preprocess"
+        )
+        self._lock = threading.Lock()
+        
+        # Counters
+        self.processed = 0
+        self.passed_through = 0
+        self.rejected_silent = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+    
+    def _count(self, outcome: str, bytes_in: int, bytes_out: int):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+    
+    def _wav_samples(self, data: bytes, wav: dict) -> np.ndarray:
+        """(frames, channels) float32 samples of a PCM/float WAV, None for other encodings"""
+        raw = data[wav["data_offset"]:wav["data_offset"] + wav["data_size"]]
+        bits, channels = wav["bits"], wav["channels"]
+        if not channels or not bits or bits % 8:
+            return None
+        raw = raw[:len(raw) - len(raw) % (channels * bits // 8)]
+        
+        if wav["audio_format"] == WAVE_FORMAT_FLOAT and bits in (32, 64):
+            samples = np.frombuffer(raw, dtype=f"<f{bits // 8}").astype(np.float32)
+        elif wav["audio_format"] != WAVE_FORMAT_PCM:
+            return None  # ADPCM, mu-law, ... - leave those to ffmpeg
+        elif bits == 8:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif bits == 16:
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+        elif bits == 24:
+            triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = triplets[:, 0] | triplets[:, 1] << 8 | triplets[:, 2] << 16
+            samples = (np.where(values >= 1 << 23, values - (1 << 24), values)).astype(np.float32) / (1 << 23)
+        elif bits == 32:
+            samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / (1 << 31)
+        else:
+            return None
+        return samples.reshape(-1, channels)
+    
+    def _ffmpeg_decode(self, file: BinaryIO, sample_rate: int) -> np.ndarray:
+        """Any format ffmpeg reads → mono samples at sample_rate, None if it can't"""
+        # From a file, not a pipe - MP4s with the index at the end need to seek.
+        # Uploads spooled to disk are read where they are, in-memory ones copied out.
+        name = getattr(file, "name", None)
+        try:
+            with tempfile.NamedTemporaryFile() as copy:
+                pass_fds = ()
+                if isinstance(name, str) and os.path.isfile(name):
+                    source = name
+                elif isinstance(name, int):
+                    source, pass_fds = f"/dev/fd/{name}", (name,)  # Unnamed temp file
+                else:
+                    shutil.copyfileobj(file, copy)
+                    copy.flush()
+                    file.seek(0)
+                    source = copy.name
+                
+                result = subprocess.run(
+                    [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-i", source,
+                     "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"],
+                    capture_output=True, timeout=FFMPEG_TIMEOUT, pass_fds=pass_fds
+                )
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"⚠️ ffmpeg decode failed: {e}")
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return np.frombuffer(result.stdout, dtype="<i2").astype(np.float32) / 32768
+    
+    def _to_mono(self, samples: np.ndarray, rate: int, target: int) -> np.ndarray:
+        """Downmix, then resample down to target (low-passed first so it doesn't alias)"""
+        mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+        if rate <= target:
+            return mono
+        
+        # Windowed-sinc low-pass at 90% of the new Nyquist frequency
+        cutoff = 0.9 * target / rate
+        taps = np.arange(-50, 51)
+        kernel = np.sinc(cutoff * taps) * cutoff * np.hamming(len(taps))
+        filtered = np.convolve(mono, kernel / kernel.sum(), mode="same")
+        
+        positions = np.arange(int(len(mono) * target / rate)) * (rate / target)
+        return np.interp(positions, np.arange(len(mono)), filtered).astype(np.float32)
+    
+    def _trim_silence(self, mono: np.ndarray, rate: int) -> np.ndarray:
+        """Cut silence off both ends - None if there's no sound at all"""
+        frame = max(1, int(rate * FRAME_SECONDS))
+        count = len(mono) // frame
+        if count == 0:
+            return None
+        
+        frames = mono[:count * frame].reshape(count, frame)
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        loud = np.flatnonzero(20 * np.log10(np.maximum(rms, 1e-10)) > settings.AUDIO_SILENCE_THRESHOLD_DB)
+        if len(loud) * FRAME_SECONDS < settings.AUDIO_MIN_SOUND_SECONDS:
+            return None
+        
+        padding = int(settings.AUDIO_SILENCE_PADDING * rate)
+        start = max(0, loud[0] * frame - padding)
+        end = min(len(mono), (loud[-1] + 1) * frame + padding)
+        return mono[start:end]
+    
+    def _encode(self, mono: np.ndarray, rate: int) -> bytes:
+        """Opus in Ogg when ffmpeg is available, 16-bit WAV otherwise"""
+        pcm = (np.clip(mono, -1, 1) * 32767).astype("<i2").tobytes()
+        
+        if self.ffmpeg:
+            try:
+                result = subprocess.run(
+                    [self.ffmpeg, "-hide_banner", "-loglevel", "error",
+                     "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0",
+                     "-c:a", "libopus", "-b:a", settings.AUDIO_OPUS_BITRATE, "-application", "voip",
+                     "-f", "ogg", "pipe:1"],
+                    input=pcm, capture_output=True, timeout=FFMPEG_TIMEOUT
+                )
+                if result.returncode == 0 and result.stdout:
+                    return result.stdout
+                print(f"⚠️ ffmpeg Opus encode failed, sending WAV: {result.stderr.decode(errors='ignore')[:200]}")
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"⚠️ ffmpeg Opus encode failed, sending WAV: {e}")
+        
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            out.writeframes(pcm)
+        return buffer.getvalue()
+    
+    def _decode(self, file: BinaryIO, info: dict) -> tuple:
+        """(mono samples, sample rate), or (None, None) when the clip can't be decoded here"""
+        target = settings.AUDIO_TARGET_SAMPLE_RATE
+        if info["container"] == "wav":
+            # The only format decoded in process - the samples are needed in memory anyway
+            data = file.read()
+            file.seek(0)
+            wav = parse_wav(data)
+            if wav is not None and wav["sample_rate"]:
+                samples = self._wav_samples(data, wav)
+                if samples is not None:
+                    rate = wav["sample_rate"]
+                    return self._to_mono(samples, rate, target), min(rate, target)
+        
+        if self.ffmpeg:
+            rate = min(info["sample_rate"] or target, target)
+            mono = self._ffmpeg_decode(file, rate)
+            if mono is not None:
+                return mono, rate
+        return None, None
+    
+    def prepare(self, file: BinaryIO) -> dict:
+        """
+        Probe, and with AUDIO_PREPROCESS shrink, one upload
+        
+        Returns {"audio": bytes or the file to send, "duration": seconds or
+        None, "bytes_in", "bytes_out", "processed"}. Raises ValueError for
+        a clip without any sound.
+        """
+        # Headers from the ends of the file - it's only read whole to be decoded
+        size = file.seek(0, 2)
+        info = probe_file(file, size)
+        result = {"audio": file, "duration": info["duration"], "bytes_in": size, "bytes_out": size, "processed": False}
+        
+        if not settings.AUDIO_PREPROCESS:
+            return result
+        
+        mono, rate = self._decode(file, info)
+        if mono is None:
+            self._count("passed_through", size, size)
+            return result
+        
+        if result["duration"] is None:
+            result["duration"] = len(mono) / rate
+        
+        trimmed = self._trim_silence(mono, rate)
+        if trimmed is None:
+            self._count("rejected_silent", size, 0)
+            raise ValueError("No speech detected in audio")
+        
+        encoded = self._encode(trimmed, rate)
+        if len(encoded) >= size:
+            # Already compact (e.g. a short low-bitrate MP3) - the original is cheaper to send
+            self._count("passed_through", size, size)
+            return result
+        
+        self._count("processed", size, len(encoded))
+        print(f"🎚️ Audio {size // 1024}KB → {len(encoded) // 1024}KB ({len(trimmed) / rate:.1f}s of sound)")
+        return {**result, "audio": encoded, "bytes_out": len(encoded), "processed": True}
+    
+    async def prepare_async(self, file: BinaryIO) -> dict:
+        """prepare() in the preprocessing pool - decoding is CPU-bound"""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, self.prepare, file)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.AUDIO_PREPROCESS,
+                "ffmpeg": self.ffmpeg is not None,
+                "processed": self.processed,
+                "passed_through": self.passed_through,
+                "rejected_silent": self.rejected_silent,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved_ratio": round(1 - self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0
+            }
+
+# Create global instance
+audio_preprocessor = AudioPreprocessor()
@@ -1,27 +1,94 @@
 """Audio transcription service using Deepgram"""
 
-from deepgram import DeepgramClient, PrerecordedOptions, FileSource
+import threading
+from typing import BinaryIO, Union
+import httpx
 from config.settings import settings
+from utils.uploads import aiter_file_chunks
+from utils.cache import TTLCache, SQLiteCache, TieredCache
+from utils.http_transport import http_pools
+from utils.metrics import track_upstream
+from utils.resilience import CircuitOpenError, RateLimitedError, circuit_breakers
 
 class AudioTranscriber:
     """Transcribes audio to text using Deepgram API"""
     
     def __init__(self):
+        # Built by preload() at app startup, or on first use
+        self._client = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        
+        # Open while Deepgram is failing - uploads get a 503 instead of a long wait
+        self.breaker = circuit_breakers["deepgram"]
+        
+        # Transcripts by audio content hash - retried/re-submitted uploads aren't billed again
+        self.transcript_cache = TieredCache(
+            TTLCache(max_size=settings.TRANSCRIPT_CACHE_SIZE, ttl=settings.TRANSCRIPT_CACHE_TTL),
+            SQLiteCache(settings.TRANSCRIPT_CACHE_DB_PATH, ttl=settings.TRANSCRIPT_CACHE_TTL)
+            if settings.TRANSCRIPT_CACHE_DB_PATH else None
+        )
+    
+    @property
+    def client(self):
+        """Deepgram client, None without an API key"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load_client()
+                    self._loaded = True
+        return self._client
+    
+    def _load_client(self):
         """Initialize Deepgram client"""
-        self.client = None
-        if settings.DEEPGRAM_API_KEY:
-            try:
-                self.client = DeepgramClient(settings.DEEPGRAM_API_KEY)
-                print("✅ Deepgram client initialized")
-            except Exception as e:
-                print(f"❌ Deepgram init failed: {e}")
+        if not settings.DEEPGRAM_API_KEY:
+            return
+        try:
+            from deepgram import DeepgramClient, DeepgramClientOptions  # Deferred - slow to import
+            
+            self._client = DeepgramClient(settings.DEEPGRAM_API_KEY, DeepgramClientOptions(url=settings.DEEPGRAM_API_URL))
+            print("✅ Deepgram client initialized")
+        except Exception as e:
+            print(f"❌ Deepgram init failed: {e}")
+    
+    def preload(self):
+        """Build the client now, not on the first upload"""
+        if self.client is None and settings.DEEPGRAM_API_KEY:
+            print("⚠️ Deepgram unavailable - transcription requests will fail")
+    
+    def status(self) -> dict:
+        """Client readiness for /ready"""
+        return {"configured": bool(settings.DEEPGRAM_API_KEY), "initialized": self._client is not None}
+    
+    def _build_options(self):
+        """Configure transcription options"""
+        from deepgram import PrerecordedOptions
+        
+        return PrerecordedOptions(
+            model="nova-2",  # Fast, accurate model
+            smart_format=True,  # Auto-formatting (punctuation, etc.)
+            language="en",  # English language
+            punctuate=True,  # Add punctuation
+            diarize=False,  # Don't separate speakers
+        )
+    
+    def _extract_transcript(self, response) -> str:
+        """Pull the transcript out of a Deepgram response"""
+        transcript = response.results.channels[0].alternatives[0].transcript
+        
+        if not transcript or transcript.strip() == "":
+            raise ValueError("No speech detected in audio")
+        
+        print(f"✅ Transcription: {transcript[:100]}...")
+        return transcript
     
-    def transcribe_audio(self, audio_data: bytes) -> str:
+    def transcribe_audio(self, audio_data: Union[bytes, BinaryIO]) -> str:
         """
         Transcribe audio bytes to text
         
         Args:
-            audio_data: Raw audio file bytes (mp3, wav, webm, etc.)
+            audio_data: Raw audio file bytes (mp3, wav, webm, etc.), or a
+                file object to stream from instead of holding it in memory
             
         Returns:
             Transcribed text string
@@ -31,31 +98,55 @@ class AudioTranscriber:
         
         try:
             # Prepare audio payload
-            payload: FileSource = {
-                "buffer": audio_data,
-            }
-            
-            # Configure transcription options
-            options = PrerecordedOptions(
-                model="nova-2",  # Fast, accurate model
-                smart_format=True,  # Auto-formatting (punctuation, etc.)
-                language="en",  # English language
-                punctuate=True,  # Add punctuation
-                diarize=False,  # Don't separate speakers
-            )
+            if isinstance(audio_data, bytes):
+                payload = {"buffer": audio_data}
+            else:
+                payload = {"stream": audio_data}
             
             # Call Deepgram API
-            response = self.client.listen.rest.v("1").transcribe_file(payload, options)
+            # The SDK opens a client per call - lend it the shared pool so connections are reused
+            with self.breaker.guard(), track_upstream("deepgram", "transcribe"):
+                response = self.client.listen.rest.v("1").transcribe_file(
+                    payload,
+                    self._build_options(),
+                    timeout=httpx.Timeout(settings.DEEPGRAM_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+                    transport=http_pools.shared_transport("deepgram")
+                )
+            return self._extract_transcript(response)
             
-            # Extract transcript from response
-            transcript = response.results.channels[0].alternatives[0].transcript
-            
-            if not transcript or transcript.strip() == "":
-                raise ValueError("No speech detected in audio")
+        except (CircuitOpenError, RateLimitedError):
+            raise  # Mapped to 503 / 429 by the API
+        except Exception as e:
+            print(f"❌ Transcription error: {e}")
+            raise Exception(f"Failed to transcribe audio: {str(e)}")
+    
+    async def transcribe_audio_async(self, audio_data: Union[bytes, BinaryIO]) -> str:
+        """
+        Async version of transcribe_audio
+        Uses Deepgram's async REST client so the event loop keeps serving
+        other requests while the transcription runs
+        """
+        if not self.client:
+            raise ValueError("Deepgram API key not configured")
+        
+        try:
+            if isinstance(audio_data, bytes):
+                payload = {"buffer": audio_data}
+            else:
+                # Async HTTP needs an async body - stream the file in chunks
+                payload = {"stream": aiter_file_chunks(audio_data)}
             
-            print(f"✅ Transcription: {transcript[:100]}...")
-            return transcript
+            with self.breaker.guard(), track_upstream("deepgram", "transcribe"):
+                response = await self.client.listen.asyncrest.v("1").transcribe_file(
+                    payload,
+                    self._build_options(),
+                    timeout=httpx.Timeout(settings.DEEPGRAM_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+                    transport=http_pools.shared_async_transport("deepgram")
+                )
+            return self._extract_transcript(response)
             
+        except (CircuitOpenError, RateLimitedError):
+            raise  # Mapped to 503 / 429 by the API
         except Exception as e:
             print(f"❌ Transcription error: {e}")
             raise Exception(f"Failed to transcribe audio: {str(e)}")
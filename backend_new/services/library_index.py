@@ -0,0 +1,94 @@
+"""Pre-resolved curated library - MOOD_SONG_LIBRARIES looked up on Spotify once"""
+
+import asyncio
+import json
+import os
+import time
+from services.spotify_client import spotify_client
+from data.mood_libraries import MOOD_SONG_LIBRARIES
+from config.settings import settings
+
+class LibraryIndex:
+    """
+    Formatted Spotify tracks for every curated song, keyed by mood category
+    Built once (CLI or startup) and saved to a JSON file, so curated picks
+    need no Spotify calls at request time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tracks_by_mood = {}
+        self.built_at = None
+
+    @property
+    def ready(self) -> bool:
+        return any(self.tracks_by_mood.values())
+
+    def get(self, mood_category: str) -> list:
+        """Resolved tracks for a mood ([] if the index isn't built)"""
+        return self.tracks_by_mood.get(mood_category, [])
+
+    def load(self) -> bool:
+        """Load the index file if it exists. Returns True on success"""
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.tracks_by_mood = data["moods"]
+            self.built_at = data.get("built_at")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Library index load failed: {e}")
+            return False
+
+        total = sum(len(tracks) for tracks in self.tracks_by_mood.values())
+        print(f"✅ Library index loaded: {total} tracks")
+        return True
+
+    def save(self):
+        """Write the index atomically so running workers never read half a file"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"built_at": self.built_at, "moods": self.tracks_by_mood}, f, indent=1)
+        os.replace(temp_path, self.path)
+
+    async def build_async(self) -> dict:
+        """
+        Resolve every curated song on Spotify
+        Songs that can't be found are left out of the index, and a build
+        that resolves nothing (e.g. Spotify down) keeps the current index
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.SPOTIFY_SEARCH_CONCURRENCY))
+
+        async def resolve(song: dict):
+            async with semaphore:
+                results = await spotify_client.search_track_async(f"{song['name']} {song['artist']}", limit=1)
+            return spotify_client.format_track(results[0]) if results else None
+
+        tracks_by_mood = {}
+        for mood_category, songs in MOOD_SONG_LIBRARIES.items():
+            resolved = await asyncio.gather(*(resolve(song) for song in songs))
+            tracks_by_mood[mood_category] = [track for track in resolved if track]
+            print(f"✅ {mood_category}: {len(tracks_by_mood[mood_category])}/{len(songs)} songs resolved")
+
+        if any(tracks_by_mood.values()):
+            self.tracks_by_mood = tracks_by_mood
+            self.built_at = time.time()
+        return tracks_by_mood
+
+    async def build_and_save_async(self):
+        """Startup hook - build in the background and persist for next time"""
+        try:
+            await self.build_async()
+            if self.ready:
+                self.save()
+                print(f"✅ Library index saved to {self.path}")
+        except Exception as e:
+            print(f"❌ Library index build failed: {e}")
+
+library_index = LibraryIndex(settings.LIBRARY_INDEX_PATH)
@@ -1,24 +1,248 @@
 """Mood analysis using Groq AI with VADER fallback"""
 
+import asyncio
 import json
+import re
+import time
+from bisect import bisect_right
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from groq import Groq
 from config.settings import settings
+from data.mood_buckets import MOOD_BUCKETS
+from utils.cache import TTLCache
+from utils.metrics import LatencyStats, MOOD_ANALYSIS_SECONDS, track_upstream, record_upstream_error
+from utils.http_transport import http_pools
+from utils.json_stream import JSONStreamParser, parse_json_object
+from utils.resilience import CircuitOpenError, circuit_breakers
+from utils.singleflight import SingleFlight
+from services.sentiment_engine import SentimentEngine
+
+GROQ_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+
+MOOD_THRESHOLDS = [bucket["min_score"] for bucket in MOOD_BUCKETS[1:]]
+MOOD_CATEGORIES = {bucket["category"]: bucket for bucket in MOOD_BUCKETS}
+
+# Reply schema - mood fields first so they stream in before the songs and summary
+GROQ_SCHEMA = (
+    '{"score": -1.0 to 1.0, "category": "Very Negative" | "Negative" | "Neutral" | "Positive" | "Very Positive", '
+    '"intensity": "low" | "moderate" | "high", "description": "one short sentence to the user", '
+    '"songs": [{"name": "...", "artist": "..."}], "summary": "60-100 upbeat words connecting the mood to music"}'
+)
+
+class ReplyListeners:
+    """
+    on_mood / on_song callbacks of every request sharing one streamed Groq call
+    Requests that join late get what has already streamed in replayed.
+    """
+    
+    def __init__(self):
+        self.mood_analysis = None
+        self.songs = []
+        self.listeners = []
+    
+    def add(self, on_mood=None, on_song=None):
+        if self.mood_analysis is not None and on_mood:
+            on_mood(self.mood_analysis)
+        if on_song:
+            for song in self.songs:
+                on_song(song)
+        self.listeners.append((on_mood, on_song))
+    
+    def remove(self, on_mood=None, on_song=None):
+        """Stop calling a request's callbacks - it has stopped waiting for the reply"""
+        try:
+            self.listeners.remove((on_mood, on_song))
+        except ValueError:
+            pass
+    
+    def on_mood(self, mood_analysis: dict):
+        self.mood_analysis = mood_analysis
+        for on_mood, _ in self.listeners:
+            if on_mood:
+                on_mood(mood_analysis)
+    
+    def on_song(self, song: dict):
+        self.songs.append(song)
+        for _, on_song in self.listeners:
+            if on_song:
+                on_song(song)
 
 class MoodAnalyzer:
     """Analyzes text sentiment and returns mood with AI summary"""
     
     def __init__(self):
-        self.vader = SentimentIntensityAnalyzer()
+        # Built by preload() at app startup, or on first use - importing
+        # this module stays cheap (no lexicon load, no Groq SDK import)
+        self._vader = None
+        self._sentiment = None
+        self._groq = None
+        self._groq_async = None
+        self._groq_loaded = False
         
-        # Initialize Groq if API key exists
-        self.groq = None
-        if settings.GROQ_API_KEY:
-            try:
-                self.groq = Groq(api_key=settings.GROQ_API_KEY)
-                print("✅ Groq AI initialized")
-            except Exception as e:
-                print(f"❌ Groq init failed: {e}")
+        # Groq results for recently seen text (VADER is cheap, never cached)
+        self.cache = TTLCache(
+            max_size=settings.MOOD_CACHE_SIZE,
+            ttl=settings.MOOD_CACHE_TTL,
+            policy=settings.MOOD_CACHE_POLICY
+        )
+        
+        # Cache misses for a text Groq is already analyzing wait for that call
+        self.groq_flight = SingleFlight("groq_analyze")
+        self.reply_listeners = {}  # cache key -> ReplyListeners of the call in flight
+        
+        # Time spent per analysis path (cache / groq / vader_*)
+        self.timings = LatencyStats(MOOD_ANALYSIS_SECONDS)
+        
+        # Groq calls left running after the latency budget ran out
+        self.background_tasks = set()
+        
+        # Open while Groq is failing - analysis goes straight to VADER
+        self.breaker = circuit_breakers["groq"]
+    
+    @property
+    def vader(self) -> SentimentIntensityAnalyzer:
+        if self._vader is None:
+            self._vader = SentimentIntensityAnalyzer()
+        return self._vader
+    
+    @property
+    def sentiment(self) -> SentimentEngine:
+        """Vectorized VADER for the request paths"""
+        if self._sentiment is None:
+            self._sentiment = SentimentEngine(self.vader)
+        return self._sentiment
+    
+    @property
+    def groq(self):
+        self._load_groq()
+        return self._groq
+    
+    @property
+    def groq_async(self):
+        self._load_groq()
+        return self._groq_async
+    
+    def _load_groq(self):
+        """Initialize Groq if API key exists"""
+        if self._groq_loaded:
+            return
+        self._groq_loaded = True
+        if not settings.GROQ_API_KEY:
+            return
+        
+        try:
+            from groq import Groq, AsyncGroq  # Deferred - slow to import, unused without a key
+            
+            # Shared keep-alive pools - retries happen there, not in the SDK
+            self._groq = Groq(
+                api_key=settings.GROQ_API_KEY,
+                base_url=settings.GROQ_BASE_URL,
+                timeout=settings.GROQ_TIMEOUT,
+                max_retries=0,
+                http_client=http_pools.client("groq", settings.GROQ_TIMEOUT)
+            )
+            self._groq_async = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                base_url=settings.GROQ_BASE_URL,
+                timeout=settings.GROQ_TIMEOUT,
+                max_retries=0,
+                http_client=http_pools.async_client("groq", settings.GROQ_TIMEOUT)
+            )
+            print("✅ Groq AI initialized")
+        except Exception as e:
+            print(f"❌ Groq init failed: {e}")
+    
+    def preload(self):
+        """Load the VADER lexicon and build the Groq clients now, not on the first request"""
+        self._load_groq()
+        self._sentiment = self.sentiment
+    
+    def status(self) -> dict:
+        """Client readiness for /ready"""
+        return {
+            "groq": {"configured": bool(settings.GROQ_API_KEY), "initialized": self._groq_async is not None},
+            "sentiment": {"configured": True, "initialized": self._sentiment is not None}
+        }
+    
+    def _cache_key(self, text: str) -> str:
+        """Normalize text so case, punctuation and extra whitespace don't matter"""
+        return " ".join(re.sub(r"[^\w\s]", "", text.lower()).split())
+    
+    def _build_groq_prompt(self, text: str) -> str:
+        """Prompt asking Groq for mood analysis + 5 songs as compact JSON"""
+        return f"""Analyze the mood of this text and recommend 5 popular songs that match it (uplifting if the mood is negative).
+Text: {json.dumps(text)}
+
+Reply with only this JSON object, keys in this order:
+{GROQ_SCHEMA}"""
+    
+    def _build_groq_batch_prompt(self, texts: list) -> str:
+        """Prompt asking Groq to analyze several texts in one completion"""
+        items = json.dumps([{"id": i, "text": text} for i, text in enumerate(texts)])
+        return f"""Analyze the mood of each of these {len(texts)} texts and recommend 5 popular songs per text (uplifting if the mood is negative).
+Texts: {items}
+
+Reply with only this JSON object, one result per text with the same ids:
+{{"results": [{{"id": 0, {GROQ_SCHEMA[1:]}]}}"""
+    
+    def _completion_args(self, prompt: str, max_tokens: int, stream: bool = False) -> dict:
+        """Chat completion arguments - JSON mode unless streaming (Groq can't stream it)"""
+        args = {
+            "messages": [{"role": "user", "content": prompt}],
+            "model": GROQ_MODEL,
+            "max_tokens": max_tokens,
+            "temperature": 0.7
+        }
+        if stream:
+            args["stream"] = True
+        elif settings.GROQ_JSON_MODE:
+            args["response_format"] = {"type": "json_object"}
+        return args
+    
+    def _expand_groq_result(self, reply: dict) -> dict:
+        """
+        Compact reply → {"mood_analysis": {...}, "song_recommendations": [...]}
+        None without a usable score and category. A missing description or
+        summary (reply cut off by max_tokens) falls back to the mood bucket's.
+        """
+        try:
+            score = max(-1.0, min(1.0, float(reply["score"])))
+            bucket = MOOD_CATEGORIES[reply["category"]]
+        except (KeyError, TypeError, ValueError):
+            return None
+        
+        songs = reply.get("songs")
+        return {
+            "mood_analysis": {
+                "score": score,
+                "magnitude": abs(score),
+                "mood_category": bucket["category"],
+                "mood_description": reply.get("description") or bucket["description"],
+                "intensity": reply.get("intensity") or "moderate",
+                "summary": reply.get("summary") or bucket["summary"]
+            },
+            "song_recommendations": [
+                song for song in songs if self._valid_song(song)
+            ][:5] if isinstance(songs, list) else []
+        }
+    
+    @staticmethod
+    def _valid_song(song) -> bool:
+        return isinstance(song, dict) and bool(song.get("name"))
+    
+    def _parse_groq_response(self, response_text: str) -> dict:
+        """Parse Groq's reply into a result dict, None if the format is wrong"""
+        try:
+            result = self._expand_groq_result(parse_json_object(response_text))
+        except ValueError:
+            result = None
+        
+        if result:
+            print(f"✅ Groq: {result['mood_analysis']['summary'][:50]}...")
+            return result
+        
+        record_upstream_error("groq", "parse")
+        print("❌ Groq response invalid format")
+        return None
     
     def analyze_with_groq(self, text: str) -> dict:
         """
@@ -29,96 +253,130 @@ class MoodAnalyzer:
             return None
         
         try:
-            prompt = f"""Analyze this text for mood and recommend 5 songs.
-            Text: "{text}"
-
-            Return JSON:
-            {{
-                "mood_analysis": {{
-                    "score": 0.5,
-                    "magnitude": 0.7,
-                    "mood_category": "Positive",
-                    "mood_description": "You're in a good mood!",
-                    "intensity": "moderate",
-                    "summary": "80-120 word engaging summary celebrating mood and connecting to music..."
-                }},
-                "song_recommendations": [
-                    {{"name": "Song", "artist": "Artist", "search_terms": ["term1", "term2"]}}
-                ]
-            }}
-
-            Guidelines:
-            - score: -1.0 to 1.0
-            - mood_category: "Very Negative", "Negative", "Neutral", "Positive", "Very Positive"
-            - Also try to uplift the mood if negative
-            - summary: Positive, fun 80-120 words connecting mood to music
-            - 5 popular songs matching mood"""
-
-            response = self.groq.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
-                max_tokens=2048,
-                temperature=0.7
-            )
-
-            response_text = response.choices[0].message.content.strip()
-            
-            # Clean markdown code blocks
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].strip()
+            with self.breaker.guard(), track_upstream("groq", "analyze"):
+                response = self.groq.chat.completions.create(
+                    **self._completion_args(self._build_groq_prompt(text), settings.GROQ_MAX_TOKENS)
+                )
+            return self._parse_groq_response(response.choices[0].message.content)
             
-            result = json.loads(response_text)
-            
-            if "mood_analysis" in result and "song_recommendations" in result:
-                print(f"✅ Groq: {result['mood_analysis']['summary'][:50]}...")
-                return result
-            
-            print("❌ Groq response invalid format")
+        except CircuitOpenError:
+            return None  # Groq is down - VADER without waiting
+        except Exception as e:
+            print(f"❌ Groq error: {e}")
             return None
+    
+    async def _stream_groq_reply(self, text: str, on_mood=None, on_song=None) -> str:
+        """
+        Stream the completion through JSONStreamParser
+        
+        on_mood(mood_analysis) fires once score and category are in (the
+        description and summary may still be bucket defaults), on_song(song)
+        for each suggestion as soon as it's complete - both before the
+        summary has been generated. Returns the full reply text.
+        """
+        start = time.perf_counter()
+        parser = JSONStreamParser()
+        mood_ready = False
+        
+        stream = await self.groq_async.chat.completions.create(
+            **self._completion_args(self._build_groq_prompt(text), settings.GROQ_MAX_TOKENS, stream=True)
+        )
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                
+                for event, key, value in parser.feed(chunk.choices[0].delta.content):
+                    if event == "item" and key == "songs" and on_song and self._valid_song(value):
+                        on_song(value)
+                
+                if not mood_ready and (partial := self._expand_groq_result(parser.result())):
+                    mood_ready = True
+                    self.timings.record("groq_mood_ready", time.perf_counter() - start)
+                    if on_mood:
+                        on_mood(partial["mood_analysis"])
+                
+                if parser.done:
+                    break  # Anything after the object is chatter
+        
+        return parser.buffer
+    
+    async def analyze_with_groq_async(self, text: str, on_mood=None, on_song=None) -> dict:
+        """
+        Async version of analyze_with_groq - doesn't block the event loop
+        With GROQ_STREAM, on_mood / on_song get the reply's parts as they stream in
+        """
+        if not self.groq_async:
+            return None
+        
+        try:
+            with self.breaker.guard(), track_upstream("groq", "analyze"):
+                if settings.GROQ_STREAM:
+                    reply = await self._stream_groq_reply(text, on_mood, on_song)
+                else:
+                    response = await self.groq_async.chat.completions.create(
+                        **self._completion_args(self._build_groq_prompt(text), settings.GROQ_MAX_TOKENS)
+                    )
+                    reply = response.choices[0].message.content
+            return self._parse_groq_response(reply)
             
+        except CircuitOpenError:
+            return None  # Groq is down - VADER without waiting
         except Exception as e:
             print(f"❌ Groq error: {e}")
             return None
     
+    async def analyze_batch_with_groq_async(self, texts: list) -> list:
+        """
+        Analyze several texts with a single Groq completion
+        Returns one result dict per text, None where Groq gave nothing usable
+        """
+        if not self.groq_async or not texts:
+            return [None] * len(texts)
+        
+        try:
+            with self.breaker.guard(), self.timings.time("groq_batch_call"), track_upstream("groq", "analyze_batch"):
+                response = await self.groq_async.chat.completions.create(
+                    **self._completion_args(
+                        self._build_groq_batch_prompt(texts),
+                        min(8192, settings.GROQ_MAX_TOKENS * len(texts))
+                    )
+                )
+            parsed = parse_json_object(response.choices[0].message.content)
+        except CircuitOpenError:
+            return [None] * len(texts)
+        except Exception as e:
+            print(f"❌ Groq batch error: {e}")
+            return [None] * len(texts)
+        
+        results = [None] * len(texts)
+        for item in parsed.get("results", []):
+            item_id = item.get("id") if isinstance(item, dict) else None
+            if isinstance(item_id, int) and 0 <= item_id < len(texts):
+                results[item_id] = self._expand_groq_result(item)
+        
+        print(f"✅ Groq batch: {sum(r is not None for r in results)}/{len(texts)} analyzed")
+        return results
+    
     def analyze_with_vader(self, text: str) -> dict:
         """
         Analyze mood using VADER (FALLBACK METHOD)
         Returns: mood analysis only (no songs)
+        Per-call reference for SentimentEngine, which the request paths use
         """
         sentiment = self.vader.polarity_scores(text)
         score = sentiment['compound']
         
-        # Map score to mood
-        if score >= 0.5:
-            category = "Very Positive"
-            description = "You're feeling fantastic and energetic!"
-            summary = "What an incredible energy you're radiating! Your positivity is infectious and it's the perfect time to celebrate with music that matches your soaring spirits. Whether you're dancing or conquering the world, these songs will amplify your amazing mood and keep those good vibes flowing!"
-        elif score >= 0.1:
-            category = "Positive"
-            description = "You're in a good, upbeat mood!"
-            summary = "You're glowing with positive energy! This upbeat mood calls for music that celebrates life's wonderful moments. These songs will be your perfect companions as you ride this wave of happiness. Let the melodies lift you even higher!"
-        elif score >= -0.1:
-            category = "Neutral"
-            description = "You're feeling calm and balanced."
-            summary = "There's something beautiful about finding balance in life. This peaceful state is perfect for discovering music that speaks to your soul. These songs will complement your tranquil mood and add a gentle spark to your day."
-        elif score >= -0.5:
-            category = "Negative"
-            description = "You're feeling a bit down or melancholic."
-            summary = "Life has its challenging moments, and music has this incredible power to be your companion through them. These songs offer comfort, hope, and a reminder that you're not alone. Music can be the bridge that carries us back to brighter days."
-        else:
-            category = "Very Negative"
-            description = "You're going through a tough time."
-            summary = "In your darkest moments, music becomes a lifeline. These songs are chosen with care to honor your feelings while gently offering hope and healing. You're stronger than you know, and sometimes recovery begins with the right song."
+        # Highest bucket the score reaches
+        bucket = MOOD_BUCKETS[bisect_right(MOOD_THRESHOLDS, score)]
         
         return {
             "score": score,
             "magnitude": abs(score),
-            "mood_category": category,
-            "mood_description": description,
+            "mood_category": bucket["category"],
+            "mood_description": bucket["description"],
             "intensity": "moderate",
-            "summary": summary
+            "summary": bucket["summary"]
         }
     
     def analyze(self, text: str) -> tuple:
@@ -126,13 +384,152 @@ class MoodAnalyzer:
         MAIN FUNCTION - Try Groq first, fallback to VADER
         Returns: (mood_analysis_dict, groq_song_recommendations_list)
         """
-        # Try Groq AI
-        groq_result = self.analyze_with_groq(text)
+        key = self._cache_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Try Groq AI - one call per text, however many threads ask at once
+        groq_result = self.groq_flight.do_sync(key, lambda: self.analyze_with_groq(text))
         if groq_result:
-            return groq_result["mood_analysis"], groq_result.get("song_recommendations", [])
+            result = groq_result["mood_analysis"], groq_result.get("song_recommendations", [])
+            self.cache.set(key, result)
+            return result
         
         # Fallback to VADER
         print("⚠️ Falling back to VADER")
-        return self.analyze_with_vader(text), []
+        return self.sentiment.analyze(text), []
+    
+    async def _analyze_with_groq_cached(self, text: str, key: str, on_mood=None, on_song=None) -> dict:
+        """
+        Call Groq and cache a successful result
+        Concurrent requests for the same text share one call (and its streamed parts)
+        """
+        listeners = self.reply_listeners.get(key)
+        if listeners is None:
+            listeners = self.reply_listeners[key] = ReplyListeners()
+        listeners.add(on_mood, on_song)
+        
+        async def call_groq() -> dict:
+            try:
+                with self.timings.time("groq_call"):
+                    groq_result = await self.analyze_with_groq_async(text, listeners.on_mood, listeners.on_song)
+            finally:
+                if self.reply_listeners.get(key) is listeners:
+                    del self.reply_listeners[key]
+            
+            if groq_result:
+                self.cache.set(key, (groq_result["mood_analysis"], groq_result.get("song_recommendations", [])))
+            return groq_result
+        
+        return await self.groq_flight.do(key, call_groq)
+    
+    async def analyze_async(self, text: str, on_mood=None, on_song=None) -> tuple:
+        """
+        Async version of analyze - same cache → Groq → VADER flow
+        
+        With GROQ_LATENCY_BUDGET set, VADER is scored up front and Groq gets
+        that many seconds. If Groq misses the deadline the VADER result is
+        returned (no song suggestions, so curated songs are used) and Groq
+        either finishes in the background to warm the cache or is cancelled.
+        Either way on_mood / on_song aren't called after the deadline.
+        
+        on_mood / on_song are passed to analyze_with_groq_async, so callers
+        can start on songs while Groq is still writing the summary.
+        """
+        start = time.perf_counter()
+        key = self._cache_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.timings.record("cache", time.perf_counter() - start)
+            return cached
+        
+        budget = settings.GROQ_LATENCY_BUDGET
+        if budget > 0 and self.groq_async:
+            # Hedge: VADER is ready in microseconds, Groq races the budget
+            vader_result = self.sentiment.analyze(text)
+            groq_task = asyncio.create_task(self._analyze_with_groq_cached(text, key, on_mood, on_song))
+            try:
+                groq_result = await asyncio.wait_for(asyncio.shield(groq_task), timeout=budget)
+            except asyncio.TimeoutError:
+                # This request has its answer - only the cache is waiting for Groq now
+                listeners = self.reply_listeners.get(key)
+                if listeners is not None:
+                    listeners.remove(on_mood, on_song)
+                
+                if settings.GROQ_BACKGROUND_COMPLETION:
+                    self.background_tasks.add(groq_task)
+                    groq_task.add_done_callback(self.background_tasks.discard)
+                else:
+                    groq_task.cancel()
+                
+                print(f"⏱️ Groq over {budget}s budget, using VADER")
+                self.timings.record("vader_budget", time.perf_counter() - start)
+                return vader_result, []
+        else:
+            groq_result = await self._analyze_with_groq_cached(text, key, on_mood, on_song)
+            vader_result = None
+        
+        if groq_result:
+            self.timings.record("groq", time.perf_counter() - start)
+            return groq_result["mood_analysis"], groq_result.get("song_recommendations", [])
+        
+        print("⚠️ Falling back to VADER")
+        result = vader_result or self.sentiment.analyze(text)
+        self.timings.record("vader_fallback", time.perf_counter() - start)
+        return result, []
+    
+    async def analyze_batch_async(self, texts: list):
+        """
+        Analyze many texts at once - for bulk jobs
+        
+        - VADER scores every text in one pass up front (used where Groq fails)
+        - Cached and duplicate texts skip the LLM
+        - Remaining texts are packed GROQ_BATCH_SIZE per Groq prompt
+        
+        Yields (index, mood_analysis, groq_song_recommendations) as each
+        Groq pack finishes, so callers can start on songs right away.
+        """
+        vader_results = self.sentiment.analyze_batch(texts)
+        
+        # Indexes waiting on each uncached normalized text
+        pending = {}
+        for index, text in enumerate(texts):
+            key = self._cache_key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield index, cached[0], cached[1]
+            else:
+                pending.setdefault(key, []).append(index)
+        
+        keys = list(pending)
+        batch_size = max(1, settings.GROQ_BATCH_SIZE)
+        packs = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, settings.GROQ_BATCH_CONCURRENCY))
+        
+        async def analyze_pack(pack_keys: list) -> tuple:
+            async with semaphore:
+                pack_texts = [texts[pending[key][0]] for key in pack_keys]
+                return pack_keys, await self.analyze_batch_with_groq_async(pack_texts)
+        
+        for next_pack in asyncio.as_completed([analyze_pack(pack) for pack in packs]):
+            pack_keys, groq_results = await next_pack
+            for key, groq_result in zip(pack_keys, groq_results):
+                if groq_result:
+                    result = groq_result["mood_analysis"], groq_result.get("song_recommendations", [])
+                    self.cache.set(key, result)
+                else:
+                    result = None
+                
+                for index in pending[key]:
+                    if result:
+                        yield index, result[0], result[1]
+                    else:
+                        yield index, vader_results[index], []
+    
+    def cancel_background_tasks(self):
+        """Stop Groq calls still running in the background (on shutdown)"""
+        for task in list(self.background_tasks):
+            task.cancel()
 
 mood_analyzer = MoodAnalyzer()
\ No newline at end of file
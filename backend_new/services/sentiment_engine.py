@@ -0,0 +1,145 @@
+"""
+Fast local sentiment - VADER compound scores for many texts at once
+
+VADER walks every word with a dozen rule checks, each re-lowercasing the
+whole sentence. For plain text (no negations, boosters, "but", idioms,
+emoji or shouted words) all those rules are no-ops and the compound score
+is just the summed lexicon valences plus punctuation emphasis - which
+numpy can do for a whole batch in one pass.
+
+Texts that use any of VADER's rules are scored by VADER itself, so results
+are identical to SentimentIntensityAnalyzer.polarity_scores either way.
+"""
+
+import string
+import numpy as np
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, NEGATE, SPECIAL_CASES
+from config.settings import settings
+from data.mood_buckets import MOOD_BUCKETS
+
+# Words that trigger VADER's negation / contrast rules
+RULE_WORDS = frozenset(NEGATE) | frozenset(BOOSTER_DICT) | {"no", "least", "but"}
+
+# Multi-word boosters and idioms ("kind of", "yeah right", "kiss of death")
+RULE_PHRASES = frozenset(p for p in BOOSTER_DICT if " " in p) | frozenset(SPECIAL_CASES)
+PHRASE_STARTS = frozenset(p.split()[0] for p in RULE_PHRASES)
+
+# Words that amplify the lexicon word right after them
+EMPHASIS_WORDS = frozenset({"this", "so"})
+
+ALPHA = 15  # VADER's normalization constant
+
+def _strip_punc_if_word(token: str) -> str:
+    """Same tokenization as VADER's SentiText (keeps emoticons like ':)')"""
+    stripped = token.strip(string.punctuation)
+    if len(stripped) <= 2:
+        return token
+    return stripped
+
+def _punctuation_emphasis(text: str) -> float:
+    """VADER's boost for '!' (up to 4) and repeated '?'"""
+    emphasis = min(text.count("!"), 4) * 0.292
+    question_marks = text.count("?")
+    if question_marks > 1:
+        emphasis += question_marks * 0.18 if question_marks <= 3 else 0.96
+    return emphasis
+
+class SentimentEngine:
+    """Batch VADER scoring, mapped to the same mood buckets as analyze_with_vader"""
+
+    def __init__(self, vader):
+        self.vader = vader
+        self.enabled = settings.SENTIMENT_FAST_PATH
+
+        # Lexicon compiled to word -> id and an id -> valence array
+        self.word_ids = {word: i for i, word in enumerate(vader.lexicon)}
+        self.valences = np.fromiter(vader.lexicon.values(), dtype=np.float64, count=len(vader.lexicon))
+
+        self.thresholds = np.array([bucket["min_score"] for bucket in MOOD_BUCKETS[1:]])
+
+        self.fast_scored = 0
+        self.vader_scored = 0
+
+    def _lexicon_ids(self, text: str):
+        """Lexicon ids of the words in text, or None if VADER's rules apply"""
+        if not text.isascii():
+            return None  # Emoji get replaced by descriptions first
+
+        words = [_strip_punc_if_word(token) for token in text.split()]
+        lowered = [word.lower() for word in words]
+        upper = [word.isupper() for word in words]
+        cap_diff = 0 < upper.count(True) < len(words)
+
+        ids = []
+        for i, word in enumerate(lowered):
+            if word in RULE_WORDS or "n't" in word:
+                return None
+            if i and lowered[i - 1] in PHRASE_STARTS and f"{lowered[i - 1]} {word}" in RULE_PHRASES:
+                return None
+            if i > 1 and lowered[i - 2] in PHRASE_STARTS and f"{lowered[i - 2]} {lowered[i - 1]} {word}" in RULE_PHRASES:
+                return None
+
+            word_id = self.word_ids.get(word)
+            if word_id is None:
+                continue
+            if cap_diff and upper[i]:
+                return None  # ALL CAPS word in a mixed-case sentence
+            if i > 2 and lowered[i - 1] in EMPHASIS_WORDS:
+                return None
+            ids.append(word_id)
+        return ids
+
+    def scores(self, texts: list) -> list:
+        """VADER compound score for each text"""
+        scores = [None] * len(texts)
+        fast_indexes = []
+        fast_ids = []
+        text_of_id = []
+
+        for index, text in enumerate(texts):
+            ids = self._lexicon_ids(text) if self.enabled else None
+            if ids is None:
+                scores[index] = self.vader.polarity_scores(text)["compound"]
+                continue
+            text_of_id.extend([len(fast_indexes)] * len(ids))
+            fast_indexes.append(index)
+            fast_ids.extend(ids)
+
+        if fast_indexes:
+            sums = np.bincount(
+                np.array(text_of_id, dtype=np.intp),
+                weights=self.valences[np.array(fast_ids, dtype=np.intp)],
+                minlength=len(fast_indexes)
+            )
+            emphasis = np.array([_punctuation_emphasis(texts[i]) for i in fast_indexes])
+            sums = sums + np.sign(sums) * emphasis  # bincount gives ints when no text has lexicon words
+            compounds = np.clip(sums / np.sqrt(sums * sums + ALPHA), -1.0, 1.0)
+            for index, compound in zip(fast_indexes, compounds.tolist()):
+                scores[index] = round(compound, 4)  # Python's round, as VADER does
+
+        self.fast_scored += len(fast_indexes)
+        self.vader_scored += len(texts) - len(fast_indexes)
+        return scores
+
+    def analyze_batch(self, texts: list) -> list:
+        """Mood analysis (analyze_with_vader format) for each text"""
+        scores = self.scores(texts)
+        buckets = np.searchsorted(self.thresholds, scores, side="right").tolist()
+        return [self._mood(score, MOOD_BUCKETS[bucket]) for score, bucket in zip(scores, buckets)]
+
+    def analyze(self, text: str) -> dict:
+        return self.analyze_batch([text])[0]
+
+    @staticmethod
+    def _mood(score: float, bucket: dict) -> dict:
+        return {
+            "score": score,
+            "magnitude": abs(score),
+            "mood_category": bucket["category"],
+            "mood_description": bucket["description"],
+            "intensity": "moderate",
+            "summary": bucket["summary"]
+        }
+
+    def stats(self) -> dict:
+        return {"fast_scored": self.fast_scored, "vader_scored": self.vader_scored}
@@ -0,0 +1,216 @@
+"""
+Local song catalog - mood-matched tracks without any network calls
+
+A directory of memory-mapped NumPy arrays (built by build_song_catalog.py
+from a CSV of tracks with valence/energy/tags), sorted by valence:
+
+    manifest.json       count, tag names, build time
+    valence.npy         float32, ascending
+    energy.npy          float32
+    tags.npy            uint64 bitmask of the track's tags (64 most common tags)
+    artist_ids.npy      int32, for the one-song-per-artist rule
+    text.npy            uint8 - name, artist, uri, album_art, external_url, UTF-8
+    text_offsets.npy    int64 - 5 fields per track, plus the end
+
+Nothing is read into memory up front; a query touches one valence window
+and the text of the 5 tracks it returns.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+import numpy as np
+from config.settings import settings
+
+TEXT_FIELDS = ("name", "artist", "uri", "album_art", "external_url")
+ARRAYS = ("valence", "energy", "tags", "artist_ids", "text", "text_offsets")
+CATALOG_VERSION = 1
+
+# Mood → target energy; magnitude (|score|) nudges it up or down
+INTENSITY_ENERGY = {"low": 0.3, "moderate": 0.55, "high": 0.8}
+
+def mood_target(mood_analysis: dict) -> tuple:
+    """(valence, energy) to look for, from MoodAnalyzer's score / magnitude / intensity"""
+    score = float(mood_analysis.get("score", 0.0))
+    magnitude = float(mood_analysis.get("magnitude", abs(score)))
+    energy = INTENSITY_ENERGY.get(mood_analysis.get("intensity"), 0.55) + 0.3 * (magnitude - 0.5)
+    return (score + 1) / 2, min(1.0, max(0.0, energy))
+
+class SongCatalog:
+    """Vectorized nearest-neighbour search over the catalog, by (valence, energy)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.arrays = None
+        self.tags = []
+        self.built_at = None
+        self._lock = threading.Lock()
+
+        # Counters
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.arrays is not None and len(self.arrays["valence"]) > 0
+
+    def __len__(self) -> int:
+        return len(self.arrays["valence"]) if self.arrays is not None else 0
+
+    def load(self) -> bool:
+        """Memory-map the catalog if it exists. Returns True on success"""
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return False
+
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != CATALOG_VERSION:
+                raise ValueError(f"unsupported catalog version {manifest.get('version')}")
+            arrays = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Song catalog load failed: {e}")
+            return False
+
+        # Page in the numeric arrays (a few bytes per track) so the first
+        # request doesn't pay for the page faults; text stays on disk
+        for name in ("valence", "energy", "tags", "artist_ids"):
+            arrays[name].max()
+
+        self.arrays = arrays
+        self.tags = manifest.get("tags", [])
+        self.built_at = manifest.get("built_at")
+        print(f"✅ Song catalog loaded: {len(self)} tracks")
+        return True
+
+    def _track(self, index: int) -> dict:
+        offsets = self.arrays["text_offsets"][index * 5:index * 5 + 6]
+        text = self.arrays["text"]
+        values = [bytes(text[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in range(5)]
+        return dict(zip(TEXT_FIELDS, values))
+
+    def _candidates(self, valence: float, energy: float, pool: int) -> np.ndarray:
+        """
+        Indexes of about `pool` tracks closest to the target, nearest first
+        Only a valence window around the target is scored - widened until
+        it holds enough tracks - so queries stay cheap on huge catalogs
+        """
+        valences = self.arrays["valence"]
+        total = len(valences)
+        half_width = max(0.005, 2 * pool / total)
+        while True:
+            lo = int(np.searchsorted(valences, valence - half_width, side="left"))
+            hi = int(np.searchsorted(valences, valence + half_width, side="right"))
+            if hi - lo >= 4 * pool or (lo == 0 and hi == total):
+                break
+            half_width *= 2
+
+        distances = (np.asarray(valences[lo:hi]) - valence) ** 2 + (np.asarray(self.arrays["energy"][lo:hi]) - energy) ** 2
+        pool = min(pool, len(distances))
+        if pool == 0:
+            return np.empty(0, dtype=np.int64)
+        nearest = np.argpartition(distances, pool - 1)[:pool]
+
+        # Jitter within the pool so the same mood doesn't always get the same songs
+        jitter = np.random.uniform(0, max(float(distances[nearest].mean()), 1e-6), size=pool)
+        return nearest[np.argsort(distances[nearest] + jitter)] + lo
+
+    def query(self, mood_analysis: dict, k: int = 5, exclude_uris: set = None) -> list:
+        """
+        k formatted tracks matching the mood, from different artists and
+        with at most 2 sharing a primary tag ([] if the catalog isn't loaded)
+        """
+        if not self.ready:
+            return []
+
+        start = time.perf_counter()
+        valence, energy = mood_target(mood_analysis)
+        candidates = self._candidates(valence, energy, max(settings.SONG_CATALOG_CANDIDATES, k * 4))
+
+        artist_ids = self.arrays["artist_ids"]
+        tags = self.arrays["tags"]
+        artists, tag_counts, tracks = set(), {}, []
+        for index in candidates.tolist():
+            artist = int(artist_ids[index])
+            mask = int(tags[index])
+            primary = mask & -mask  # Lowest set bit
+            if artist in artists or (primary and tag_counts.get(primary, 0) >= 2):
+                continue
+            track = self._track(index)
+            if exclude_uris and track["uri"] in exclude_uris:
+                continue
+
+            artists.add(artist)
+            tag_counts[primary] = tag_counts.get(primary, 0) + 1
+            tracks.append(track)
+            if len(tracks) >= k:
+                break
+
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - start
+        return tracks
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "tracks": len(self),
+                "built_at": self.built_at,
+                "queries": self.queries,
+                "avg_query_ms": round(1000 * self.query_seconds / self.queries, 3) if self.queries else 0.0
+            }
+
+def _text_blob(rows: list) -> tuple:
+    """All text fields as one UTF-8 byte array plus offsets"""
+    encoded = [row[field].encode("utf-8") for row in rows for field in TEXT_FIELDS]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def write_catalog(rows: list, path: str) -> int:
+    """
+    Write tracks (dicts with TEXT_FIELDS, valence, energy, tags) as a catalog
+    Replaces an existing catalog at path; running workers keep reading
+    their mapped copy until they reload. Returns the track count.
+    """
+    rows = sorted(rows, key=lambda row: row["valence"])
+    tag_names = [tag for tag, _ in Counter(tag for row in rows for tag in row["tags"]).most_common(64)]
+    tag_bits = {tag: 1 << i for i, tag in enumerate(tag_names)}
+    artist_ids = {}
+
+    text, text_offsets = _text_blob(rows)
+    arrays = {
+        "valence": np.array([row["valence"] for row in rows], dtype=np.float32),
+        "energy": np.array([row["energy"] for row in rows], dtype=np.float32),
+        "tags": np.array([sum(tag_bits.get(tag, 0) for tag in set(row["tags"])) for row in rows], dtype=np.uint64),
+        "artist_ids": np.array(
+            [artist_ids.setdefault(row["artist"].split(",")[0].split(";")[0].strip().lower(), len(artist_ids)) for row in rows],
+            dtype=np.int32
+        ),
+        "text": text,
+        "text_offsets": text_offsets
+    }
+
+    temp_path = f"{path.rstrip(os.sep)}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, f"{name}.npy"), array)
+    with open(os.path.join(temp_path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": CATALOG_VERSION, "count": len(rows), "tags": tag_names, "built_at": time.time()}, f)
+
+    # Swap directories - the old files stay readable for anyone who has them mapped
+    old_path = f"{path.rstrip(os.sep)}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(temp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return len(rows)
+
+song_catalog = SongCatalog(settings.SONG_CATALOG_PATH)
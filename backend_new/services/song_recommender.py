@@ -1,25 +1,163 @@
 """Song recommendation using multiple strategies"""
 
+import asyncio
 import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from services.spotify_client import spotify_client
+from services.library_index import library_index
+from services.song_catalog import song_catalog
 from data.mood_libraries import MOOD_SONG_LIBRARIES
+from config.settings import settings
+from utils.metrics import SPECULATIVE_PREFETCH, STRATEGY_SERVED, track_stage
+
+class SearchMemo(dict):
+    """
+    One request's Spotify searches by cache key, so none is started twice
+    Speculative searches, streamed Groq prefetches and the strategies all
+    share its limit of SPOTIFY_SEARCH_CONCURRENCY searches in flight.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.semaphore = asyncio.Semaphore(max(1, settings.SPOTIFY_SEARCH_CONCURRENCY))
+
+class LibrarySpeculation:
+    """
+    Curated library searches started for a predicted mood (VADER) while
+    the real mood analysis is still running
+
+    Strategy 2 claims them if the prediction was right; otherwise, or if
+    Groq's suggestions are used, the searches still in flight are cancelled.
+    """
+    
+    def __init__(self, mood_category: str, searches: list, search_memo: dict):
+        self.mood_category = mood_category
+        self.searches = searches
+        self.search_memo = search_memo
+        self.outcome = None  # "used", "mispredicted" or "unused" once settled
+    
+    def _settle(self, outcome: str):
+        if self.outcome is None:
+            self.outcome = outcome
+            SPECULATIVE_PREFETCH.labels(outcome).inc()
+            if outcome != "used":
+                # Out of the memo too, so a later identical search starts afresh
+                for query, limit in self.searches:
+                    future = self.search_memo.pop(spotify_client._cache_key(query, limit), None)
+                    if future and not future.done():
+                        future.cancel()
+    
+    def claim(self, mood_category: str) -> list:
+        """The speculative searches if they were for this mood, else None"""
+        if mood_category == self.mood_category and self.outcome is None:
+            self._settle("used")
+            return self.searches
+        self._settle("mispredicted")
+        return None
+    
+    def discard(self):
+        """
+        The request is done - cancel whatever is still running, including
+        searches started in search_memo that no strategy ended up using
+        """
+        self._settle("unused")
+        for future in self.search_memo.values():
+            if not future.done():
+                future.cancel()
 
 class SongRecommender:
     """Recommends songs based on mood using Spotify + curated libraries"""
     
-    def get_from_groq_suggestions(self, groq_recs: list) -> list:
+    def __init__(self):
+        # Shared by all requests; each request is still capped at
+        # SPOTIFY_SEARCH_CONCURRENCY searches in flight
+        self.search_pool = ThreadPoolExecutor(
+            max_workers=max(1, settings.SPOTIFY_SEARCH_POOL_SIZE),
+            thread_name_prefix="spotify-search"
+        )
+    
+    def search_many(self, searches: list) -> list:
         """
-        Strategy 1: Use Groq's AI song suggestions
-        Search each suggestion on Spotify
+        Run several Spotify searches concurrently
+        
+        Args:
+            searches: List of (query, limit) tuples
+            
+        Returns:
+            List of search results, in the same order as searches
         """
-        if not groq_recs:
+        results = [[] for _ in searches]
+        pending = {}
+        queue = list(enumerate(searches))
+        max_in_flight = max(1, settings.SPOTIFY_SEARCH_CONCURRENCY)
+        
+        while queue or pending:
+            # Top up to the per-request limit, then wait for any to finish
+            while queue and len(pending) < max_in_flight:
+                index, (query, limit) = queue.pop(0)
+                future = self.search_pool.submit(spotify_client.search_track, query, limit=limit)
+                pending[future] = index
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+        
+        return results
+    
+    async def search_many_async(self, searches: list, search_memo: dict = None) -> list:
+        """
+        Async version of search_many
+        At most SPOTIFY_SEARCH_CONCURRENCY searches are in flight at once
+        
+        search_memo: optional dict shared across calls (e.g. a whole batch)
+            so identical searches run once and share the result - a
+            SearchMemo also shares one limit across them
+        """
+        if not searches:
             return []
         
+        memo = {} if search_memo is None else search_memo
+        semaphore = self._search_limit(memo)
+        return await asyncio.gather(*(self._start_search(query, limit, memo, semaphore) for query, limit in searches))
+    
+    @staticmethod
+    def _search_limit(search_memo: dict) -> asyncio.Semaphore:
+        """The request's shared limit for a SearchMemo, a new one for a plain dict"""
+        semaphore = getattr(search_memo, "semaphore", None)
+        return semaphore or asyncio.Semaphore(max(1, settings.SPOTIFY_SEARCH_CONCURRENCY))
+    
+    async def _limited_search(self, query: str, limit: int, semaphore: asyncio.Semaphore) -> list:
+        async with semaphore:
+            return await spotify_client.search_track_async(query, limit=limit)
+    
+    def _start_search(self, query: str, limit: int, search_memo: dict, semaphore: asyncio.Semaphore) -> asyncio.Future:
+        """Start a search under semaphore, or return the same one already started in search_memo"""
+        key = spotify_client._cache_key(query, limit)
+        if key not in search_memo:
+            search_memo[key] = asyncio.ensure_future(self._limited_search(query, limit, semaphore))
+        return search_memo[key]
+    
+    def _groq_searches(self, groq_recs: list) -> list:
+        """Build one (query, limit) search per Groq suggestion"""
+        return [
+            (f"{song_info.get('name', '')} {song_info.get('artist', '')}", 1)
+            for song_info in groq_recs
+        ]
+    
+    def prefetch_groq_suggestion(self, song_info: dict, search_memo: dict):
+        """
+        Start the Spotify search for one Groq suggestion while Groq is still
+        streaming - recommend_async / recommend_stream_async pick it up from
+        search_memo (a SearchMemo, whose limit it counts against)
+        """
+        semaphore = self._search_limit(search_memo)
+        for query, limit in self._groq_searches([song_info]):
+            self._start_search(query, limit, search_memo, semaphore)
+    
+    def _tracks_from_groq_results(self, results_list: list) -> list:
+        """Turn Groq suggestion search results into formatted tracks"""
         tracks = []
-        for song_info in groq_recs:
-            query = f"{song_info.get('name', '')} {song_info.get('artist', '')}"
-            results = spotify_client.search_track(query, limit=1)
-            
+        for results in results_list:
             if results:
                 tracks.append(spotify_client.format_track(results[0]))
             
@@ -29,31 +167,73 @@ class SongRecommender:
         print(f"✅ Got {len(tracks)} songs from Groq suggestions")
         return tracks
     
-    def get_from_mood_library(self, mood_category: str) -> list:
+    def get_from_groq_suggestions(self, groq_recs: list) -> list:
         """
-        Strategy 2: Use curated mood library
-        Search library songs on Spotify, fill with mood-based search
+        Strategy 1: Use Groq's AI song suggestions
+        Search each suggestion on Spotify
+        """
+        if not groq_recs:
+            return []
+        
+        results_list = self.search_many(self._groq_searches(groq_recs))
+        return self._tracks_from_groq_results(results_list)
+    
+    async def get_from_groq_suggestions_async(self, groq_recs: list, search_memo: dict = None) -> list:
+        """Async version of get_from_groq_suggestions"""
+        if not groq_recs:
+            return []
+        
+        results_list = await self.search_many_async(self._groq_searches(groq_recs), search_memo)
+        return self._tracks_from_groq_results(results_list)
+    
+    def _library_searches(self, mood_category: str) -> list:
+        """
+        Pick 3 library songs for the mood and build their searches
+        Last search is a mood-based search used as filler
         """
         mood_songs = MOOD_SONG_LIBRARIES.get(mood_category, [])
         selected_songs = random.sample(mood_songs, min(3, len(mood_songs)))
         
-        tracks = []
+        searches = [(f"{song_info['name']} {song_info['artist']}", 1) for song_info in selected_songs]
+        if selected_songs:
+            search_terms = random.choice(selected_songs)['search_terms']
+            searches.append((random.choice(search_terms), 10))
+        return searches
+    
+    def speculate(self, predicted_category: str, search_memo: dict) -> LibrarySpeculation:
+        """
+        Start Strategy 2's Spotify searches for a predicted mood right away,
+        within the request's SearchMemo limit. Returns None when there's nothing to gain (disabled, Spotify's circuit
+        is open, or the song catalog / library index already serves songs
+        without Spotify calls)
+        """
+        if not settings.SPECULATIVE_PREFETCH or not spotify_client.breaker.available or song_catalog.ready:
+            return None
+        if self._from_library_index(predicted_category):
+            return None
         
-        # Search for each selected song
-        for song_info in selected_songs:
-            query = f"{song_info['name']} {song_info['artist']}"
-            results = spotify_client.search_track(query, limit=1)
-            
+        searches = self._library_searches(predicted_category)
+        if not searches:
+            return None
+        
+        semaphore = self._search_limit(search_memo)
+        for query, limit in searches:
+            self._start_search(query, limit, search_memo, semaphore)
+        return LibrarySpeculation(predicted_category, searches, search_memo)
+    
+    def _tracks_from_library_results(self, results_list: list) -> list:
+        """Turn library search results into formatted tracks, filler last"""
+        song_results = results_list[:-1]
+        filler_results = results_list[-1:]
+        
+        tracks = []
+        for results in song_results:
             if results:
                 tracks.append(spotify_client.format_track(results[0]))
         
         # Fill remaining slots with mood-based search
-        if len(tracks) < 5 and selected_songs:
-            search_terms = random.choice(selected_songs)['search_terms']
-            search_term = random.choice(search_terms)
-            results = spotify_client.search_track(search_term, limit=10)
-            
-            for track in results:
+        if len(tracks) < 5 and filler_results:
+            for track in filler_results[0]:
                 if len(tracks) >= 5:
                     break
                 formatted = spotify_client.format_track(track)
@@ -64,16 +244,81 @@ class SongRecommender:
         print(f"✅ Got {len(tracks)} songs from mood library")
         return tracks[:5]
     
+    def _from_library_index(self, mood_category: str) -> list:
+        """Curated picks from the pre-resolved index - no Spotify calls"""
+        indexed = library_index.get(mood_category)
+        if len(indexed) < 3:
+            return []
+        
+        tracks = random.sample(indexed, min(5, len(indexed)))
+        print(f"✅ Got {len(tracks)} songs from library index")
+        return tracks
+    
+    def get_from_mood_library(self, mood_category: str) -> list:
+        """
+        Strategy 2: Use curated mood library
+        Serve from the library index when built, otherwise search library
+        songs on Spotify and fill with mood-based search
+        """
+        tracks = self._from_library_index(mood_category)
+        if tracks:
+            return tracks
+        
+        # Curated songs and the filler search all go out at once
+        results_list = self.search_many(self._library_searches(mood_category))
+        return self._tracks_from_library_results(results_list)
+    
+    async def get_from_mood_library_async(self, mood_category: str, search_memo: dict = None,
+                                          speculation: LibrarySpeculation = None) -> list:
+        """
+        Async version of get_from_mood_library
+        Reuses a correct speculation's searches (already started in search_memo)
+        """
+        tracks = self._from_library_index(mood_category)
+        if tracks:
+            return tracks
+        
+        searches = speculation.claim(mood_category) if speculation else None
+        results_list = await self.search_many_async(searches or self._library_searches(mood_category), search_memo)
+        return self._tracks_from_library_results(results_list)
+    
+    def get_from_catalog(self, mood_analysis: dict, exclude_uris: set = None) -> list:
+        """
+        Strategy 2 with a song catalog loaded: nearest tracks to the mood's
+        valence/energy from the local catalog - no Spotify calls
+        """
+        tracks = song_catalog.query(mood_analysis, k=5, exclude_uris=exclude_uris)
+        if tracks:
+            print(f"✅ Got {len(tracks)} songs from song catalog")
+        return tracks
+    
     def get_fallback_songs(self, mood_category: str) -> list:
         """
         Strategy 3: Use curated fallback (when Spotify fails)
-        Returns curated songs without Spotify links
+        Returns indexed curated songs if the library index is built,
+        topped up with curated songs without Spotify links when it has
+        fewer than 5 for the mood
         """
-        mood_songs = MOOD_SONG_LIBRARIES.get(mood_category, [])
-        selected = random.sample(mood_songs, min(5, len(mood_songs)))
+        indexed = library_index.get(mood_category)
+        tracks = random.sample(indexed, min(5, len(indexed)))
+        if len(tracks) >= 5:
+            print(f"✅ Using {len(tracks)} indexed fallback songs")
+            return tracks
         
-        print(f"✅ Using {len(selected)} curated fallback songs")
-        return [{
+        # A partial index entry (songs Spotify couldn't resolve) is filled
+        # with the curated songs it doesn't already have
+        picked = {t['name'].lower() for t in tracks}
+        mood_songs = [
+            song for song in MOOD_SONG_LIBRARIES.get(mood_category, [])
+            if song['name'].lower() not in picked
+        ]
+        selected = random.sample(mood_songs, min(5 - len(tracks), len(mood_songs)))
+        
+        if tracks:
+            print(f"✅ Using {len(tracks)} indexed + {len(selected)} curated fallback songs")
+        else:
+            print(f"✅ Using {len(selected)} curated fallback songs")
+        return tracks + [{
             'name': song['name'],
             'artist': song['artist'],
             'uri': f'spotify:track:fallback_{mood_category}_{i}',
@@ -81,13 +326,28 @@ class SongRecommender:
             'external_url': f'https://open.spotify.com/search/{song["name"]} {song["artist"]}'
         } for i, song in enumerate(selected)]
     
+    def _top_up(self, tracks: list, mood_analysis: dict) -> list:
+        """Fill a 3-4 song result up to 5 with catalog or fallback songs it doesn't already have"""
+        tracks = tracks[:5]
+        if len(tracks) >= 5:
+            return tracks
+        
+        uris = {t['uri'] for t in tracks}
+        extra = self.get_from_catalog(mood_analysis, uris) + self.get_fallback_songs(mood_analysis['mood_category'])
+        for song in extra:
+            if len(tracks) >= 5:
+                break
+            if not any(t['uri'] == song['uri'] for t in tracks):
+                tracks.append(song)
+        return tracks
+    
     def recommend(self, mood_analysis: dict, groq_recs: list = None) -> list:
         """
         MAIN FUNCTION - Get 5 songs using multiple strategies
         
         Flow:
         1. Try Groq song recommendations → Spotify
-        2. Try mood library → Spotify  
+        2. Song catalog if loaded, else mood library → Spotify
         3. Use curated fallback songs
         
         Always returns exactly 5 songs
@@ -95,18 +355,236 @@ class SongRecommender:
         # Strategy 1: Groq recommendations
         if groq_recs:
             print("🎵 Strategy 1: Trying Groq recommendations")
-            tracks = self.get_from_groq_suggestions(groq_recs)
+            with track_stage("strategy_groq"):
+                tracks = self.get_from_groq_suggestions(groq_recs)
+            if len(tracks) >= 3:
+                STRATEGY_SERVED.labels("groq").inc()
+                return self._top_up(tracks, mood_analysis)
+        
+        # Strategy 2: Local song catalog - no network
+        if song_catalog.ready:
+            print("🎵 Strategy 2: Trying song catalog")
+            with track_stage("strategy_catalog"):
+                tracks = self.get_from_catalog(mood_analysis)
+            if len(tracks) >= 3:
+                STRATEGY_SERVED.labels("catalog").inc()
+                return self._top_up(tracks, mood_analysis)
+        
+        # Strategy 2: Mood library with Spotify
+        print("🎵 Strategy 2: Trying mood library + Spotify")
+        with track_stage("strategy_mood_library"):
+            tracks = self.get_from_mood_library(mood_analysis['mood_category'])
+        if len(tracks) >= 3:
+            STRATEGY_SERVED.labels("mood_library").inc()
+            return self._top_up(tracks, mood_analysis)
+        
+        # Strategy 3: Curated fallback
+        print("🎵 Strategy 3: Using curated fallback")
+        STRATEGY_SERVED.labels("fallback").inc()
+        return self.get_fallback_songs(mood_analysis['mood_category'])
+    
+    async def recommend_async(self, mood_analysis: dict, groq_recs: list = None, search_memo: dict = None,
+                              speculation: LibrarySpeculation = None) -> list:
+        """
+        Async version of recommend - same strategies, non-blocking searches
+        speculation: from speculate(), sharing search_memo - used by Strategy 2
+            if it guessed the mood right, cancelled otherwise
+        """
+        try:
+            return await self._recommend_async(mood_analysis, groq_recs, search_memo, speculation)
+        finally:
+            if speculation:
+                speculation.discard()
+    
+    async def _recommend_async(self, mood_analysis: dict, groq_recs: list, search_memo: dict,
+                               speculation: LibrarySpeculation) -> list:
+        # Strategy 1: Groq recommendations
+        if groq_recs:
+            print("🎵 Strategy 1: Trying Groq recommendations")
+            with track_stage("strategy_groq"):
+                tracks = await self.get_from_groq_suggestions_async(groq_recs, search_memo)
+            if len(tracks) >= 3:
+                STRATEGY_SERVED.labels("groq").inc()
+                return self._top_up(tracks, mood_analysis)
+        
+        # Strategy 2: Local song catalog - no network
+        if song_catalog.ready:
+            print("🎵 Strategy 2: Trying song catalog")
+            with track_stage("strategy_catalog"):
+                tracks = self.get_from_catalog(mood_analysis)
             if len(tracks) >= 3:
-                return tracks[:5]
+                STRATEGY_SERVED.labels("catalog").inc()
+                return self._top_up(tracks, mood_analysis)
         
         # Strategy 2: Mood library with Spotify
         print("🎵 Strategy 2: Trying mood library + Spotify")
-        tracks = self.get_from_mood_library(mood_analysis['mood_category'])
+        with track_stage("strategy_mood_library"):
+            tracks = await self.get_from_mood_library_async(mood_analysis['mood_category'], search_memo, speculation)
         if len(tracks) >= 3:
-            return tracks[:5]
+            STRATEGY_SERVED.labels("mood_library").inc()
+            return self._top_up(tracks, mood_analysis)
         
         # Strategy 3: Curated fallback
         print("🎵 Strategy 3: Using curated fallback")
+        STRATEGY_SERVED.labels("fallback").inc()
         return self.get_fallback_songs(mood_analysis['mood_category'])
+    
+    async def _search_as_completed(self, searches: list, search_memo: dict = None):
+        """
+        Start searches concurrently and yield each result as it arrives
+        Searches already started in search_memo are reused
+        """
+        memo = {} if search_memo is None else search_memo
+        semaphore = self._search_limit(memo)
+        tasks = [
+            memo.get(spotify_client._cache_key(query, limit)) or asyncio.ensure_future(self._limited_search(query, limit, semaphore))
+            for query, limit in searches
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def recommend_stream_async(self, mood_analysis: dict, groq_recs: list = None, search_memo: dict = None,
+                                     speculation: LibrarySpeculation = None):
+        """
+        Streaming version of recommend_async for /recommend/stream
+        Yields each track as soon as its Spotify search resolves.
+        
+        Same strategy order, but a track that was already sent can't be
+        taken back, so each strategy fills the slots the previous one left
+        instead of replacing its results. Stops after 5 tracks. Every
+        strategy that contributed a track is counted in the strategy metric.
+        """
+        try:
+            async for track in self._recommend_stream_async(mood_analysis, groq_recs, search_memo, speculation):
+                yield track
+        finally:
+            if speculation:
+                speculation.discard()
+    
+    async def _recommend_stream_async(self, mood_analysis: dict, groq_recs: list, search_memo: dict,
+                                      speculation: LibrarySpeculation):
+        sent_uris = set()
+        contributed = set()
+        strategy = "groq"
+        
+        def take(track: dict) -> bool:
+            """True if the track should be sent (not a duplicate, slots left)"""
+            if len(sent_uris) >= 5 or track['uri'] in sent_uris:
+                return False
+            sent_uris.add(track['uri'])
+            if strategy not in contributed:
+                contributed.add(strategy)
+                STRATEGY_SERVED.labels(strategy).inc()
+            return True
+        
+        # Strategy 1: Groq recommendations
+        if groq_recs:
+            print("🎵 Strategy 1: Streaming Groq recommendations")
+            async for results in self._search_as_completed(self._groq_searches(groq_recs), search_memo):
+                if results:
+                    track = spotify_client.format_track(results[0])
+                    if take(track):
+                        yield track
+                if len(sent_uris) >= 5:
+                    return
+        
+        # Strategy 2: Local song catalog - no network
+        mood_category = mood_analysis['mood_category']
+        if song_catalog.ready:
+            print("🎵 Strategy 2: Streaming song catalog")
+            strategy = "catalog"
+            for track in self.get_from_catalog(mood_analysis, sent_uris):
+                if take(track):
+                    yield track
+            if len(sent_uris) >= 5:
+                return
+        
+        # Strategy 2: Mood library - index first, else Spotify
+        print("🎵 Strategy 2: Streaming mood library")
+        strategy = "mood_library"
+        indexed = self._from_library_index(mood_category)
+        if indexed:
+            for track in indexed:
+                if take(track):
+                    yield track
+        else:
+            searches = (speculation.claim(mood_category) if speculation else None) or self._library_searches(mood_category)
+            filler = None
+            if searches:
+                query, limit = searches[-1]
+                memo = {} if search_memo is None else search_memo
+                filler = self._start_search(query, limit, memo, self._search_limit(memo))
+            try:
+                async for results in self._search_as_completed(searches[:-1], search_memo):
+                    if results:
+                        track = spotify_client.format_track(results[0])
+                        if take(track):
+                            yield track
+                
+                # Filler only after the curated songs, as in recommend
+                if filler and len(sent_uris) < 5:
+                    for track in await filler:
+                        formatted = spotify_client.format_track(track)
+                        if take(formatted):
+                            yield formatted
+            finally:
+                if filler:
+                    filler.cancel()
+        
+        if len(sent_uris) >= 5:
+            return
+        
+        # Strategy 3: Curated fallback fills whatever is left
+        print("🎵 Strategy 3: Filling with curated fallback")
+        strategy = "fallback"
+        for track in self.get_fallback_songs(mood_category):
+            if take(track):
+                yield track
+    
+    async def recommend_batch_async(self, analyses):
+        """
+        Recommend songs for many analyses - for bulk jobs
+        
+        Args:
+            analyses: Async iterable of (index, mood_analysis, groq_recs),
+                e.g. MoodAnalyzer.analyze_batch_async
+        
+        Yields (index, mood_analysis, songs, error) as each item finishes.
+        Identical Spotify searches across the whole batch run only once.
+        """
+        search_memo = {}
+        finished = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max(1, settings.BATCH_ITEM_CONCURRENCY))
+        item_tasks = []
+        
+        async def recommend_item(index: int, mood_analysis: dict, groq_recs: list):
+            try:
+                async with semaphore:
+                    songs = await self.recommend_async(mood_analysis, groq_recs, search_memo)
+                await finished.put((index, mood_analysis, songs, None))
+            except Exception as e:
+                await finished.put((index, mood_analysis, [], str(e)))
+        
+        async def start_items():
+            try:
+                async for index, mood_analysis, groq_recs in analyses:
+                    item_tasks.append(asyncio.create_task(recommend_item(index, mood_analysis, groq_recs)))
+                await asyncio.gather(*item_tasks)
+            finally:
+                await finished.put(None)  # Done marker
+        
+        producer = asyncio.create_task(start_items())
+        try:
+            while (item := await finished.get()) is not None:
+                yield item
+            await producer  # Surface errors from the analysis side
+        finally:
+            producer.cancel()
+            for task in item_tasks:
+                task.cancel()
 
 song_recommender = SongRecommender()
\ No newline at end of file
@@ -1,29 +1,228 @@
 """Spotify API client wrapper"""
 
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
+import asyncio
+import random
+import threading
+import time
+import httpx
 from config.settings import settings
+from utils.cache import TTLCache, SQLiteCache, TieredCache
+from utils.http_transport import http_pools
+from utils.metrics import track_upstream
+from utils.resilience import CircuitOpenError, RateLimitedError, circuit_breakers
+from utils.singleflight import SingleFlight
+
+# A token this close to expiry is treated as expired
+TOKEN_EXPIRY_SLACK = 60
+
+class SharedTokenManager:
+    """spotipy auth manager that reads SpotifyClient's token instead of fetching its own"""
+    
+    def __init__(self, spotify_client: "SpotifyClient"):
+        self.spotify_client = spotify_client
+    
+    def get_access_token(self, as_dict: bool = False) -> str:
+        return self.spotify_client.get_access_token()
 
 class SpotifyClient:
     """Handles all Spotify API operations"""
     
     def __init__(self):
-        self.client = spotipy.Spotify(
-            client_credentials_manager=SpotifyClientCredentials(
-                client_id=settings.SPOTIPY_CLIENT_ID,
-                client_secret=settings.SPOTIPY_CLIENT_SECRET
-            )
+        # Sync path: spotipy, built on first use (the API only uses the async path)
+        self._client = None
+        self._client_lock = threading.Lock()
+        
+        # Async path: plain HTTP against the Web API (spotipy is sync only)
+        self.http = None
+        
+        # One client-credentials token for both paths, kept fresh in the background
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+        self._sync_token_lock = threading.Lock()
+        self.token_refresh_task = None
+        
+        # Open while Spotify is failing - searches come back empty at once
+        self.breaker = circuit_breakers["spotify"]
+        
+        # Search results cache - same titles get searched over and over
+        self.search_cache = TieredCache(
+            TTLCache(max_size=settings.SPOTIFY_CACHE_SIZE, ttl=settings.SPOTIFY_CACHE_TTL),
+            SQLiteCache(settings.SPOTIFY_CACHE_DB_PATH, ttl=settings.SPOTIFY_CACHE_TTL)
+            if settings.SPOTIFY_CACHE_DB_PATH else None
         )
+        
+        # Cache misses for a query already being searched wait for that search
+        self.search_flight = SingleFlight("spotify_search")
         print("✅ Spotify client initialized")
     
+    @property
+    def client(self):
+        """spotipy on a pooled session, sharing the token below"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import spotipy  # Deferred - only the sync path needs it
+                    
+                    client = spotipy.Spotify(
+                        auth_manager=SharedTokenManager(self),
+                        requests_session=http_pools.requests_session(settings.SPOTIFY_SEARCH_POOL_SIZE),
+                        requests_timeout=settings.SPOTIFY_TIMEOUT
+                    )
+                    client.prefix = f"{settings.SPOTIFY_API_URL}/"
+                    self._client = client
+        return self._client
+    
+    def preload(self):
+        """Create the async HTTP client at startup instead of on the first search"""
+        self._get_http()
+    
+    def status(self) -> dict:
+        """Client readiness for /ready"""
+        return {"configured": True, "initialized": self.http is not None, "token": self._token_fresh()}
+    
+    def _get_http(self) -> httpx.AsyncClient:
+        """The shared keep-alive client for Spotify"""
+        if self.http is None:
+            self.http = http_pools.async_client("spotify", settings.SPOTIFY_TIMEOUT)
+        return self.http
+    
+    def _token_fresh(self) -> bool:
+        return self._token is not None and time.time() < self._token_expires_at - TOKEN_EXPIRY_SLACK
+    
+    def _store_token(self, token_info: dict):
+        self._token = token_info['access_token']
+        self._token_expires_at = time.time() + token_info.get('expires_in', 3600)
+    
+    async def _fetch_token_async(self) -> str:
+        """Request a new client-credentials token"""
+        with self.breaker.guard(), track_upstream("spotify", "token"):
+            response = await self._get_http().post(
+                settings.SPOTIFY_TOKEN_URL,
+                data={"grant_type": "client_credentials"},
+                auth=(settings.SPOTIPY_CLIENT_ID, settings.SPOTIPY_CLIENT_SECRET)
+            )
+            response.raise_for_status()
+        self._store_token(response.json())
+        return self._token
+    
+    async def _get_access_token_async(self) -> str:
+        """Get the current token - only fetches if background refresh fell behind"""
+        if self._token_fresh():
+            return self._token
+        
+        async with self._token_lock:
+            # Another request may have refreshed it while we waited
+            if self._token_fresh():
+                return self._token
+            return await self._fetch_token_async()
+    
+    def get_access_token(self) -> str:
+        """Sync version for spotipy (runs in worker threads)"""
+        if self._token_fresh():
+            return self._token
+        
+        with self._sync_token_lock:
+            if self._token_fresh():
+                return self._token
+            
+            with self.breaker.guard(), track_upstream("spotify", "token"):
+                response = http_pools.client("spotify", settings.SPOTIFY_TIMEOUT).post(
+                    settings.SPOTIFY_TOKEN_URL,
+                    data={"grant_type": "client_credentials"},
+                    auth=(settings.SPOTIPY_CLIENT_ID, settings.SPOTIPY_CLIENT_SECRET)
+                )
+                response.raise_for_status()
+            self._store_token(response.json())
+            return self._token
+    
+    async def _refresh_token_forever(self):
+        """Fetch a new token ahead of expiry so no request waits on one"""
+        while True:
+            try:
+                async with self._token_lock:
+                    await self._fetch_token_async()
+                delay = self._token_expires_at - time.time() - settings.SPOTIFY_TOKEN_REFRESH_MARGIN
+                delay = max(delay, TOKEN_EXPIRY_SLACK)
+            except Exception as e:
+                print(f"❌ Spotify token refresh failed: {e}")
+                delay = random.uniform(5, 15)
+            await asyncio.sleep(delay)
+    
+    def start_token_refresh(self):
+        """Startup hook - begin background token refresh"""
+        if self.token_refresh_task is None:
+            self.token_refresh_task = asyncio.create_task(self._refresh_token_forever())
+    
+    def _cache_key(self, query: str, limit: int) -> str:
+        """Normalize so 'Happy  Pharrell williams' and 'happy pharrell williams' share an entry"""
+        return f"{limit}:{' '.join(query.lower().split())}"
+    
+    def _cache_ttl(self, tracks: list) -> int:
+        """Failed or empty lookups are only cached briefly"""
+        return settings.SPOTIFY_CACHE_TTL if tracks else settings.SPOTIFY_CACHE_NEGATIVE_TTL
+    
     def search_track(self, query: str, limit: int = 1) -> list:
         """Search for tracks on Spotify"""
+        key = self._cache_key(query, limit)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached
+        return self.search_flight.do_sync(key, lambda: self._search(query, limit, key))
+    
+    def _search(self, query: str, limit: int, key: str) -> list:
+        """One Spotify search through spotipy, cached"""
         try:
-            results = self.client.search(q=query, type='track', limit=limit)
-            return results['tracks']['items']
+            with self.breaker.guard(), track_upstream("spotify", "search"):
+                results = self.client.search(q=query, type='track', limit=limit)
+            tracks = results['tracks']['items']
+        except (CircuitOpenError, RateLimitedError):
+            return []  # Not Spotify's answer - don't cache it
         except Exception as e:
             print(f"❌ Spotify search failed for '{query}': {e}")
-            return []
+            tracks = []
+        
+        self.search_cache.set(key, tracks, ttl=self._cache_ttl(tracks))
+        return tracks
+    
+    async def search_track_async(self, query: str, limit: int = 1) -> list:
+        """
+        Search for tracks on Spotify without blocking the event loop
+        Concurrent searches for the same (normalized) query share one call
+        """
+        key = self._cache_key(query, limit)
+        cached = await self.search_cache.get_async(key)
+        if cached is not None:
+            return cached
+        return await self.search_flight.do(key, lambda: self._search_async(query, limit, key))
+    
+    async def _search_async(self, query: str, limit: int, key: str) -> list:
+        """One Spotify search over the shared HTTP pool, cached"""
+        try:
+            token = await self._get_access_token_async()
+            with self.breaker.guard(), track_upstream("spotify", "search"):
+                response = await self._get_http().get(
+                    f"{settings.SPOTIFY_API_URL}/search",
+                    params={"q": query, "type": "track", "limit": limit},
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+                response.raise_for_status()
+            tracks = response.json()['tracks']['items']
+        except (CircuitOpenError, RateLimitedError):
+            return []  # Not Spotify's answer - don't cache it
+        except Exception as e:
+            print(f"❌ Spotify search failed for '{query}': {e}")
+            tracks = []
+        
+        await self.search_cache.set_async(key, tracks, ttl=self._cache_ttl(tracks))
+        return tracks
+    
+    async def close(self):
+        """Stop background token refresh (the shared pools are closed by the app)"""
+        if self.token_refresh_task is not None:
+            self.token_refresh_task.cancel()
+            self.token_refresh_task = None
+        self.http = None
     
     def format_track(self, track: dict) -> dict:
         """Format Spotify track data for API response"""
@@ -0,0 +1,162 @@
+"""Real-time transcription - relays live audio chunks to a streaming backend"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from services.audio_transcriber import audio_transcriber
+from config.settings import settings
+from utils.metrics import track_upstream, record_upstream_error
+
+class StreamingSession(ABC):
+    """
+    One live transcription
+
+    Audio goes in through send(), results come out of the `results` queue as
+    {"type": "interim" | "final" | "error", ...} dicts, then None once the
+    backend has flushed everything after finish().
+    """
+
+    def __init__(self):
+        self.results = asyncio.Queue()
+        self._ended = False
+
+    def _emit(self, result: dict):
+        if not self._ended:
+            self.results.put_nowait(result)
+
+    def _end(self):
+        if not self._ended:
+            self._ended = True
+            self.results.put_nowait(None)
+
+    async def start(self):
+        pass
+
+    @abstractmethod
+    async def send(self, chunk: bytes):
+        """Pass a chunk of audio on to the backend"""
+
+    @abstractmethod
+    async def finish(self):
+        """No more audio - flush final results, then end the results queue"""
+
+    async def close(self):
+        """Abort the session (client went away)"""
+        self._end()
+
+class DeepgramStreamingSession(StreamingSession):
+    """Live transcription over Deepgram's WebSocket API"""
+
+    def __init__(self, client):
+        from deepgram import LiveTranscriptionEvents  # Deferred with the rest of the SDK
+
+        super().__init__()
+        self.connection = client.listen.asyncwebsocket.v("1")
+        self.closed = asyncio.Event()
+        self.shut_down = False
+
+        self.connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+        self.connection.on(LiveTranscriptionEvents.Error, self._on_error)
+        self.connection.on(LiveTranscriptionEvents.Close, self._on_close)
+
+    def _build_options(self):
+        """Same model settings as prerecorded, plus interim results"""
+        from deepgram import LiveOptions
+
+        return LiveOptions(
+            model="nova-2",
+            smart_format=True,
+            language="en",
+            punctuate=True,
+            interim_results=True,  # Partial transcripts while the user is talking
+        )
+
+    async def _on_transcript(self, _connection, result, **kwargs):
+        transcript = result.channel.alternatives[0].transcript
+        if transcript:
+            self._emit({"type": "final" if result.is_final else "interim", "transcript": transcript})
+
+    async def _on_error(self, _connection, error, **kwargs):
+        record_upstream_error("deepgram", "live")
+        self._emit({"type": "error", "detail": str(getattr(error, "message", error))})
+
+    async def _on_close(self, _connection, close=None, **kwargs):
+        self.closed.set()
+        self._end()
+
+    async def start(self):
+        # Container audio (webm/opus from MediaRecorder) - Deepgram detects the encoding
+        with audio_transcriber.breaker.guard(), track_upstream("deepgram", "live_connect"):
+            if not await self.connection.start(self._build_options()):
+                raise Exception("Could not connect to Deepgram live transcription")
+
+    async def send(self, chunk: bytes):
+        await self.connection.send(chunk)
+
+    async def finish(self):
+        # CloseStream makes Deepgram flush pending finals before it hangs up
+        await self.connection.send(json.dumps({"type": "CloseStream"}))
+        try:
+            await asyncio.wait_for(self.closed.wait(), settings.TRANSCRIBE_STREAM_FINISH_TIMEOUT)
+        except asyncio.TimeoutError:
+            print("⚠️ Deepgram didn't close the live stream in time")
+        await self.close()
+
+    async def close(self):
+        if not self.shut_down:
+            self.shut_down = True
+            await self.connection.finish()
+        self._end()
+
+class LocalStreamingSession(StreamingSession):
+    """
+    Stand-in backend for tests and local development - no network
+
+    Treats the incoming bytes as UTF-8 text: every chunk produces an interim
+    result with the text so far, each line is a final result, and finish()
+    flushes whatever is left as the last final.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = ""
+
+    async def send(self, chunk: bytes):
+        self.buffer += chunk.decode("utf-8", errors="ignore")
+        *lines, self.buffer = self.buffer.split("\n")
+
+        for line in lines:
+            if line.strip():
+                self._emit({"type": "final", "transcript": line.strip()})
+        if self.buffer.strip():
+            self._emit({"type": "interim", "transcript": self.buffer.strip()})
+
+    async def finish(self):
+        if self.buffer.strip():
+            self._emit({"type": "final", "transcript": self.buffer.strip()})
+        self.buffer = ""
+        self._end()
+
+class StreamingTranscriber:
+    """Opens live sessions on the configured backend ("deepgram" or "local")"""
+
+    BACKENDS = ("deepgram", "local")
+
+    def __init__(self, backend: str):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown streaming backend '{backend}', expected one of {self.BACKENDS}")
+        self.backend = backend
+
+    async def start_session(self) -> StreamingSession:
+        if self.backend == "local":
+            session = LocalStreamingSession()
+        else:
+            if not audio_transcriber.client:
+                raise ValueError("Deepgram API key not configured")
+            session = DeepgramStreamingSession(audio_transcriber.client)
+
+        await session.start()
+        return session
+
+# Create global instance
+streaming_transcriber = StreamingTranscriber(settings.TRANSCRIBE_STREAM_BACKEND)
@@ -0,0 +1,383 @@
+"""
+Transcription jobs - uploads queued and transcribed in the background
+
+POST /transcribe/jobs saves the upload and answers with a job id right
+away; a fixed pool of workers (TRANSCRIBE_JOB_WORKERS per process) takes
+jobs oldest first and runs them through preprocessing and Deepgram.
+Clients poll GET /transcribe/jobs/{id}, or long-poll it with ?wait=.
+
+Jobs live in a SQLite file with their audio next to it, so every uvicorn
+worker on the host shares one queue and queued jobs survive a restart.
+A job whose process died mid-transcription runs again once its lease
+(TRANSCRIBE_JOB_LEASE) is up.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import BinaryIO
+from config.settings import settings
+from services.audio_preprocessor import audio_preprocessor
+from services.audio_transcriber import audio_transcriber
+from utils.metrics import TRANSCRIPTION_JOB_WAIT_SECONDS
+from utils.resilience import CircuitOpenError, RateLimitedError
+
+FINISHED = ("done", "failed")
+
+class QueueFullError(Exception):
+    """TRANSCRIBE_JOB_MAX_QUEUED jobs are already waiting"""
+
+class JobStore:
+    """Job table and audio files in a directory, shared by every worker process on the host"""
+
+    # Finished jobs past their TTL are deleted every this many finishes
+    PRUNE_EVERY = 100
+
+    def __init__(self, directory: str):
+        self.audio_dir = os.path.join(directory, "audio")
+        self.path = os.path.join(directory, "jobs.db")
+        self._local = threading.local()  # sqlite connections are per thread
+        self._finishes = 0
+        os.makedirs(self.audio_dir, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT NOT NULL, audio_hash TEXT,"
+            " created_at REAL NOT NULL, available_at REAL NOT NULL, started_at REAL, lease_until REAL,"
+            " finished_at REAL, attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit - transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def audio_path(self, job_id: str) -> str:
+        return os.path.join(self.audio_dir, job_id)
+
+    def remove_audio(self, job_id: str):
+        try:
+            os.remove(self.audio_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def enqueue(self, job_id: str, filename: str, audio_hash: str, max_queued: int):
+        """Add a queued job (its audio already saved) - raises QueueFullError past max_queued"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= max_queued:
+                raise QueueFullError(f"{queued} transcription jobs already queued")
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, audio_hash, created_at, available_at)"
+                " VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, filename, audio_hash, now, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_done(self, job_id: str, filename: str, audio_hash: str, result: dict):
+        """Record a job that finished without queueing (transcript cache hit)"""
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, status, filename, audio_hash, created_at, available_at, started_at, finished_at, result)"
+            " VALUES (?, 'done', ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, filename, audio_hash, now, now, now, now, json.dumps(result))
+        )
+
+    def claim(self, lease: float, max_attempts: int) -> dict:
+        """
+        Take the oldest runnable job (queued, or running with an expired
+        lease) and mark it running - None if there's nothing to do
+        """
+        conn = self._connect()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?)"
+                    " OR (status = 'running' AND lease_until < ?) ORDER BY created_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row["attempts"] >= max_attempts:
+                    # Its workers keep dying on it - don't let it take the next one down too
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                        (now, "Transcription did not complete", row["id"])
+                    )
+                    conn.execute("COMMIT")
+                    self.remove_audio(row["id"])
+                    continue
+
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1,"
+                    " started_at = COALESCE(started_at, ?), lease_until = ? WHERE id = ?",
+                    (now, now + lease, row["id"])
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return {**dict(row), "started_at": row["started_at"] or now, "first_start": row["started_at"] is None}
+
+    def finish(self, job_id: str, result: dict = None, error: str = None):
+        """Mark a job done (result) or failed (error) and drop its audio"""
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, lease_until = NULL WHERE id = ?",
+            ("failed" if error else "done", time.time(), json.dumps(result) if result else None, error, job_id)
+        )
+        self.remove_audio(job_id)
+
+        self._finishes += 1
+        if self._finishes % self.PRUNE_EVERY == 0:
+            self.prune(settings.TRANSCRIBE_JOB_TTL)
+
+    def requeue(self, job_id: str, delay: float = 0.0):
+        """Put a running job back in the queue - the attempt doesn't count"""
+        self._connect().execute(
+            "UPDATE jobs SET status = 'queued', available_at = ?, lease_until = NULL,"
+            " attempts = MAX(attempts - 1, 0) WHERE id = ? AND status = 'running'",
+            (time.time() + delay, job_id)
+        )
+
+    def get(self, job_id: str) -> dict:
+        """The job as the API shows it, None if unknown"""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        position = None
+        if row["status"] == "queued":
+            position = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?", (row["created_at"],)
+            ).fetchone()[0] + 1
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "created_at": row["created_at"],
+            "queue_position": position,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"]
+        }
+
+    def prune(self, ttl: float):
+        """Delete finished jobs older than ttl"""
+        self._connect().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (time.time() - ttl,)
+        )
+
+    def counts(self) -> dict:
+        """Jobs per status, plus how long the oldest queued job has waited"""
+        conn = self._connect()
+        counts = dict.fromkeys(("queued", "running", "done", "failed"), 0)
+        counts.update(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        oldest = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        counts["oldest_queued_seconds"] = round(time.time() - oldest, 1) if oldest else 0.0
+        return counts
+
+class TranscriptionJobs:
+    """Submits jobs and runs the worker pool of this process"""
+
+    def __init__(self):
+        self.store = None  # Opened by start()
+        self._workers = []
+        self._wakeup = None
+        self._finished = {}  # job id -> asyncio.Event, for long-polls in this process
+        self._waiters = Counter()  # job id -> long-polls waiting on its event right now
+
+        # Counters (this process only)
+        self.submitted = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+
+    async def start(self):
+        """Open the store and start this process's workers (app startup)"""
+        self.store = await asyncio.to_thread(JobStore, settings.TRANSCRIBE_JOBS_DIR)
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(max(0, settings.TRANSCRIBE_JOB_WORKERS))
+        ]
+        counts = await asyncio.to_thread(self.store.counts)
+        if counts["queued"] or counts["running"]:
+            print(f"🎤 Resuming {counts['queued'] + counts['running']} transcription jobs")
+
+    async def stop(self):
+        """Stop the workers - a job they were running goes back in the queue"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, file: BinaryIO, filename: str, audio_hash: str) -> dict:
+        """
+        Queue an upload for transcription, returns the job
+        A file already transcribed is answered from the transcript cache as
+        a finished job. Raises QueueFullError when the queue is full.
+        """
+        job_id = uuid.uuid4().hex
+        cached = await audio_transcriber.transcript_cache.get_async(audio_hash)
+        if cached is not None:
+            result = {"transcript": cached["transcript"], "filename": filename, "duration_estimate": cached["duration"]}
+            await asyncio.to_thread(self.store.add_done, job_id, filename, audio_hash, result)
+            self.cache_hits += 1
+            return await self.get(job_id)
+
+        def save():
+            with open(self.store.audio_path(job_id), "wb") as out:
+                shutil.copyfileobj(file, out, settings.UPLOAD_CHUNK_SIZE)
+            try:
+                self.store.enqueue(job_id, filename, audio_hash, settings.TRANSCRIBE_JOB_MAX_QUEUED)
+            except BaseException:
+                self.store.remove_audio(job_id)
+                raise
+
+        try:
+            await asyncio.to_thread(save)
+        except QueueFullError:
+            self.rejected += 1
+            raise
+        self.submitted += 1
+        self._wakeup.set()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str, wait: float = 0.0) -> dict:
+        """
+        The job (None if unknown). With wait, holds on until it finishes or
+        wait seconds pass - jobs run by other processes are polled for
+        """
+        deadline = time.monotonic() + min(wait, settings.TRANSCRIBE_JOB_MAX_WAIT)
+        while True:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+
+            # The event only lives while someone waits on it - a job finished by
+            # another process (or never polled again) doesn't leave one behind
+            finished = self._finished.setdefault(job_id, asyncio.Event())
+            self._waiters[job_id] += 1
+            try:
+                await asyncio.wait_for(finished.wait(), timeout=min(remaining, settings.TRANSCRIBE_JOB_POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiters[job_id] -= 1
+                if not self._waiters[job_id]:
+                    del self._waiters[job_id]
+                    if self._finished.get(job_id) is finished:
+                        del self._finished[job_id]
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(
+                    self.store.claim, settings.TRANSCRIBE_JOB_LEASE, settings.TRANSCRIBE_JOB_MAX_ATTEMPTS
+                )
+            except sqlite3.Error as e:
+                print(f"❌ Transcription job claim failed: {e}")
+                job = None
+
+            if job is None:
+                # Woken early by a submit in this process; other processes' jobs are polled for
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.TRANSCRIBE_JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: dict):
+        job_id = job["id"]
+        if job["first_start"]:
+            TRANSCRIPTION_JOB_WAIT_SECONDS.observe(job["started_at"] - job["created_at"])
+
+        result, error = None, None
+        try:
+            with open(self.store.audio_path(job_id), "rb") as audio:
+                prepared = await audio_preprocessor.prepare_async(audio)
+                transcript = await audio_transcriber.transcribe_audio_async(prepared["audio"])
+                duration = prepared["duration"]
+                if duration is None:
+                    duration = os.fstat(audio.fileno()).st_size / (16000 * 2)  # Unknown format - rough guess
+
+            result = {"transcript": transcript, "filename": job["filename"], "duration_estimate": duration}
+            await audio_transcriber.transcript_cache.set_async(job["audio_hash"], {"transcript": transcript, "duration": duration})
+        except (CircuitOpenError, RateLimitedError) as e:
+            # Deepgram is down or throttling - wait it out instead of failing the job
+            self.requeued += 1
+            await asyncio.to_thread(self.store.requeue, job_id, getattr(e, "retry_after", 1.0))
+            return
+        except asyncio.CancelledError:
+            # Shutting down - another worker (or restart) picks it up
+            await asyncio.shield(asyncio.to_thread(self.store.requeue, job_id))
+            raise
+        except FileNotFoundError:
+            error = "Audio for this job is missing"
+        except ValueError as e:
+            error = str(e)
+        except Exception as e:
+            error = f"Transcription failed: {str(e)}"
+
+        try:
+            await asyncio.to_thread(self.store.finish, job_id, result, error)
+        except sqlite3.Error as e:
+            print(f"❌ Transcription job {job_id} update failed: {e}")
+        if error:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+        finished = self._finished.pop(job_id, None)
+        if finished:
+            finished.set()
+
+    def stats(self) -> dict:
+        """Queue depth and job counts (shared by all processes), plus this process's counters"""
+        stats = {"workers": len(self._workers), "max_queued": settings.TRANSCRIBE_JOB_MAX_QUEUED}
+        if self.store is not None:
+            try:
+                stats.update(self.store.counts())
+            except sqlite3.Error as e:
+                print(f"❌ Transcription job stats failed: {e}")
+        stats["this_worker"] = {
+            "submitted": self.submitted,
+            "cache_hits": self.cache_hits,
+            "rejected_full": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued
+        }
+        return stats
+
+# Create global instance
+transcription_jobs = TranscriptionJobs()
@@ -1,19 +1,58 @@
-"""Server startup script"""
+"""
+Server startup script
 
+    python start_server.py                     # Development - one worker, auto-reload
+    python start_server.py --prod              # Production - one worker per CPU core
+    python start_server.py --prod --workers 4
+"""
+
+import argparse
+import os
 import uvicorn
+from config.settings import settings
 
-def start_server():
+def start_server(prod: bool = False, workers: int = None, host: str = None, port: int = None):
+    host = host or settings.SERVER_HOST
+    port = port or settings.SERVER_PORT
+    
     print("🎵 Starting Groovi Backend Server...")
-    print("📡 Server: http://localhost:8000")
-    print("📚 API Docs: http://localhost:8000/docs")
+    print(f"📡 Server: http://localhost:{port}")
+    print(f"📚 API Docs: http://localhost:{port}/docs")
+    
+    if not prod:
+        uvicorn.run(
+            "main:app",
+            host=host,
+            port=port,
+            reload=True,
+            log_level="info"
+        )
+        return
     
+    # Each worker imports the app and builds its own clients (lifespan), so
+    # nothing with open connections is shared across the fork. On SIGTERM
+    # workers stop accepting and give in-flight requests the grace period.
+    workers = workers or settings.SERVER_WORKERS or os.cpu_count() or 1
+    print(f"🚀 Production mode: {workers} workers, {settings.SHUTDOWN_GRACE_PERIOD}s graceful shutdown")
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=host,
+        port=port,
+        workers=workers,
+        reload=False,
+        timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_PERIOD,
         log_level="info"
     )
 
+def main():
+    parser = argparse.ArgumentParser(description="Run the Groovi API")
+    parser.add_argument("--prod", action="store_true", help="Production mode: multiple workers, no reload")
+    parser.add_argument("--workers", type=int, help="Worker processes (--prod only, default SERVER_WORKERS or CPU count)")
+    parser.add_argument("--host", help="Bind address (default SERVER_HOST)")
+    parser.add_argument("--port", type=int, help="Port (default SERVER_PORT)")
+    args = parser.parse_args()
+    
+    start_server(prod=args.prod, workers=args.workers, host=args.host, port=args.port)
+
 if __name__ == "__main__":
-    start_server()
\ No newline at end of file
+    main()
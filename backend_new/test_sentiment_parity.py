@@ -0,0 +1,79 @@
+"""Check SentimentEngine against per-call VADER (analyze_with_vader)"""
+
+import random
+import sys
+import time
+from services.mood_analyzer import mood_analyzer
+
+SENTENCES = [
+    "I'm feeling amazing today, just got great news!",
+    "Pretty relaxed evening, nothing special going on.",
+    "Work was exhausting and I'm a bit down.",
+    "I miss my friends so much, everything feels heavy.",
+    "Can't stop smiling, the weather is perfect!",
+    "Kind of bored, not sure what to do with myself.",
+    "I am happy",
+    "I am HAPPY today",
+    "Today was good but the evening was awful",
+    "No love for this song",
+    "At least it's over",
+    "This is the bomb!!!",
+    "Is this really what you wanted???",
+    "Feeling lonely and sad :(",
+    "Great day :) love it",
+    "That was the worst, yeah right",
+    "I won the lottery 🎉🎉",
+    "Never so happy in my life",
+    "",
+    "   ",
+]
+
+def generated_sentences(count: int, seed: int = 7) -> list:
+    """Random sentences mixing lexicon words, filler and punctuation"""
+    rng = random.Random(seed)
+    lexicon = sorted(mood_analyzer.vader.lexicon)
+    filler = ["i", "am", "the", "day", "was", "my", "and", "today", "it", "feel", "with", "of"]
+    rule_words = ["this", "but", "not", "very", "no", "kind", "so", "least", "never"]
+    punctuation = ["", "", "", "!", "!!", "?", "??", "...", ","]
+
+    sentences = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(1, 20)):
+            roll = rng.random()
+            words.append(rng.choice(lexicon) if roll < 0.3 else rng.choice(rule_words) if roll < 0.35 else rng.choice(filler))
+        if rng.random() < 0.1:
+            words[rng.randrange(len(words))] = rng.choice(lexicon).upper()
+        sentences.append(" ".join(words) + rng.choice(punctuation))
+    return sentences
+
+def test_parity():
+    print("🎵 Testing sentiment fast path against VADER...")
+    texts = SENTENCES + generated_sentences(20000)
+    engine = mood_analyzer.sentiment
+
+    start = time.perf_counter()
+    expected = [mood_analyzer.analyze_with_vader(text) for text in texts]
+    vader_seconds = time.perf_counter() - start
+
+    before = engine.stats()
+    start = time.perf_counter()
+    results = engine.analyze_batch(texts)
+    engine_seconds = time.perf_counter() - start
+    fast = engine.stats()["fast_scored"] - before["fast_scored"]
+
+    mismatches = [(text, e, r) for text, e, r in zip(texts, expected, results) if e != r]
+    for text, e, r in mismatches[:10]:
+        print(f"❌ {text!r}: VADER {e['score']} ({e['mood_category']}), engine {r['score']} ({r['mood_category']})")
+
+    print(f"📊 {len(texts)} texts, {fast / len(texts):.0%} on the fast path")
+    print(f"⏱️ VADER {vader_seconds:.2f}s, engine {engine_seconds:.2f}s ({vader_seconds / engine_seconds:.1f}x)")
+    assert not mismatches, f"{len(mismatches)} mismatches between the engine and VADER"
+    print("✅ Identical results")
+
+if __name__ == "__main__":
+    try:
+        test_parity()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
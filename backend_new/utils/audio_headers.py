@@ -0,0 +1,321 @@
+"""
+Audio container headers - real durations without decoding
+
+probe_audio() recognizes the upload formats /transcribe accepts (WAV, MP3,
+Ogg, WebM, MP4/M4A) from their first bytes and reads the duration from the
+container: WAV data size / byte rate, MP3 Xing/VBRI frame counts (or the
+bitrate for CBR), the last Ogg page's granule position, the WebM Segment
+Info, the MP4 movie header. Fields that can't be found are None - e.g.
+MediaRecorder WebM has no Duration until the file is finalized.
+
+probe_file() does the same from bounded reads of a file (its first and
+last PROBE_BYTES and its size), so uploads aren't read into memory.
+"""
+
+import struct
+from typing import BinaryIO
+
+PROBE_BYTES = 64 * 1024  # Read from each end of a file by probe_file()
+
+MP3_BITRATES = {
+    # (MPEG-1?, layer) -> kbps by bitrate index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+def _info(container: str, duration: float = None, sample_rate: int = None, channels: int = None) -> dict:
+    return {"container": container, "duration": duration, "sample_rate": sample_rate, "channels": channels}
+
+def parse_wav(data: bytes, size: int = None) -> dict:
+    """
+    RIFF/WAVE fmt fields plus where the samples are, or None if not a WAV
+    data_size is clamped to the bytes actually present - `size` when data
+    is only the start of the file (streamed WAVs often leave it 0 or
+    0xFFFFFFFF)
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+
+        if chunk_id == b"fmt " and body + 16 <= len(data):
+            audio_format, channels, sample_rate, byte_rate, block_align, bits = struct.unpack_from("<HHIIHH", data, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40 and body + 26 <= len(data):
+                audio_format = struct.unpack_from("<H", data, body + 24)[0]  # First bytes of the subformat GUID
+            fmt = {
+                "audio_format": audio_format, "channels": channels, "sample_rate": sample_rate,
+                "byte_rate": byte_rate, "block_align": block_align, "bits": bits
+            }
+        elif chunk_id == b"data" and fmt:
+            available = (size or len(data)) - body
+            size = chunk_size if 0 < chunk_size <= available else available
+            return {**fmt, "data_offset": body, "data_size": size}
+
+        pos = body + chunk_size + (chunk_size & 1)  # Chunks are word aligned
+    return None
+
+def _probe_wav(data: bytes, size: int = None, tail: bytes = b"") -> dict:
+    wav = parse_wav(data, size)
+    if wav is None:
+        return None
+    duration = wav["data_size"] / wav["byte_rate"] if wav["byte_rate"] else None
+    return _info("wav", duration, wav["sample_rate"], wav["channels"])
+
+def _id3_end(data: bytes) -> int:
+    """Offset of the first byte after an ID3v2 tag (0 without one)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _mp3_frame(data: bytes, pos: int) -> dict:
+    """Decode the MPEG audio frame header at pos, None if it isn't one"""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 3  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = 4 - ((data[pos + 1] >> 1) & 3)
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    padding = (data[pos + 2] >> 1) & 1
+    mono = data[pos + 3] >> 6 == 3
+
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = (samples // 8) * bitrate // sample_rate + padding
+
+    return {
+        "mpeg1": mpeg1, "layer": layer, "bitrate": bitrate, "sample_rate": sample_rate,
+        "channels": 1 if mono else 2, "samples": samples, "length": length
+    }
+
+def parse_mp3(data: bytes, size: int = None, tail: bytes = b"") -> dict:
+    start = _id3_end(data)
+    frame = None
+    # Some encoders leave junk before the first frame - look a little way in
+    for pos in range(start, min(len(data) - 4, start + 4096)):
+        frame = _mp3_frame(data, pos)
+        # A real frame is followed by another one (unless the file ends there)
+        if frame and (pos + frame["length"] + 4 > len(data) or _mp3_frame(data, pos + frame["length"])):
+            start = pos
+            break
+        frame = None
+    if frame is None:
+        return None
+
+    # VBR files count their frames in a Xing/Info or VBRI header in the first frame
+    side_info = (32 if frame["channels"] == 2 else 17) if frame["mpeg1"] else (17 if frame["channels"] == 2 else 9)
+    frames = None
+    xing = start + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") and xing + 12 <= len(data):
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        if flags & 1:
+            frames = struct.unpack_from(">I", data, xing + 8)[0]
+    vbri = start + 36
+    if frames is None and data[vbri:vbri + 4] == b"VBRI" and vbri + 18 <= len(data):
+        frames = struct.unpack_from(">I", data, vbri + 14)[0]
+
+    if frames:
+        duration = frames * frame["samples"] / frame["sample_rate"]
+    else:
+        size = size or len(data)
+        end = size - 128 if (tail or data)[-128:-125] == b"TAG" else size  # ID3v1 tag at the end
+        duration = (end - start) * 8 / frame["bitrate"]
+    return _info("mp3", duration, frame["sample_rate"], frame["channels"])
+
+def parse_ogg(data: bytes, size: int = None, tail: bytes = b"") -> dict:
+    if data[:4] != b"OggS" or len(data) < 28:
+        return None
+    segments = data[26]
+    packet = data[27 + segments:27 + segments + 19]
+
+    if packet[:8] == b"OpusHead" and len(packet) >= 19:
+        channels = packet[9]
+        pre_skip = struct.unpack_from("<H", packet, 10)[0]
+        sample_rate, granule_rate = struct.unpack_from("<I", packet, 12)[0], 48000  # Opus granules are always 48kHz
+    elif packet[:7] == b"\x01vorbis" and len(packet) >= 16:
+        channels = packet[11]
+        pre_skip = 0
+        sample_rate = granule_rate = struct.unpack_from("<I", packet, 12)[0]
+    else:
+        return _info("ogg")
+
+    # The last page's granule position is the total sample count
+    end = tail or data
+    last = end.rfind(b"OggS")
+    duration = None
+    if last >= 0 and last + 14 <= len(end) and granule_rate:
+        granule = struct.unpack_from("<q", end, last + 6)[0]
+        if granule > 0:
+            duration = max(0.0, (granule - pre_skip) / granule_rate)
+    return _info("ogg", duration, sample_rate or None, channels)
+
+def _ebml_vint(data: bytes, pos: int, keep_marker: bool) -> tuple:
+    """(value, next position) of an EBML variable-length integer, None at a bad byte"""
+    if pos >= len(data) or data[pos] == 0:
+        return None, pos
+    first = data[pos]
+    length = 8 - first.bit_length() + 1
+    if pos + length > len(data):
+        return None, pos
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = value << 8 | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = -1  # "Unknown size" - runs to the end of the parent
+    return value, pos + length
+
+EBML_HEADER, EBML_SEGMENT, EBML_INFO, EBML_CLUSTER = 0x1A45DFA3, 0x18538067, 0x1549A966, 0x1F43B675
+EBML_TIMECODE_SCALE, EBML_DURATION = 0x2AD7B1, 0x4489
+
+def parse_webm(data: bytes, size: int = None, tail: bytes = b"") -> dict:
+    if data[:4] != b"\x1a\x45\xdf\xa3":
+        return None
+
+    pos, end = 0, len(data)
+    scale, duration = 1_000_000, None
+    while pos < end:
+        element, body = _ebml_vint(data, pos, keep_marker=True)
+        size, body = _ebml_vint(data, body, keep_marker=False)
+        if element is None or size is None:
+            break
+        if element in (EBML_SEGMENT, EBML_INFO):
+            pos = body  # Step into the element
+            if element == EBML_INFO and size >= 0:
+                end = min(end, body + size)
+            continue
+        if element == EBML_CLUSTER or size < 0:
+            break  # Into the audio itself - Info comes before it or not at all
+        if element == EBML_TIMECODE_SCALE:
+            scale = int.from_bytes(data[body:body + size], "big")
+        elif element == EBML_DURATION and size in (4, 8):
+            duration = struct.unpack(">f" if size == 4 else ">d", data[body:body + size])[0]
+        pos = body + size
+
+    seconds = duration * scale / 1e9 if duration else None
+    return _info("webm", seconds)
+
+def _boxes(data: bytes, start: int, end: int):
+    """(type, body start, body end) of the MP4 boxes in data[start:end]"""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1 and pos + 16 <= end:
+            size, header = struct.unpack_from(">Q", data, pos + 8)[0], 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+def parse_mp4(data: bytes, size: int = None, tail: bytes = b"", read=None) -> dict:
+    """
+    read(offset, length) fetches bytes of the file when data is only its
+    start - the movie header often comes after the audio. Without it the
+    moov box is looked for in data and tail.
+    """
+    if data[4:8] != b"ftyp":
+        return None
+
+    size = size or len(data)
+    if read is None:
+        tail_start = size - len(tail)
+
+        def read(pos: int, length: int) -> bytes:
+            if pos + length <= len(data) or not tail:
+                return data[pos:pos + length]
+            return tail[pos - tail_start:pos - tail_start + length] if pos >= tail_start else b""
+
+    # Top level boxes by offset - mdat (the audio) is skipped without reading it
+    pos = 0
+    while pos + 8 <= size:
+        header = read(pos, 16)
+        if len(header) < 8:
+            break
+        box_size, kind = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if box_size == 1 and len(header) == 16:
+            box_size, header_size = struct.unpack_from(">Q", header, 8)[0], 16
+        elif box_size == 0:
+            box_size = size - pos
+        if box_size < header_size:
+            break
+        if kind == b"moov":
+            # mvhd comes first in moov - no need for the sample tables after it
+            moov = read(pos + header_size, min(box_size - header_size, 4096))
+            for inner, inner_body, _ in _boxes(moov, 0, len(moov)):
+                if inner != b"mvhd":
+                    continue
+                if moov[inner_body] == 1:
+                    timescale, duration = struct.unpack_from(">IQ", moov, inner_body + 20)
+                else:
+                    timescale, duration = struct.unpack_from(">II", moov, inner_body + 12)
+                return _info("mp4", duration / timescale if timescale else None)
+            break
+        pos += box_size
+    return _info("mp4")
+
+def probe_audio(data: bytes, size: int = None, tail: bytes = b"") -> dict:
+    """
+    Container and header fields of an audio file:
+    {"container", "duration" (seconds), "sample_rate", "channels"}, each None if unknown
+    data may be just the start of the file, with its total size and last bytes (tail)
+    """
+    for parse in (_probe_wav, parse_ogg, parse_webm, parse_mp4, parse_mp3):
+        try:
+            info = parse(data, size, tail)
+        except (struct.error, IndexError, OverflowError):
+            info = None  # Truncated or corrupt header
+        if info is not None:
+            return info
+    return _info(None)
+
+def probe_file(file: BinaryIO, size: int = None) -> dict:
+    """probe_audio() of a seekable file without reading all of it - leaves it at the start"""
+    if size is None:
+        size = file.seek(0, 2)
+    file.seek(0)
+    head = file.read(PROBE_BYTES)
+    tail = b""
+    if size > len(head):
+        file.seek(max(len(head), size - PROBE_BYTES))
+        tail = file.read(PROBE_BYTES)
+
+    def read(pos: int, length: int) -> bytes:
+        file.seek(pos)
+        return file.read(length)
+
+    try:
+        info = probe_audio(head, size, tail)
+        if info["container"] == "mp4" and info["duration"] is None and size > len(head):
+            try:
+                info = parse_mp4(head, size, read=read)  # moov too far from either end
+            except (struct.error, IndexError, OverflowError):
+                pass
+    finally:
+        file.seek(0)
+    return info
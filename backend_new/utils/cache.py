@@ -0,0 +1,241 @@
+"""Caching helpers - in-process LRU with TTL, plus an optional shared SQLite tier"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with a size bound and per-entry TTL
+
+    Eviction policy once max_size is reached:
+    - "lru": least recently used entry goes first (hits refresh an entry)
+    - "fifo": oldest inserted entry goes first (hits don't reorder)
+    """
+
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, max_size: int, ttl: float, policy: str = "lru"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy '{policy}', expected one of {self.POLICIES}")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.policy = policy
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """Store a value (None can't be cached - it means miss)"""
+        if self.max_size <= 0 or value is None:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class SQLiteCache:
+    """
+    On-disk cache tier in a SQLite file
+    Every uvicorn worker on the host opens the same file, so one worker's
+    lookup warms the cache for all of them. Values must be JSON-serializable.
+    """
+
+    # Expired/excess rows are pruned every this many writes
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str, ttl: float, max_rows: int = 100_000):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._local = threading.local()  # sqlite connections are per thread
+        self._writes = 0
+
+        # Counters (this process only)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        """Return (value, seconds_left), or None on a miss"""
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"❌ Cache read failed: {e}")
+            return None
+
+        now = time.time()
+        if row is None or row[1] <= now:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0]), row[1] - now
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            conn.commit()
+
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self.prune()
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"❌ Cache write failed: {e}")
+
+    def prune(self):
+        """Drop expired rows, then the soonest-to-expire rows over max_rows"""
+        conn = self._connect()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,)
+        )
+        conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors
+        }
+
+class TieredCache:
+    """
+    Memory tier in front of an optional SQLite tier
+    Disk hits are promoted into memory for the rest of their TTL.
+    """
+
+    def __init__(self, memory: TTLCache, disk: SQLiteCache = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+
+        found = self.disk.get(key)
+        if found is None:
+            return None
+
+        value, seconds_left = found
+        self.memory.set(key, value, ttl=seconds_left)
+        return value
+
+    def set(self, key: str, value, ttl: float = None):
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl=ttl)
+
+    async def get_async(self, key: str):
+        """Same as get, but the disk lookup runs off the event loop"""
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+
+        found = await asyncio.to_thread(self.disk.get, key)
+        if found is None:
+            return None
+
+        value, seconds_left = found
+        self.memory.set(key, value, ttl=seconds_left)
+        return value
+
+    async def set_async(self, key: str, value, ttl: float = None):
+        """Same as set, but the disk write runs off the event loop"""
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, ttl)
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk else None
+        }
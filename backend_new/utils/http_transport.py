@@ -0,0 +1,244 @@
+"""
+Shared HTTP transport - one keep-alive connection pool per upstream service,
+with jittered retries on 429/5xx and the service's adaptive rate limiter
+"""
+
+import asyncio
+import random
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.settings import settings
+from utils.resilience import RateLimiter, rate_limiters
+
+# Responses worth another try - rate limited or a transient upstream failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def retry_delay(attempt: int, retry_after: str = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based)
+
+    Honors a numeric Retry-After header, otherwise exponential backoff with
+    full jitter so clients that failed together don't retry together.
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.HTTP_RETRY_MAX_DELAY)
+        except ValueError:
+            pass  # HTTP-date form - fall back to backoff
+    ceiling = min(settings.HTTP_RETRY_MAX_DELAY, settings.HTTP_RETRY_BACKOFF * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+def _replayable(request: httpx.Request) -> bool:
+    """Streamed uploads (e.g. audio files) can only be sent once"""
+    return isinstance(request.stream, httpx.ByteStream)
+
+def _report(limiter: RateLimiter, response: httpx.Response):
+    """Tell the rate limiter how the service answered"""
+    if limiter is None:
+        return
+    if response.status_code == 429:
+        limiter.throttled(retry_delay(0, response.headers.get("Retry-After") or "1"))
+    else:
+        limiter.succeeded()
+
+def _should_retry(response: httpx.Response, attempt: int, replayable: bool) -> bool:
+    return replayable and response.status_code in RETRY_STATUSES and attempt < settings.HTTP_MAX_RETRIES
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport that retries 429/5xx and connection failures
+    Every attempt waits for a slot from `limiter` (if any), and 429s slow it down
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter = None):
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        replayable = _replayable(request)  # Checked before the body is consumed
+        while True:
+            if self.limiter is not None:
+                await self.limiter.acquire_async()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= settings.HTTP_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(retry_delay(attempt))
+                attempt += 1
+                continue
+
+            _report(self.limiter, response)
+            if not _should_retry(response, attempt, replayable):
+                return response
+
+            await response.aclose()
+            await asyncio.sleep(retry_delay(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+class RetryTransport(httpx.BaseTransport):
+    """Sync twin of AsyncRetryTransport, for clients used from worker threads"""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: RateLimiter = None):
+        self.transport = transport
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        replayable = _replayable(request)  # Checked before the body is consumed
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                response = self.transport.handle_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= settings.HTTP_MAX_RETRIES:
+                    raise
+                time.sleep(retry_delay(attempt))
+                attempt += 1
+                continue
+
+            _report(self.limiter, response)
+            if not _should_retry(response, attempt, replayable):
+                return response
+
+            response.close()
+            time.sleep(retry_delay(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+class SharedAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Hands a pooled transport to SDKs that build a throwaway AsyncClient per
+    call (Deepgram) - closing that client must not close the shared pool
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        pass  # Owned by HTTPPools
+
+class SharedTransport(httpx.BaseTransport):
+    """Sync twin of SharedAsyncTransport"""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.transport.handle_request(request)
+
+    def close(self):
+        pass  # Owned by HTTPPools
+
+class HTTPPools:
+    """
+    Keep-alive connection pools, one per upstream service ("spotify", "groq",
+    "deepgram"), created on first use and shared by every request in the worker
+    """
+
+    def __init__(self):
+        self._async_transports = {}
+        self._transports = {}
+        self._async_clients = {}
+        self._clients = {}
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        )
+
+    def _timeout(self, timeout: float) -> httpx.Timeout:
+        return httpx.Timeout(timeout, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+    def async_transport(self, service: str) -> httpx.AsyncBaseTransport:
+        """Pooled async transport with retries for `service`"""
+        if service not in self._async_transports:
+            self._async_transports[service] = AsyncRetryTransport(
+                httpx.AsyncHTTPTransport(limits=self._limits()),
+                limiter=rate_limiters.get(service)
+            )
+        return self._async_transports[service]
+
+    def transport(self, service: str) -> httpx.BaseTransport:
+        """Pooled sync transport with retries for `service`"""
+        if service not in self._transports:
+            self._transports[service] = RetryTransport(
+                httpx.HTTPTransport(limits=self._limits()),
+                limiter=rate_limiters.get(service)
+            )
+        return self._transports[service]
+
+    def shared_async_transport(self, service: str) -> httpx.AsyncBaseTransport:
+        """The async pool for `service`, safe to hand to a client that closes it"""
+        return SharedAsyncTransport(self.async_transport(service))
+
+    def shared_transport(self, service: str) -> httpx.BaseTransport:
+        """The sync pool for `service`, safe to hand to a client that closes it"""
+        return SharedTransport(self.transport(service))
+
+    def async_client(self, service: str, timeout: float) -> httpx.AsyncClient:
+        """Shared AsyncClient for `service`"""
+        if service not in self._async_clients:
+            self._async_clients[service] = httpx.AsyncClient(
+                transport=self.shared_async_transport(service),
+                timeout=self._timeout(timeout)
+            )
+        return self._async_clients[service]
+
+    def client(self, service: str, timeout: float) -> httpx.Client:
+        """Shared sync Client for `service`"""
+        if service not in self._clients:
+            self._clients[service] = httpx.Client(
+                transport=self.shared_transport(service),
+                timeout=self._timeout(timeout)
+            )
+        return self._clients[service]
+
+    def requests_session(self, pool_size: int) -> requests.Session:
+        """
+        requests.Session for spotipy - its default adapter keeps only 10
+        connections, fewer than our search threads, and retries without jitter
+        """
+        retry = Retry(
+            total=settings.HTTP_MAX_RETRIES,
+            read=False,
+            allowed_methods=frozenset(["GET", "POST"]),
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=settings.HTTP_RETRY_BACKOFF,
+            backoff_max=settings.HTTP_RETRY_MAX_DELAY,
+            backoff_jitter=settings.HTTP_RETRY_BACKOFF,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    async def aclose(self):
+        """
+        Drop every pooled connection (app shutdown)
+        Clients stay usable - a later request just opens fresh connections.
+        """
+        for transport in self._async_transports.values():
+            await transport.aclose()
+        for transport in self._transports.values():
+            transport.close()
+
+http_pools = HTTPPools()
@@ -0,0 +1,125 @@
+"""
+Incremental JSON parsing for streamed LLM replies
+
+Hands back each top-level member of a JSON object (and each item of a
+top-level array) as soon as its text is complete, so callers can act on
+the first fields while the rest is still being generated. Text around the
+object - markdown fences, "Here is your JSON:" - is skipped, and a reply
+cut off mid-way still yields everything completed before the cut.
+"""
+
+import json
+
+class JSONStreamParser:
+    """
+    Feed chunks of one JSON object; feed() returns the events completed so far:
+    - ("member", key, value) for each top-level member
+    - ("item", key, value) for each item of a top-level array member
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.started = False
+        self.done = False
+        self.in_string = False
+        self.escaped = False
+
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.item_start = None  # Set while inside a top-level array
+
+        self.members = {}
+        self.items = {}  # Array items completed so far, by key
+
+    def _load(self, start: int, end: int):
+        """Value text between start and end, or None if blank / not JSON"""
+        raw = self.buffer[start:end].strip()
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None  # Malformed member - skip it, keep the rest
+
+    def _end_member(self, end: int, events: list):
+        if self.key is not None and self.value_start is not None:
+            value = self._load(self.value_start, end)
+            if value is not None:
+                self.members[self.key] = value
+                events.append(("member", self.key, value))
+        self.key = self.key_start = self.value_start = self.item_start = None
+
+    def _end_item(self, end: int, events: list):
+        value = self._load(self.item_start, end)
+        if value is not None:
+            self.items.setdefault(self.key, []).append(value)
+            events.append(("item", self.key, value))
+
+    def feed(self, chunk: str) -> list:
+        events = []
+        self.buffer += chunk
+
+        while self.pos < len(self.buffer) and not self.done:
+            i = self.pos
+            char = self.buffer[i]
+            self.pos += 1
+
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.key_start is not None and self.key is None:
+                        self.key = self._load(self.key_start, i + 1)
+                continue
+
+            if char == '"':
+                self.in_string = True
+                if self.depth == 1 and self.value_start is None:
+                    self.key_start = i
+            elif char == ":" and self.depth == 1:
+                self.value_start = i + 1
+            elif char in "{[":
+                if (char == "[" and self.depth == 1 and self.value_start is not None
+                        and not self.buffer[self.value_start:i].strip()):
+                    self.item_start = i + 1
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 2 and self.item_start is not None:
+                    self._end_item(i, events)
+                    self.item_start = None
+                self.depth -= 1
+                if self.depth == 0:
+                    self._end_member(i, events)
+                    self.done = True
+            elif char == ",":
+                if self.depth == 1:
+                    self._end_member(i, events)
+                elif self.depth == 2 and self.item_start is not None:
+                    self._end_item(i, events)
+                    self.item_start = i + 1
+
+        return events
+
+    def result(self) -> dict:
+        """Everything parsed so far - arrays cut off mid-way keep their complete items"""
+        return {**self.items, **self.members}
+
+def parse_json_object(text: str) -> dict:
+    """Parse a complete (possibly fenced or chatty) reply; raises ValueError if there's no object"""
+    parser = JSONStreamParser()
+    parser.feed(text)
+    if not parser.started:
+        raise ValueError("No JSON object in reply")
+    return parser.result()
@@ -0,0 +1,220 @@
+"""Lightweight in-process latency tracking, plus Prometheus metrics for /metrics"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import REGISTRY
+
+# Upstream calls run from ~10ms (cached token) to tens of seconds (long transcriptions)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+UPSTREAM_SECONDS = Histogram(
+    "groovi_upstream_request_seconds", "Latency of calls to external services",
+    ["service", "operation"], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_ERRORS = Counter(
+    "groovi_upstream_errors_total", "Failed calls to external services",
+    ["service", "operation"]
+)
+STAGE_SECONDS = Histogram(
+    "groovi_stage_seconds", "Latency of request stages (mood analysis, song strategies, ...)",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+STRATEGY_SERVED = Counter(
+    "groovi_recommend_strategy_total", "Recommendations served, by the strategy that produced the songs",
+    ["strategy"]
+)
+SPECULATIVE_PREFETCH = Counter(
+    "groovi_speculative_prefetch_total",
+    "Curated library searches started for the VADER-predicted mood, by outcome (used / unused / mispredicted)",
+    ["outcome"]
+)
+CIRCUIT_STATE = Gauge(
+    "groovi_circuit_state", "Circuit breaker state per upstream service (0 closed, 1 half open, 2 open)",
+    ["service"]
+)
+CIRCUIT_REJECTED = Counter(
+    "groovi_circuit_rejected_total", "Calls skipped because the service's circuit breaker was open",
+    ["service"]
+)
+COALESCED_CALLS = Counter(
+    "groovi_coalesced_calls_total", "Calls that shared an identical in-flight upstream call instead of making their own",
+    ["call"]
+)
+TRANSCRIPTION_JOB_WAIT_SECONDS = Histogram(
+    "groovi_transcription_job_wait_seconds", "Time transcription jobs spent queued before a worker started them",
+    buckets=LATENCY_BUCKETS
+)
+MOOD_ANALYSIS_SECONDS = Histogram(
+    "groovi_mood_analysis_seconds", "Mood analysis latency by path (cache / groq / vader_*)",
+    ["path"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "groovi_http_request_seconds", "API request latency (time to response headers for streams)",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+
+# Per-request timings for the Server-Timing header - None when not collecting
+server_timings: ContextVar = ContextVar("server_timings", default=None)
+
+class LatencyStats:
+    """Count / total / max latency per named path, thread-safe"""
+
+    def __init__(self, histogram: Histogram = None):
+        self._paths = {}
+        self._lock = threading.Lock()
+        self.histogram = histogram  # Optional Prometheus histogram labeled by path
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            stats = self._paths.setdefault(path, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if self.histogram is not None:
+            self.histogram.labels(path).observe(seconds)
+
+    @contextmanager
+    def time(self, path: str):
+        """Record how long the with-block took under `path`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(path, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                path: {
+                    "count": s["count"],
+                    "avg_ms": round(1000 * s["total_seconds"] / s["count"], 2),
+                    "max_ms": round(1000 * s["max_seconds"], 2)
+                }
+                for path, s in self._paths.items()
+            }
+
+def _add_server_timing(name: str, seconds: float):
+    timings = server_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+@contextmanager
+def track_upstream(service: str, operation: str):
+    """Time an external call; exceptions count as errors and are re-raised"""
+    start = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        raise  # Abandoned by us (hedge, coalescing), not an upstream failure
+    except BaseException:
+        UPSTREAM_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        UPSTREAM_SECONDS.labels(service, operation).observe(seconds)
+        _add_server_timing(f"{service}-{operation}", seconds)
+
+@contextmanager
+def track_stage(stage: str):
+    """Time one stage of request handling"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(seconds)
+        _add_server_timing(stage, seconds)
+
+def record_upstream_error(service: str, operation: str):
+    """Count a failure that didn't raise (e.g. an unusable response)"""
+    UPSTREAM_ERRORS.labels(service, operation).inc()
+
+def format_server_timing(timings: list) -> str:
+    """
+    Server-Timing header value
+    Repeated names (e.g. parallel Spotify searches) are merged: dur is the
+    slowest call, desc says how many there were.
+    """
+    merged = {}
+    for name, seconds in timings:
+        count, slowest = merged.get(name, (0, 0.0))
+        merged[name] = (count + 1, max(slowest, seconds))
+
+    entries = []
+    for name, (count, slowest) in merged.items():
+        entry = f"{name};dur={slowest * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="{count} calls"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware - request latency histogram, plus an optional
+    Server-Timing header listing the stages and upstream calls of the request
+
+    For streamed responses the header goes out with the first byte, so it
+    only covers the work done before streaming started.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = [] if self.server_timing else None
+        token = server_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", format_server_timing(timings).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            server_timings.reset(token)
+            # Route template, not the raw path, so ids don't blow up label cardinality
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+
+class StatsCollector:
+    """Export existing stats() dicts (cache counters etc.) as Prometheus gauges"""
+
+    def __init__(self, sources: dict):
+        self.sources = sources  # metric prefix -> callable returning a (nested) stats dict
+
+    def _flatten(self, prefix: str, stats: dict):
+        for key, value in stats.items():
+            name = f"{prefix}_{key}"
+            if isinstance(value, dict):
+                yield from self._flatten(name, value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield name, value
+
+    def collect(self):
+        for prefix, stats in self.sources.items():
+            for name, value in self._flatten(f"groovi_{prefix}", stats()):
+                yield GaugeMetricFamily(name, f"{name} (from /stats)", value=value)
+
+def register_stats(sources: dict):
+    """Add stats() sources to the /metrics output"""
+    REGISTRY.register(StatsCollector(sources))
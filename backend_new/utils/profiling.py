@@ -0,0 +1,268 @@
+"""
+On-demand sampling profiler - where a slow request's time actually goes
+
+Off unless PROFILE_ENABLED. A request is profiled when it carries the
+admin token (X-Profile header or ?profile=<token>) or is picked at
+PROFILE_SAMPLE_RATE. While it runs, a background thread samples every
+PROFILE_INTERVAL seconds:
+- the request's task - the event loop thread's stack while the task is
+  running (JSON parsing, VADER, pydantic validation), or its await chain
+  while it is suspended (e.g. inside a Spotify search or a Groq call)
+- thread pool workers that are busy (spotipy, audio preprocessing, sync
+  endpoints, ...) - idle workers and other threads are skipped
+
+Profiles are written to PROFILE_DIR as speedscope JSON (open them at
+https://www.speedscope.app) or collapsed stacks for flamegraph.pl, and
+analyze_profiles.py adds up the hot frames across them.
+
+One request is profiled at a time per worker process. Under heavy
+concurrency, worker thread samples can include other requests' work.
+"""
+
+import asyncio
+import hmac
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import parse_qs
+
+FORMATS = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt"}
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Thread pool worker loops (concurrent.futures, anyio) - only these threads are sampled
+WORKER_LOOPS = {("_worker", "thread.py"), ("run", "_asyncio.py")}
+# A worker whose innermost frame is its loop, or in one of these files, is waiting for work
+IDLE_FILES = ("threading.py", "queue.py")
+
+def _frame_key(frame) -> tuple:
+    """(function, file, first line) - one entry per function, not per line"""
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+def _thread_stack(frame, root=None) -> list:
+    """Root-first frame keys of a thread's stack, starting at `root` if given"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is root:
+            break
+        frame = frame.f_back
+    if root is not None and frames[-1] is not root:
+        return None  # root isn't on this stack
+    return [_frame_key(f) for f in reversed(frames)]
+
+def _await_stack(task: asyncio.Task) -> list:
+    """Root-first frame keys along a suspended task's await chain"""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break  # A Future, Task or finished coroutine
+        stack.append(_frame_key(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+
+    if isinstance(awaitable, asyncio.Task):
+        stack.extend(_await_stack(awaitable))
+    elif awaitable is not None:
+        kind = "Future" if type(awaitable).__name__ == "FutureIter" else type(awaitable).__name__
+        stack.append((f"[await {kind}]", "", 0))
+    return stack
+
+def frame_label(key: tuple) -> str:
+    """Readable frame name - file relative to the app or site-packages"""
+    name, filename, line = key
+    if not filename:
+        return name
+    for marker in ("site-packages" + os.sep, "backend_new" + os.sep):
+        if marker in filename:
+            filename = filename.rsplit(marker, 1)[1]
+            break
+    else:
+        filename = os.path.basename(filename)
+    return f"{name} ({filename}:{line})"
+
+class RequestProfile:
+    """Samples one request from a background thread until stop()"""
+
+    def __init__(self, name: str, task: asyncio.Task, interval: float):
+        self.name = name
+        self.task = task
+        self.interval = interval
+        self.loop_thread = threading.get_ident()
+        self.samples = Counter()  # root-first tuple of frame keys -> seconds
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def _sample(self, weight: float):
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        request_root = (f"[{self.name}]", "", 0)
+        coro_frame = getattr(self.task.get_coro(), "cr_frame", None)
+
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if ident == self.loop_thread:
+                # The loop thread only counts while it is running this request
+                running = _thread_stack(frame, coro_frame) if coro_frame is not None else None
+                stack = running if running is not None else _await_stack(self.task)
+                if stack:
+                    self.samples[(request_root, *stack)] += weight
+                continue
+
+            stack = _thread_stack(frame)
+            loops = [i for i, (name, filename, _) in enumerate(stack) if (name, os.path.basename(filename)) in WORKER_LOOPS]
+            if not loops or loops[-1] == len(stack) - 1 or os.path.basename(stack[-1][1]) in IDLE_FILES:
+                continue
+            thread_root = (f"[thread {names.get(ident, ident)}]", "", 0)
+            self.samples[(thread_root, *stack)] += weight
+        self.sample_count += 1
+
+    def write(self, path: str, fmt: str):
+        """Save as speedscope JSON or collapsed stacks (flamegraph.pl input, values in microseconds)"""
+        if fmt == "collapsed":
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, seconds in self.samples.items():
+                    line = ";".join(frame_label(key).replace(";", ",") for key in stack)
+                    f.write(f"{line} {max(1, round(seconds * 1e6))}\n")
+            return
+
+        frame_index = {}
+        samples, weights = [], []
+        for stack, seconds in self.samples.items():
+            samples.append([frame_index.setdefault(key, len(frame_index)) for key in stack])
+            weights.append(round(seconds * 1000, 3))
+        profile = {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.name,
+            "exporter": "groovi",
+            "shared": {"frames": [
+                {"name": name, "file": filename, "line": line} if filename else {"name": name}
+                for name, filename, line in frame_index
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profile, f)
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware - profiles requests that ask for it (token) or are
+    sampled, and names the profile file in an X-Profile-File header
+    """
+
+    def __init__(self, app, directory: str, token: str = "", sample_rate: float = 0.0,
+                 interval: float = 0.005, fmt: str = "speedscope"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format '{fmt}', expected one of {tuple(FORMATS)}")
+        self.app = app
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.fmt = fmt
+        self.busy = False  # One profile at a time - the sampler isn't free
+        self._ids = itertools.count(1)
+
+    def _requested(self, scope) -> bool:
+        if self.token:
+            headers = dict(scope.get("headers") or [])
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            supplied = headers.get(b"x-profile", b"").decode("latin-1") or query.get("profile", [""])[0]
+            if supplied and hmac.compare_digest(supplied, self.token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.busy or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        name = f"{scope['method']} {scope['path']}"
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._ids)}-{scope['method'].lower()}-{slug}{FORMATS[self.fmt]}"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", filename.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self.busy = True
+        profile = RequestProfile(name, asyncio.current_task(), self.interval)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            profile.stop()
+            self.busy = False
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                await asyncio.to_thread(profile.write, os.path.join(self.directory, filename), self.fmt)
+                print(f"🔬 Profiled {name}: {profile.duration * 1000:.0f}ms, {profile.sample_count} samples → {filename}")
+            except OSError as e:
+                print(f"❌ Profile write failed: {e}")
+
+def load_profile(path: str) -> Counter:
+    """Stacks (tuples of frame labels, root first) -> milliseconds, from either format"""
+    stacks = Counter()
+    if path.endswith(FORMATS["collapsed"]):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                stack, _, value = line.rstrip("\n").rpartition(" ")
+                if stack:
+                    stacks[tuple(stack.split(";"))] += int(value) / 1000
+        return stacks
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    frames = data["shared"]["frames"]
+    labels = [
+        frame_label((frame["name"], frame.get("file", ""), frame.get("line", 0))) for frame in frames
+    ]
+    for profile in data["profiles"]:
+        for sample, weight in zip(profile["samples"], profile["weights"]):
+            stacks[tuple(labels[i] for i in sample)] += weight
+    return stacks
+
+def hot_frames(stacks: Counter) -> dict:
+    """Per frame: self time (innermost frame) and total time (anywhere on the stack), in ms"""
+    frames = defaultdict(lambda: {"self_ms": 0.0, "total_ms": 0.0})
+    for stack, ms in stacks.items():
+        frames[stack[-1]]["self_ms"] += ms
+        for label in set(stack):
+            frames[label]["total_ms"] += ms
+    return dict(frames)
@@ -0,0 +1,273 @@
+"""
+Upstream protection - a circuit breaker and an adaptive rate limiter per
+service ("spotify", "groq", "deepgram")
+
+While a service is failing (errors or very slow calls) its breaker opens
+and calls fail immediately, so requests skip straight to the next strategy
+(VADER, curated songs) instead of each waiting on a dying upstream. After
+CIRCUIT_RESET_TIMEOUT one trial call goes through; success closes the
+breaker again.
+
+The rate limiter is a token bucket that all calls to a service share. A
+429 pauses every call for the Retry-After time and halves the rate, which
+then creeps back up as calls succeed.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from config.settings import settings
+from utils.metrics import CIRCUIT_STATE, CIRCUIT_REJECTED
+
+class CircuitOpenError(Exception):
+    """The service's breaker is open - don't call it"""
+
+    def __init__(self, service: str, retry_after: float):
+        super().__init__(f"{service} circuit open, retry in {retry_after:.0f}s")
+        self.service = service
+        self.retry_after = retry_after
+
+class RateLimitedError(Exception):
+    """Waiting for the service's rate limiter would take too long"""
+
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` failures in a row (calls slower
+    than `slow_call_seconds` count as failures), open → half-open after
+    `reset_timeout`, half-open → closed on a successful trial call or back
+    to open on a failed one
+    """
+
+    STATES = ("closed", "half_open", "open")
+
+    def __init__(self, service: str, failure_threshold: int, reset_timeout: float, slow_call_seconds: float):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+        # Counters
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+        CIRCUIT_STATE.labels(service).set(0)
+
+    def _set_state(self, state: str):
+        self.state = state
+        CIRCUIT_STATE.labels(self.service).set(self.STATES.index(state))
+        if state == "open":
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            print(f"⚠️ {self.service} circuit open - skipping it for {self.reset_timeout:.0f}s")
+        elif state == "closed":
+            print(f"✅ {self.service} circuit closed")
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a trial call through"""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    @property
+    def available(self) -> bool:
+        """Whether a call would be let through right now (doesn't claim the trial call)"""
+        with self._lock:
+            if self.state == "open":
+                return self.retry_after() == 0
+            return not (self.state == "half_open" and self.trial_in_flight)
+
+    def allow(self) -> bool:
+        """Claim permission for one call"""
+        with self._lock:
+            if self.state == "open" and self.retry_after() == 0:
+                self._set_state("half_open")
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+
+            self.rejected += 1
+        CIRCUIT_REJECTED.labels(self.service).inc()
+        return False
+
+    def record_success(self, seconds: float = 0.0):
+        if seconds > self.slow_call_seconds:
+            with self._lock:
+                self.slow_calls += 1
+            self.record_failure()
+            return
+
+        with self._lock:
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def _release(self):
+        """The call never reached the service - free the trial slot without a verdict"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or (
+                self.state == "closed" and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._set_state("open")
+
+    @contextmanager
+    def guard(self):
+        """
+        Run one call through the breaker
+        Raises CircuitOpenError without running the block while open;
+        exceptions from the block count as failures and are re-raised
+        (not RateLimitedError or cancellation - those say nothing about the service)
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.service, self.retry_after())
+
+        start = time.perf_counter()
+        try:
+            yield
+        except (RateLimitedError, asyncio.CancelledError):
+            self._release()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_after_seconds": round(self.retry_after(), 1) if self.state == "open" else 0
+            }
+
+class RateLimiter:
+    """
+    Token bucket shared by all calls to one service, thread-safe
+
+    rate=0 means no steady limit - Retry-After pauses still apply. After a
+    429 the rate is halved (down to 10% of the configured rate) and grows
+    back by 5% of it per successful call.
+    """
+
+    def __init__(self, service: str, rate: float, burst: int, max_wait: float):
+        self.service = service
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.throttled_count = 0
+        self.waited_seconds = 0.0
+        self.rejected = 0
+
+    def _reserve(self) -> float:
+        """Take a token - returns how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+
+            if self.rate > 0:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens < 1:
+                    wait = max(wait, (1 - self.tokens) / self.rate)
+
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise RateLimitedError(f"{self.service} rate limited, next slot in {wait:.1f}s")
+
+            if self.rate > 0:
+                self.tokens -= 1
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self):
+        """Wait for a slot (sync) - raises RateLimitedError past max_wait"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait for a slot without blocking the event loop"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, retry_after: float):
+        """The service answered 429 - hold every caller back and slow down"""
+        with self._lock:
+            self.throttled_count += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            if self.max_rate > 0:
+                self.rate = max(self.max_rate * 0.1, self.rate / 2)
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "max_rate": self.max_rate,
+                "throttled": self.throttled_count,
+                "rejected": self.rejected,
+                "waited_seconds": round(self.waited_seconds, 2),
+                "paused_seconds": round(max(0.0, self.paused_until - time.monotonic()), 1)
+            }
+
+def _breaker(service: str, slow_call_seconds: float) -> CircuitBreaker:
+    return CircuitBreaker(
+        service,
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+        slow_call_seconds=slow_call_seconds
+    )
+
+def _limiter(service: str, rate: float) -> RateLimiter:
+    return RateLimiter(service, rate=rate, burst=int(rate * 2) or 1, max_wait=settings.RATE_LIMIT_MAX_WAIT)
+
+circuit_breakers = {
+    "spotify": _breaker("spotify", settings.SPOTIFY_SLOW_CALL),
+    "groq": _breaker("groq", settings.GROQ_SLOW_CALL),
+    "deepgram": _breaker("deepgram", settings.DEEPGRAM_SLOW_CALL)
+}
+
+rate_limiters = {
+    "spotify": _limiter("spotify", settings.SPOTIFY_RATE_LIMIT),
+    "groq": _limiter("groq", settings.GROQ_RATE_LIMIT),
+    "deepgram": _limiter("deepgram", settings.DEEPGRAM_RATE_LIMIT)
+}
+
+def resilience_stats() -> dict:
+    """Breaker and rate limiter state per service, for /stats and /metrics"""
+    return {
+        service: {"circuit": circuit_breakers[service].stats(), "rate_limit": rate_limiters[service].stats()}
+        for service in circuit_breakers
+    }
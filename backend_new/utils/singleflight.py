@@ -0,0 +1,101 @@
+"""
+Request coalescing - identical calls already in flight share one upstream request
+
+When a popular text or a cache entry expiring sends many requests after the
+same Groq prompt or Spotify search at once, the first caller (the leader)
+makes the call and everyone else arriving before it finishes waits for that
+result instead of making their own. Exceptions are shared the same way.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from utils.metrics import COALESCED_CALLS
+
+class _AsyncCall:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces calls by key - do() for coroutines, do_sync() for worker threads
+
+    The async call runs as its own task, so one caller being cancelled
+    doesn't cancel it for the rest; it is only cancelled once every caller
+    waiting on it has gone.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}  # key -> _AsyncCall
+        self._sync_calls = {}  # key -> Future
+        self._lock = threading.Lock()
+
+        # Counters
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _count(self, leader: bool):
+        if leader:
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            COALESCED_CALLS.labels(self.name).inc()
+
+    def _forget(self, key, call: _AsyncCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, fn):
+        """Await fn() - or the identical call already running under `key`"""
+        call = self._calls.get(key)
+        leader = call is None or call.task.done()
+        if leader:
+            call = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _task: self._forget(key, call))
+            self._calls[key] = call
+        self._count(leader)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()  # Nobody left to use the result
+            raise
+        finally:
+            call.waiters -= 1
+
+    def do_sync(self, key, fn):
+        """Thread-safe fn() - or wait for the identical call another thread is making"""
+        with self._lock:
+            future = self._sync_calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._sync_calls[key] = Future()
+            self._count(leader)
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._sync_calls[key]
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "calls": calls,
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+            "in_flight": len(self._calls) + len(self._sync_calls)
+        }
@@ -0,0 +1,100 @@
+"""Upload size enforcement - reject oversized bodies before they are buffered"""
+
+import asyncio
+from typing import BinaryIO
+from fastapi import HTTPException, UploadFile
+from config.settings import settings
+
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+def upload_too_large() -> HTTPException:
+    """Error returned for any upload over the size limit"""
+    max_mb = settings.TRANSCRIBE_MAX_UPLOAD_BYTES // (1024 * 1024)
+    return HTTPException(status_code=413, detail=f"File too large. Max {max_mb}MB allowed.")
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that caps request body size on upload routes
+
+    - Rejects up front when Content-Length is already over the limit
+    - Otherwise counts bytes as they arrive and aborts mid-stream once the
+      limit is crossed (covers chunked uploads with no Content-Length)
+    """
+
+    def __init__(self, app, paths: tuple, max_bytes: int):
+        self.app = app
+        self.paths = paths
+        self.max_body_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise upload_too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        error = upload_too_large()
+        body = f'{{"detail":"{error.detail}"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+async def measure_upload(upload: UploadFile, max_bytes: int, hasher=None) -> int:
+    """
+    Walk an upload in chunks to get its size, aborting once it passes max_bytes
+
+    The upload stays in Starlette's spooled temp file (memory for small
+    files, disk for large ones) and is rewound so it can be streamed on.
+    A hashlib object passed as hasher is fed every chunk on the way.
+
+    Returns:
+        Upload size in bytes
+    """
+    size = 0
+    while True:
+        chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise upload_too_large()
+        if hasher is not None:
+            hasher.update(chunk)
+
+    await upload.seek(0)
+    return size
+
+async def aiter_file_chunks(file: BinaryIO, chunk_size: int = None):
+    """Yield a file's contents in chunks, reading off the event loop"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    while True:
+        chunk = await asyncio.to_thread(file.read, chunk_size)
+        if not chunk:
+            break
+        yield chunk
@@ -20,11 +20,23 @@ interface Song {
   external_url: string;
 }
 
-interface ApiResponse {
-  mood_analysis: MoodAnalysis;
-  songs: Song[];
+// One Server-Sent Event from /recommend/stream
+interface StreamEvent {
+  event: string;
+  data: unknown;
 }
 
+// Parse a raw "event: ...\ndata: ..." block
+const parseStreamEvent = (raw: string): StreamEvent => {
+  let event = "message";
+  let data = "";
+  for (const line of raw.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data += line.slice(5).trim();
+  }
+  return { event, data: data ? JSON.parse(data) : null };
+};
+
 function App() {
   // State to store what the user types
   const [moodText, setMoodText] = useState("");
@@ -51,7 +63,9 @@ function App() {
     setMoodAnalysis(null);
 
     try {
-      const response = await fetch('http://127.0.0.1:8000/recommend', {
+      // Streamed: the mood card shows as soon as analysis is done,
+      // then each song appears as soon as it's found on Spotify
+      const response = await fetch('http://127.0.0.1:8000/recommend/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -59,18 +73,41 @@ function App() {
         body: JSON.stringify({ text: moodText }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`Server error: ${response.status}. Please try again.`);
       }
 
-      const data: ApiResponse = await response.json();
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      const songs: Song[] = [];
+      let buffer = "";
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        // Events are separated by a blank line; keep any partial event
+        buffer += decoder.decode(value, { stream: true });
+        const rawEvents = buffer.split("\n\n");
+        buffer = rawEvents.pop() ?? "";
+
+        for (const rawEvent of rawEvents) {
+          const { event, data } = parseStreamEvent(rawEvent);
+          if (event === "mood") {
+            setMoodAnalysis(data as MoodAnalysis);
+          } else if (event === "track") {
+            songs.push(data as Song);
+            setRecommendations([...songs]);
+          } else if (event === "error") {
+            throw new Error((data as { detail?: string } | null)?.detail || "Something went wrong. Please try again.");
+          }
+        }
+      }
       
-      if (!data.songs || data.songs.length === 0) {
+      if (songs.length === 0) {
         throw new Error("No songs found for your mood. Try a different description.");
       }
 
-      setRecommendations(data.songs);
-      setMoodAnalysis(data.mood_analysis);
       setShowSuccess(true);
       
       // Auto-hide success message after 3 seconds
@@ -5,44 +5,117 @@ interface AudioRecorderProps {
   onError: (error: string) => void;
 }
 
+// Messages pushed back by /transcribe/stream
+interface LiveTranscriptMessage {
+  type: "interim" | "final" | "done" | "error";
+  transcript?: string;
+  detail?: string;
+}
+
+// Send audio to the server every 250ms while recording
+const CHUNK_INTERVAL_MS = 250;
+
 export default function AudioRecorder({ onTranscriptReceived, onError }: AudioRecorderProps) {
   const [isRecording, setIsRecording] = useState(false);
   const [isTranscribing, setIsTranscribing] = useState(false);
+  const [liveTranscript, setLiveTranscript] = useState("");
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
+  const socketRef = useRef<WebSocket | null>(null);
   const audioChunksRef = useRef<Blob[]>([]);
+  const finalTextRef = useRef("");
+  const transcriptDoneRef = useRef(false);
+
+  // Live transcription socket - resolves once it's open, rejects if it can't connect
+  const openTranscriptionSocket = () => new Promise<WebSocket>((resolve, reject) => {
+    const socket = new WebSocket('ws://127.0.0.1:8000/transcribe/stream');
+
+    socket.onopen = () => resolve(socket);
+    socket.onerror = () => reject(new Error('Live transcription unavailable'));
+
+    socket.onmessage = (event) => {
+      const message: LiveTranscriptMessage = JSON.parse(event.data);
+
+      if (message.type === "interim") {
+        setLiveTranscript(`${finalTextRef.current} ${message.transcript}`.trim());
+      } else if (message.type === "final") {
+        finalTextRef.current = `${finalTextRef.current} ${message.transcript}`.trim();
+        setLiveTranscript(finalTextRef.current);
+      } else if (message.type === "done") {
+        transcriptDoneRef.current = true;
+        if (message.transcript) {
+          onTranscriptReceived(message.transcript);
+        } else {
+          onError("No speech detected in audio");
+        }
+        setIsTranscribing(false);
+        setLiveTranscript("");
+      } else if (message.type === "error") {
+        onError(message.detail || 'Transcription failed');
+      }
+    };
+
+    socket.onclose = () => {
+      // Socket dropped before the transcript arrived - upload the recording instead
+      if (!transcriptDoneRef.current && audioChunksRef.current.length > 0) {
+        transcribeAudio(new Blob(audioChunksRef.current, { type: 'audio/webm' }));
+      } else if (!transcriptDoneRef.current) {
+        setIsTranscribing(false);
+      }
+    };
+  });
 
   const startRecording = async () => {
     try {
       // Request microphone access
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-      
+
       // Create MediaRecorder
       const mediaRecorder = new MediaRecorder(stream, {
         mimeType: 'audio/webm;codecs=opus'
       });
-      
+
       mediaRecorderRef.current = mediaRecorder;
       audioChunksRef.current = [];
+      finalTextRef.current = "";
+      transcriptDoneRef.current = false;
+      setLiveTranscript("");
+
+      // Stream to the server if we can - otherwise just record and upload
+      socketRef.current = null;
+      try {
+        socketRef.current = await openTranscriptionSocket();
+      } catch (err) {
+        console.warn("Falling back to upload:", err);
+      }
 
-      // Collect audio data
+      // Collect audio data (kept for the upload fallback) and stream it live
       mediaRecorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
           audioChunksRef.current.push(event.data);
+          if (socketRef.current?.readyState === WebSocket.OPEN) {
+            socketRef.current.send(event.data);
+          }
         }
       };
 
       // Handle recording stop
       mediaRecorder.onstop = async () => {
-        const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/webm' });
-        await transcribeAudio(audioBlob);
-        
+        const socket = socketRef.current;
+        if (socket?.readyState === WebSocket.OPEN) {
+          // Server flushes the last words and replies with "done"
+          socket.send(JSON.stringify({ type: "stop" }));
+        } else {
+          const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/webm' });
+          await transcribeAudio(audioBlob);
+        }
+
         // Stop all tracks
         stream.getTracks().forEach(track => track.stop());
       };
 
-      mediaRecorder.start();
+      mediaRecorder.start(CHUNK_INTERVAL_MS);
       setIsRecording(true);
-      
+
     } catch (err) {
       console.error("Microphone access denied:", err);
       onError("Microphone access denied. Please allow microphone access and try again.");
@@ -53,10 +126,12 @@ export default function AudioRecorder({ onTranscriptReceived, onError }: AudioRe
     if (mediaRecorderRef.current && isRecording) {
       mediaRecorderRef.current.stop();
       setIsRecording(false);
+      setIsTranscribing(true);
     }
   };
 
   const transcribeAudio = async (audioBlob: Blob) => {
+    transcriptDoneRef.current = true;
     setIsTranscribing(true);
 
     try {
@@ -70,6 +145,11 @@ export default function AudioRecorder({ onTranscriptReceived, onError }: AudioRe
         body: formData,
       });
 
+      // Rejected by the server's size limit - its body may not be JSON
+      if (response.status === 413) {
+        throw new Error('Recording too large. Maximum size is 10MB.');
+      }
+
       if (!response.ok) {
         const error = await response.json();
         throw new Error(error.detail || 'Transcription failed');
@@ -77,20 +157,21 @@ export default function AudioRecorder({ onTranscriptReceived, onError }: AudioRe
 
       const data = await response.json();
       onTranscriptReceived(data.transcript);
-      
+
     } catch (err) {
       console.error("Transcription error:", err);
       onError(err instanceof Error ? err.message : "Failed to transcribe audio");
     } finally {
       setIsTranscribing(false);
+      setLiveTranscript("");
     }
   };
 
   return (
     <div className="audio-recorder">
       {!isRecording && !isTranscribing && (
-        <button 
-          onClick={startRecording} 
+        <button
+          onClick={startRecording}
           className="audio-button start-recording"
           title="Start voice recording"
         >
@@ -99,8 +180,8 @@ export default function AudioRecorder({ onTranscriptReceived, onError }: AudioRe
       )}
 
       {isRecording && (
-        <button 
-          onClick={stopRecording} 
+        <button
+          onClick={stopRecording}
           className="audio-button stop-recording"
           title="Stop and transcribe"
         >
@@ -113,6 +194,10 @@ export default function AudioRecorder({ onTranscriptReceived, onError }: AudioRe
           <span className="spinner"></span> Transcribing audio...
         </div>
       )}
+
+      {liveTranscript && (
+        <p className="live-transcript">{liveTranscript}</p>
+      )}
     </div>
   );
-}
\ No newline at end of file
+}
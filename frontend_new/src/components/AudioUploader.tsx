@@ -40,6 +40,11 @@ export default function AudioUploader({ onTranscriptReceived, onError, onUploadi
         body: formData,
       });
 
+      // Rejected by the server's size limit - its body may not be JSON
+      if (response.status === 413) {
+        throw new Error('File too large. Maximum size is 10MB.');
+      }
+
       if (!response.ok) {
         const error = await response.json();
         throw new Error(error.detail || 'Transcription failed');